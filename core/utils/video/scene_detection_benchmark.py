@@ -0,0 +1,324 @@
+################################################################################
+# 转场检测基准测试：生成带标注的合成视频，统计各检测方法的速度、内存和准确率
+#
+# 用法：
+#   python -m core.utils.video.scene_detection_benchmark --output bench.json \
+#       --resolutions 640x360,1920x1080 --durations 30,120
+################################################################################
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .scene_detection_ffmpeg import detect_by_ffmpeg
+from .scene_detection_methods import (
+    detect_by_frame_diff,
+    detect_by_histogram,
+    detect_by_optical_flow,
+    detect_combined,
+    detect_by_phash,
+    detect_by_sampling
+)
+from .scene_detection_optical_flow import detect_by_optical_flow_fast
+from ..common.logger import log
+
+# 参与基准测试的检测方法，均以默认参数运行
+DETECTORS: Dict[str, Callable[[str], List[float]]] = {
+    'frame_diff': detect_by_frame_diff,
+    'histogram': detect_by_histogram,
+    'optical_flow': detect_by_optical_flow,
+    'combined': detect_combined,
+    'phash': detect_by_phash,
+    'optical_flow_fast': detect_by_optical_flow_fast,
+    'sampled_frame_diff': lambda video_path: detect_by_sampling(video_path, {'frame_diff': 30.0})['frame_diff'],
+    'ffmpeg': detect_by_ffmpeg,
+}
+
+
+def make_synthetic_video(video_path: str,
+                         width: int = 640,
+                         height: int = 360,
+                         fps: int = 25,
+                         duration: float = 30.0,
+                         scene_duration: float = 3.0,
+                         fade_duration: float = 1.0,
+                         seed: int = 0) -> Dict[str, list]:
+    """
+    生成带标注的合成视频：每个场景是随机纹理背景加若干运动的色块，
+    场景之间交替使用硬切和淡入淡出（交叉溶解）过渡
+
+    Args:
+        video_path: 输出视频路径
+        width: 宽度
+        height: 高度
+        fps: 帧率
+        duration: 时长（秒）
+        scene_duration: 每个场景的时长（秒）
+        fade_duration: 淡入淡出过渡的时长（秒）
+        seed: 随机种子
+
+    Returns:
+        标注信息，{'cuts': [硬切时间点], 'fades': [(过渡开始, 过渡结束)]}
+    """
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not writer.isOpened():
+        raise ValueError(f"无法创建视频文件: {video_path}")
+
+    total_frames = int(duration * fps)
+    scene_frames = max(2, int(scene_duration * fps))
+    fade_frames = max(1, int(fade_duration * fps))
+    scene_count = -(-total_frames // scene_frames) + 1
+
+    def make_scene():
+        # 低分辨率随机色块放大得到有结构的背景，再加上几个运动的色块
+        background = cv2.resize(rng.integers(0, 255, (9, 16, 3), dtype=np.uint8), (width, height),
+                                interpolation=cv2.INTER_CUBIC)
+        objects = [(rng.integers(0, width), rng.integers(0, height), rng.integers(-6, 7), rng.integers(-6, 7),
+                    tuple(int(c) for c in rng.integers(0, 255, 3))) for _ in range(3)]
+        return background, objects
+
+    def render(scene, frame_index):
+        background, objects = scene
+        frame = background.copy()
+        size = max(8, height // 10)
+        for x, y, dx, dy, color in objects:
+            cx = int(x + dx * frame_index) % width
+            cy = int(y + dy * frame_index) % height
+            cv2.rectangle(frame, (cx, cy), (cx + size, cy + size), color, -1)
+        return frame
+
+    scenes = [make_scene() for _ in range(scene_count)]
+    ground_truth = {'cuts': [], 'fades': []}
+    for boundary in range(1, scene_count):
+        start_frame = boundary * scene_frames
+        if start_frame >= total_frames:
+            break
+        if boundary % 2 == 1:
+            ground_truth['cuts'].append(start_frame / fps)
+        else:
+            end_frame = min(start_frame + fade_frames, total_frames)
+            ground_truth['fades'].append((start_frame / fps, end_frame / fps))
+
+    for frame_index in range(total_frames):
+        scene_index = frame_index // scene_frames
+        offset = frame_index - scene_index * scene_frames
+        frame = render(scenes[scene_index], frame_index)
+        # 偶数边界处与上一个场景做交叉溶解
+        if scene_index > 0 and scene_index % 2 == 0 and offset < fade_frames:
+            alpha = (offset + 1) / (fade_frames + 1)
+            frame = cv2.addWeighted(render(scenes[scene_index - 1], frame_index), 1 - alpha, frame, alpha, 0)
+        writer.write(frame)
+
+    writer.release()
+    return ground_truth
+
+
+def score_detections(detections: List[float], ground_truth: Dict[str, list],
+                     tolerance: float = 0.5) -> Dict[str, float]:
+    """
+    计算检测结果的准确率和召回率，每个标注事件最多匹配一个检测点，
+    硬切在 tolerance 秒内算命中，淡入淡出在过渡区间前后各放宽 tolerance 秒
+
+    Returns:
+        {'precision', 'recall', 'f1', 'true_positives', 'detections', 'events'}
+    """
+    events = [(t - tolerance, t + tolerance) for t in ground_truth.get('cuts', [])]
+    events += [(start - tolerance, end + tolerance) for start, end in ground_truth.get('fades', [])]
+    matched_events = set()
+    true_positives = 0
+    for detection in sorted(detections):
+        for event_index, (start, end) in enumerate(events):
+            if event_index not in matched_events and start <= detection <= end:
+                matched_events.add(event_index)
+                true_positives += 1
+                break
+
+    precision = true_positives / len(detections) if detections else 0.0
+    recall = true_positives / len(events) if events else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+    return {
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'true_positives': true_positives,
+        'detections': len(detections),
+        'events': len(events),
+    }
+
+
+def measure_decode(video_path: str) -> Tuple[int, float]:
+    """
+    只解码不分析，测量解码耗时
+
+    Returns:
+        (帧数, 耗时秒数)
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+    frames = 0
+    start_time = time.perf_counter()
+    while True:
+        ret, _ = cap.read()
+        if not ret:
+            break
+        frames += 1
+    elapsed = time.perf_counter() - start_time
+    cap.release()
+    return frames, elapsed
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """
+    当前进程的峰值内存（MB）。resource 模块只在类 Unix 系统上可用，Windows 下改用 psutil 的峰值工作集，
+    两者都不可用时返回 None
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        peak = getattr(psutil.Process().memory_info(), 'peak_wset', None)
+        return peak / (1024 * 1024) if peak is not None else None
+    # Linux 下 ru_maxrss 单位为 KB，macOS 下为字节
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_detector(detector_name: str, video_path: str) -> Tuple[List[float], float, Optional[float]]:
+    """
+    在独立子进程中运行检测方法，返回 (检测结果, 耗时秒数, 峰值内存 MB)，无法读取峰值内存时为 None
+    """
+    detector = DETECTORS[detector_name]
+    start_time = time.perf_counter()
+    detections = detector(video_path)
+    elapsed = time.perf_counter() - start_time
+    return detections, elapsed, _peak_rss_mb()
+
+
+def benchmark_video(video_path: str, ground_truth: Dict[str, list],
+                    detectors: Optional[List[str]] = None,
+                    tolerance: float = 0.5) -> List[dict]:
+    """
+    对一个视频运行各检测方法，每个检测方法在新的子进程中运行，保证峰值内存互不影响
+
+    Args:
+        video_path: 视频文件路径
+        ground_truth: make_synthetic_video 返回的标注信息
+        detectors: 检测方法名称列表，默认运行 DETECTORS 中的全部方法
+        tolerance: 判断命中的时间容差（秒）
+
+    Returns:
+        每个检测方法一条结果记录
+    """
+    detectors = detectors or list(DETECTORS.keys())
+    frames, decode_seconds = measure_decode(video_path)
+    decode_fps = frames / decode_seconds if decode_seconds > 0 else 0.0
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for detector_name in detectors:
+        with context.Pool(1) as pool:
+            detections, elapsed, peak_rss_mb = pool.apply(_run_detector, (detector_name, video_path))
+        # 检测总耗时减去纯解码耗时，近似为分析耗时
+        analysis_seconds = max(elapsed - decode_seconds, 1e-6)
+        record = {
+            'detector': detector_name,
+            'frames': frames,
+            'seconds': elapsed,
+            'fps': frames / elapsed if elapsed > 0 else 0.0,
+            'decode_fps': decode_fps,
+            'analysis_fps': frames / analysis_seconds,
+            'peak_rss_mb': peak_rss_mb,
+        }
+        record.update(score_detections(detections, ground_truth, tolerance))
+        peak_rss = f"{peak_rss_mb:.0f} MB" if peak_rss_mb is not None else "N/A"
+        log.info(f"{detector_name}: {record['fps']:.1f} fps, precision {record['precision']:.2f}, "
+                 f"recall {record['recall']:.2f}, peak rss {peak_rss}")
+        results.append(record)
+    return results
+
+
+def run_benchmark(resolutions: List[Tuple[int, int]],
+                  durations: List[float],
+                  detectors: Optional[List[str]] = None,
+                  fps: int = 25,
+                  tolerance: float = 0.5,
+                  work_dir: Optional[str] = None) -> dict:
+    """
+    生成不同分辨率、时长的合成视频并运行基准测试
+
+    Args:
+        resolutions: 分辨率列表，例如 [(640, 360), (1920, 1080)]
+        durations: 时长列表（秒）
+        detectors: 检测方法名称列表，默认全部
+        fps: 合成视频帧率
+        tolerance: 判断命中的时间容差（秒）
+        work_dir: 合成视频存放目录，默认使用临时目录并在结束后删除
+
+    Returns:
+        可直接序列化为 JSON 的结果，包含运行环境信息和每个视频、每个检测方法的结果
+    """
+    temp_dir = work_dir or tempfile.mkdtemp(prefix="scene_benchmark_")
+    os.makedirs(temp_dir, exist_ok=True)
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': [],
+    }
+    try:
+        for width, height in resolutions:
+            for duration in durations:
+                video_path = os.path.join(temp_dir, f"synthetic_{width}x{height}_{int(duration)}s.mp4")
+                ground_truth = make_synthetic_video(video_path, width, height, fps, duration)
+                log.info(f"基准测试视频: {video_path}")
+                for record in benchmark_video(video_path, ground_truth, detectors, tolerance):
+                    record.update(width=width, height=height, duration=duration)
+                    report['results'].append(record)
+    finally:
+        if work_dir is None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    return report
+
+
+def _parse_resolution(value: str) -> Tuple[int, int]:
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="转场检测基准测试")
+    parser.add_argument('--output', default='scene_benchmark.json', help="结果 JSON 文件路径")
+    parser.add_argument('--resolutions', default='640x360,1280x720,1920x1080', help="分辨率列表，逗号分隔")
+    parser.add_argument('--durations', default='30', help="时长列表（秒），逗号分隔")
+    parser.add_argument('--detectors', default=None, help=f"检测方法列表，逗号分隔，可选: {','.join(DETECTORS)}")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="判断命中的时间容差（秒）")
+    args = parser.parse_args()
+
+    benchmark_report = run_benchmark(
+        resolutions=[_parse_resolution(value) for value in args.resolutions.split(',')],
+        durations=[float(value) for value in args.durations.split(',')],
+        detectors=args.detectors.split(',') if args.detectors else None,
+        tolerance=args.tolerance
+    )
+    with open(args.output, 'w') as f:
+        json.dump(benchmark_report, f, indent=2, ensure_ascii=False)
+    log.info(f"基准测试结果已写入: {args.output}")
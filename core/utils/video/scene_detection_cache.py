@@ -0,0 +1,142 @@
+################################################################################
+# 转场检测逐帧得分序列缓存，调整阈值时无需重新解码视频
+################################################################################
+
+import hashlib
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .scene_detection_methods import (
+    FEATURE_PARAMS,
+    LK_PARAMS,
+    METRIC_FRAME_DIFF,
+    METRIC_HISTOGRAM,
+    METRIC_OPTICAL_FLOW,
+    SUPPORTED_METRICS,
+    compute_score_series,
+    scene_changes_from_series
+)
+from ..common.logger import log
+
+# 各指标的计算参数，参数变化后缓存自动失效
+METRIC_PARAMS = {
+    METRIC_FRAME_DIFF: "gray|gaussian(5,5)|absdiff-mean",
+    METRIC_HISTOGRAM: "hsv|bins(50,60)|minmax|correl",
+    METRIC_OPTICAL_FLOW: f"gray|{sorted(FEATURE_PARAMS.items())}|{sorted(LK_PARAMS.items())}",
+}
+
+# 计算内容哈希时读取的数据块大小
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def video_content_hash(video_path: str, block_size: int = HASH_BLOCK_SIZE) -> str:
+    """
+    计算视频内容哈希，使用文件大小加头、中、尾三个数据块，避免为了生成缓存 key 读完整个大文件
+
+    Args:
+        video_path: 视频文件路径
+        block_size: 每个数据块的大小
+
+    Returns:
+        十六进制哈希字符串
+    """
+    file_size = os.path.getsize(video_path)
+    sha1 = hashlib.sha1(str(file_size).encode())
+    with open(video_path, 'rb') as f:
+        if file_size <= block_size * 3:
+            sha1.update(f.read())
+        else:
+            for offset in (0, (file_size - block_size) // 2, file_size - block_size):
+                f.seek(offset)
+                sha1.update(f.read(block_size))
+    return sha1.hexdigest()
+
+
+def series_cache_path(video_path: str, metric: str, content_hash: str, cache_dir: Optional[str] = None) -> str:
+    """
+    得分序列缓存文件路径，默认与视频放在同一目录，文件名包含内容哈希和指标参数的哈希
+
+    Args:
+        video_path: 视频文件路径
+        metric: 指标名称
+        content_hash: 视频内容哈希
+        cache_dir: 缓存目录，默认为视频所在目录
+
+    Returns:
+        .npy 缓存文件路径
+    """
+    if cache_dir is None:
+        cache_dir = os.path.dirname(os.path.abspath(video_path))
+    params_hash = hashlib.sha1(METRIC_PARAMS[metric].encode()).hexdigest()[:8]
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(cache_dir, f".{video_name}.{metric}.{content_hash[:16]}.{params_hash}.npy")
+
+
+def load_score_series(video_path: str, metrics: Iterable[str],
+                      cache_dir: Optional[str] = None) -> Tuple[Dict[str, np.ndarray], float]:
+    """
+    读取各指标的逐帧得分序列，缓存中没有的指标一次解码全部算出并写入缓存
+
+    Args:
+        video_path: 视频文件路径
+        metrics: 需要的指标列表
+        cache_dir: 缓存目录，默认为视频所在目录
+
+    Returns:
+        (各指标的得分序列, 视频帧率)
+    """
+    metrics = list(metrics)
+    for metric in metrics:
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"不支持的检测指标: {metric}")
+
+    content_hash = video_content_hash(video_path)
+    cache_paths = {metric: series_cache_path(video_path, metric, content_hash, cache_dir) for metric in metrics}
+
+    series = {}
+    for metric, cache_path in cache_paths.items():
+        if os.path.exists(cache_path):
+            try:
+                series[metric] = np.load(cache_path)
+            except (OSError, ValueError) as e:
+                log.error(f"读取得分序列缓存失败，重新计算: {cache_path}, {str(e)}")
+
+    missing = [metric for metric in metrics if metric not in series]
+    if missing:
+        computed, fps = compute_score_series(video_path, missing)
+        for metric, values in computed.items():
+            cache_path = cache_paths[metric]
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            np.save(cache_path, values)
+            series[metric] = values
+            log.info(f"得分序列已缓存: {cache_path}")
+    else:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("无法打开视频文件")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+
+    return series, fps
+
+
+def detect_with_cache(video_path: str, thresholds: Dict[str, float], min_interval: float = 0.0,
+                      cache_dir: Optional[str] = None) -> Dict[str, List[float]]:
+    """
+    使用缓存的逐帧得分序列检测转场，首次调用需要完整解码一次，之后换阈值只需要做向量化比较
+
+    Args:
+        video_path: 视频文件路径
+        thresholds: 各指标的阈值，例如 {'frame_diff': 30.0}
+        min_interval: 相邻两个转场点的最小间隔（秒）
+        cache_dir: 缓存目录，默认为视频所在目录
+
+    Returns:
+        各指标检测到的转场时间点列表（以秒为单位）
+    """
+    series, fps = load_score_series(video_path, thresholds.keys(), cache_dir)
+    return {metric: scene_changes_from_series(metric, series[metric], fps, threshold, min_interval)
+            for metric, threshold in thresholds.items()}
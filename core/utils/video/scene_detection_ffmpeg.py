@@ -0,0 +1,131 @@
+################################################################################
+# 使用 ffmpeg 原生滤镜检测视频转场，解码和打分都在 ffmpeg 内部完成
+################################################################################
+
+import re
+import subprocess
+from typing import List, Optional
+
+from ..common.logger import log
+
+# showinfo 输出中的时间戳，例如 "pts_time:12.345"
+_SHOWINFO_TIME_PATTERN = re.compile(r'\bpts_time:\s*(-?\d+(?:\.\d+)?)')
+# scdet 输出中的时间戳，例如 "lavfi.scd.score: 33.493, lavfi.scd.time: 2"
+_SCDET_TIME_PATTERN = re.compile(r'lavfi\.scd\.time:\s*(-?\d+(?:\.\d+)?)')
+
+
+def build_ffmpeg_scene_command(video_path: str,
+                               threshold: float = 30.0,
+                               filter_name: str = 'select',
+                               scale_width: Optional[int] = 320,
+                               keyframes_only: bool = False,
+                               lowres: int = 0,
+                               threads: int = 0) -> List[str]:
+    """
+    生成 ffmpeg 转场检测命令
+
+    Args:
+        video_path: 视频文件路径
+        threshold: 转场阈值，取值范围 0-100，对应 select 滤镜 scene 分数的百分比或 scdet 滤镜的 threshold
+        filter_name: 检测滤镜，'select'（select='gt(scene,T)' + showinfo）或 'scdet'
+        scale_width: 打分前缩放到的宽度，为 None 时使用原分辨率
+        keyframes_only: 是否只解码关键帧（-skip_frame nokey），速度最快，但只能在关键帧上检测到转场
+        lowres: 解码器低分辨率解码级别（-lowres），只对支持的解码器生效，0 表示关闭
+        threads: 解码线程数，0 表示由 ffmpeg 自动选择
+
+    Returns:
+        ffmpeg 命令参数列表
+    """
+    filters = []
+    if scale_width:
+        filters.append(f"scale={scale_width}:-2")
+    if filter_name == 'select':
+        filters.append(f"select='gt(scene,{threshold / 100:.4f})'")
+        filters.append("showinfo")
+    elif filter_name == 'scdet':
+        filters.append(f"scdet=threshold={threshold}:sc_pass=0")
+    else:
+        raise ValueError(f"不支持的 ffmpeg 检测滤镜: {filter_name}")
+
+    command = ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'info']
+    # 解码选项需要放在 -i 之前
+    if keyframes_only:
+        command += ['-skip_frame', 'nokey']
+    if lowres:
+        command += ['-lowres', str(lowres)]
+    command += [
+        '-threads', str(threads),
+        '-i', video_path,
+        '-an', '-sn', '-dn',  # 只处理视频流
+        '-vf', ','.join(filters),
+        '-f', 'null', '-'
+    ]
+    return command
+
+
+def parse_scene_times(ffmpeg_output: str, filter_name: str = 'select') -> List[float]:
+    """
+    从 ffmpeg 的 stderr 输出中解析转场时间点
+
+    Args:
+        ffmpeg_output: ffmpeg stderr 输出
+        filter_name: 检测滤镜，'select' 或 'scdet'
+
+    Returns:
+        转场时间点列表（以秒为单位）
+    """
+    if filter_name == 'select':
+        pattern = _SHOWINFO_TIME_PATTERN
+        lines = (line for line in ffmpeg_output.splitlines() if 'showinfo' in line)
+    else:
+        pattern = _SCDET_TIME_PATTERN
+        lines = ffmpeg_output.splitlines()
+
+    scene_changes = []
+    for line in lines:
+        match = pattern.search(line)
+        if match:
+            scene_changes.append(float(match.group(1)))
+    return sorted(set(scene_changes))
+
+
+def detect_by_ffmpeg(video_path: str,
+                     threshold: float = 30.0,
+                     filter_name: str = 'select',
+                     scale_width: Optional[int] = 320,
+                     keyframes_only: bool = False,
+                     lowres: int = 0,
+                     threads: int = 0) -> List[float]:
+    """
+    使用 ffmpeg 的 select/scdet 滤镜检测场景变化
+    优点：解码和打分都在 ffmpeg 的 C 代码中完成，速度快
+    缺点：打分方式与 OpenCV 的各检测方法不同，阈值需要单独调整
+
+    Args:
+        video_path: 视频文件路径
+        threshold: 转场阈值（0-100），常用 30 左右（对应 scene 分数 0.3）
+        filter_name: 检测滤镜，'select' 或 'scdet'
+        scale_width: 打分前缩放到的宽度，为 None 时使用原分辨率
+        keyframes_only: 是否只解码关键帧
+        lowres: 解码器低分辨率解码级别
+        threads: 解码线程数
+
+    Returns:
+        转场时间点列表（以秒为单位）
+    """
+    command = build_ffmpeg_scene_command(video_path, threshold, filter_name, scale_width,
+                                         keyframes_only, lowres, threads)
+    log.info(f"使用 ffmpeg 检测转场: {' '.join(command)}")
+
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    stdout, stderr = process.communicate()
+
+    if process.returncode != 0:
+        raise Exception(f"FFmpeg 错误: {stderr}")
+
+    return parse_scene_times(stderr, filter_name)
@@ -1,177 +1,509 @@
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
 import cv2
 import numpy as np
 from tqdm import tqdm
 
+from ..common.logger import log
 
-def detect_by_frame_diff(video_path: str, threshold: float = 30.0) -> List[float]:
+
+# 支持的检测指标
+METRIC_FRAME_DIFF = 'frame_diff'
+METRIC_HISTOGRAM = 'histogram'
+METRIC_OPTICAL_FLOW = 'optical_flow'
+SUPPORTED_METRICS = (METRIC_FRAME_DIFF, METRIC_HISTOGRAM, METRIC_OPTICAL_FLOW)
+
+# ShiTomasi 角点检测参数
+FEATURE_PARAMS = dict(maxCorners=100,
+                      qualityLevel=0.3,
+                      minDistance=7,
+                      blockSize=7)
+
+# Lucas-Kanade 光流参数
+LK_PARAMS = dict(winSize=(15, 15),
+                 maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+
+def extract_frame_features(frame: np.ndarray, metrics: Iterable[str]) -> Dict[str, np.ndarray]:
     """
-    使用帧差法检测场景变化
-    优点：计算简单，速度快
-    缺点：对渐变场景不敏感
+    从一帧中提取各检测指标需要的特征，同一帧只做一次颜色空间转换
+
+    Args:
+        frame: BGR 帧
+        metrics: 需要计算的指标列表
+
+    Returns:
+        特征字典，key 为指标名称
+    """
+    features = {}
+    gray = None
+    if METRIC_FRAME_DIFF in metrics or METRIC_OPTICAL_FLOW in metrics:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    if METRIC_FRAME_DIFF in metrics:
+        # 转换为灰度图并进行高斯模糊，减少噪声
+        features[METRIC_FRAME_DIFF] = cv2.GaussianBlur(gray, (5, 5), 0)
+
+    if METRIC_HISTOGRAM in metrics:
+        # 计算HSV颜色空间的直方图
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [50, 60], [0, 180, 0, 256])
+        cv2.normalize(hist, hist, 0, 1, cv2.NORM_MINMAX)
+        features[METRIC_HISTOGRAM] = hist
+
+    if METRIC_OPTICAL_FLOW in metrics:
+        features[METRIC_OPTICAL_FLOW] = gray
+
+    return features
+
+
+def compute_metric_score(metric: str, prev_feature: np.ndarray, feature: np.ndarray) -> Optional[float]:
+    """
+    计算相邻两帧在某个指标上的得分
+
+    Args:
+        metric: 指标名称
+        prev_feature: 上一帧的特征
+        feature: 当前帧的特征
+
+    Returns:
+        得分，帧差法为平均差异，直方图法为相似度，光流法为平均移动距离；无法计算时返回 None
+    """
+    if metric == METRIC_FRAME_DIFF:
+        # 计算帧间差异
+        diff = cv2.absdiff(feature, prev_feature)
+        return float(np.mean(diff))
+
+    if metric == METRIC_HISTOGRAM:
+        # 计算直方图相似度
+        return float(cv2.compareHist(feature, prev_feature, cv2.HISTCMP_CORREL))
+
+    if metric == METRIC_OPTICAL_FLOW:
+        # 检测特征点
+        p0 = cv2.goodFeaturesToTrack(prev_feature, mask=None, **FEATURE_PARAMS)
+        if p0 is None:
+            return None
+
+        # 计算光流
+        p1, st, err = cv2.calcOpticalFlowPyrLK(prev_feature, feature, p0, None, **LK_PARAMS)
+        if p1 is None:
+            return None
+
+        # 选择好的点
+        good_new = p1[st == 1]
+        good_old = p0[st == 1]
+        if len(good_new) == 0 or len(good_old) == 0:
+            return None
+
+        # 计算点的平均移动距离
+        distances = np.sqrt(np.sum((good_new - good_old) ** 2, axis=1))
+        return float(np.mean(distances))
+
+    raise ValueError(f"不支持的检测指标: {metric}")
+
+
+def is_scene_change(metric: str, score: Optional[float], threshold: float) -> bool:
+    """
+    根据指标得分判断是否为转场点，直方图法相似度低于阈值为转场，其余指标高于阈值为转场
+    """
+    if score is None:
+        return False
+    if metric == METRIC_HISTOGRAM:
+        return score < threshold
+    return score > threshold
+
+
+def compute_score_series(video_path: str, metrics: Iterable[str],
+                         desc: str = "计算视频逐帧指标") -> Tuple[Dict[str, np.ndarray], float]:
     """
+    单次解码计算各指标的逐帧得分序列，第 i 个元素为第 i-1 帧与第 i 帧之间的得分
+
+    Args:
+        video_path: 视频文件路径
+        metrics: 需要计算的指标列表
+        desc: 进度条描述
+
+    Returns:
+        (各指标的得分序列, 视频帧率)，无法计算得分的位置（包括第 0 帧）为 NaN
+    """
+    metrics = list(metrics)
+    for metric in metrics:
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"不支持的检测指标: {metric}")
+
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise ValueError("无法打开视频文件")
-    
+
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    prev_frame = None
-    scene_changes = []
-    
-    for frame_count in tqdm(range(total_frames), desc="检测视频转场-帧差法", position=0):
+    prev_features = None
+    series = {metric: np.full(total_frames, np.nan) for metric in metrics}
+    read_frames = 0
+
+    for frame_count in tqdm(range(total_frames), desc=desc, position=0):
         ret, frame = cap.read()
         if not ret:
             break
-            
-        # 转换为灰度图并进行高斯模糊，减少噪声
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (5, 5), 0)
-        
-        if prev_frame is not None:
-            # 计算帧间差异
-            diff = cv2.absdiff(gray, prev_frame)
-            mean_diff = np.mean(diff)
-            
-            # 如果差异大于阈值，认为是转场点
-            if mean_diff > threshold:
-                time_point = frame_count / fps
-                scene_changes.append(time_point)
-        
-        prev_frame = gray
-    
+        read_frames += 1
+
+        features = extract_frame_features(frame, metrics)
+
+        if prev_features is not None:
+            for metric in metrics:
+                score = compute_metric_score(metric, prev_features[metric], features[metric])
+                if score is not None:
+                    series[metric][frame_count] = score
+
+        prev_features = features
+
     cap.release()
-    return scene_changes
+    return {metric: values[:read_frames] for metric, values in series.items()}, fps
 
 
-def detect_by_histogram(video_path: str, threshold: float = 0.5) -> List[float]:
+def scene_changes_from_series(metric: str, series: np.ndarray, fps: float, threshold: float,
+                              min_interval: float = 0.0) -> List[float]:
     """
-    使用直方图比较法检测场景变化
-    优点：对光照变化不敏感
-    缺点：可能会漏检一些细微的场景变化
+    对逐帧得分序列做向量化阈值判断，得到转场时间点
+
+    Args:
+        metric: 指标名称
+        series: 逐帧得分序列
+        fps: 视频帧率
+        threshold: 阈值，直方图法相似度低于阈值为转场，其余指标高于阈值为转场
+        min_interval: 相邻两个转场点的最小间隔（秒），间隔过小的后一个转场点会被丢弃
+
+    Returns:
+        转场时间点列表（以秒为单位）
     """
+    # NaN 与任何值比较都为 False，不会被判断为转场
+    with np.errstate(invalid='ignore'):
+        if metric == METRIC_HISTOGRAM:
+            mask = series < threshold
+        else:
+            mask = series > threshold
+    scene_changes = (np.flatnonzero(mask) / fps).tolist()
+
+    if min_interval <= 0 or not scene_changes:
+        return scene_changes
+
+    kept = [scene_changes[0]]
+    for scene in scene_changes[1:]:
+        if scene - kept[-1] >= min_interval:
+            kept.append(scene)
+    return kept
+
+
+def detect_by_metrics(video_path: str, thresholds: Dict[str, float],
+                      desc: str = "检测视频转场-单次解码") -> Dict[str, List[float]]:
+    """
+    单次解码同时计算多种指标检测场景变化，每一帧只解码一次
+
+    Args:
+        video_path: 视频文件路径
+        thresholds: 各指标的阈值，例如 {'frame_diff': 30.0, 'histogram': 0.5}，只计算其中出现的指标
+        desc: 进度条描述
+
+    Returns:
+        各指标检测到的转场时间点列表（以秒为单位）
+    """
+    series, fps = compute_score_series(video_path, thresholds.keys(), desc=desc)
+    return {metric: scene_changes_from_series(metric, series[metric], fps, threshold)
+            for metric, threshold in thresholds.items()}
+
+
+def resize_frame(frame: np.ndarray, resize_width: Optional[int]) -> Tuple[np.ndarray, float]:
+    """
+    按指定宽度等比缩放帧，宽度为空或不小于原宽度时不缩放
+
+    Returns:
+        (缩放后的帧, 缩放比例)
+    """
+    height, width = frame.shape[:2]
+    if not resize_width or resize_width >= width:
+        return frame, 1.0
+    scale = resize_width / width
+    resized = cv2.resize(frame, (resize_width, max(1, int(round(height * scale)))), interpolation=cv2.INTER_AREA)
+    return resized, scale
+
+
+def detect_by_sampling(video_path: str, thresholds: Dict[str, float],
+                       stride: int = 5,
+                       resize_width: Optional[int] = 320,
+                       desc: str = "检测视频转场-抽帧粗检") -> Dict[str, List[float]]:
+    """
+    由粗到细的抽帧检测：
+    1. 粗检：每隔 stride 帧取一帧（跳过的帧只 grab 不解码为图像），缩放到 resize_width 后计算指标，
+       任一指标超过阈值的相邻采样区间作为候选区间
+    2. 精检：只在候选区间内按原分辨率逐帧计算，得到精确到帧的转场点
+    相比逐帧检测，长视频上可以快很多，代价是两个采样点之间变化不明显的转场可能漏检
+
+    Args:
+        video_path: 视频文件路径
+        thresholds: 各指标的阈值，例如 {'frame_diff': 30.0}
+        stride: 抽帧间隔（帧数），1 表示每帧都参与粗检
+        resize_width: 粗检的工作分辨率宽度，为 None 时使用原分辨率
+        desc: 进度条描述
+
+    Returns:
+        各指标检测到的转场时间点列表（以秒为单位）
+    """
+    metrics = list(thresholds.keys())
+    for metric in metrics:
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"不支持的检测指标: {metric}")
+    if stride < 1:
+        raise ValueError(f"抽帧间隔必须大于等于1: {stride}")
+
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise ValueError("无法打开视频文件")
-    
+
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    prev_hist = None
-    scene_changes = []
-    
-    for frame_count in tqdm(range(total_frames), desc="检测视频转场-直方图法", position=0):
-        ret, frame = cap.read()
-        if not ret:
-            break
-            
-        # 计算HSV颜色空间的直方图
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        hist = cv2.calcHist([hsv], [0, 1], None, [50, 60], [0, 180, 0, 256])
-        cv2.normalize(hist, hist, 0, 1, cv2.NORM_MINMAX)
-        
-        if prev_hist is not None:
-            # 计算直方图相似度
-            similarity = cv2.compareHist(hist, prev_hist, cv2.HISTCMP_CORREL)
-            
-            # 如果相似度低于阈值，认为是转场点
-            if similarity < threshold:
-                time_point = frame_count / fps
-                scene_changes.append(time_point)
-        
-        prev_hist = hist
-    
+
+    # 1. 粗检，找出候选区间
+    windows = []
+    prev_features = None
+    prev_index = None
+    with tqdm(total=total_frames, desc=desc, position=0) as progress:
+        for frame_index in range(total_frames):
+            # 最后一帧也参与采样，保证尾部区间被覆盖
+            sampled = frame_index % stride == 0 or frame_index == total_frames - 1
+            if not cap.grab():
+                break
+            progress.update(1)
+            if not sampled:
+                continue
+
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            frame, scale = resize_frame(frame, resize_width)
+            features = extract_frame_features(frame, metrics)
+
+            if prev_features is not None:
+                for metric in metrics:
+                    threshold = thresholds[metric]
+                    # 光流的移动距离随分辨率缩放，阈值同比例缩放
+                    if metric == METRIC_OPTICAL_FLOW:
+                        threshold = threshold * scale
+                    score = compute_metric_score(metric, prev_features[metric], features[metric])
+                    if is_scene_change(metric, score, threshold):
+                        # 与上一个候选区间相连时直接合并
+                        if windows and windows[-1][1] >= prev_index:
+                            windows[-1] = (windows[-1][0], frame_index)
+                        else:
+                            windows.append((prev_index, frame_index))
+                        break
+
+            prev_features = features
+            prev_index = frame_index
+
+    # 2. 精检，只在候选区间内逐帧计算
+    scene_changes = {metric: [] for metric in metrics}
+    for start_index, end_index in windows:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_index)
+        prev_features = None
+        for frame_index in range(start_index, end_index + 1):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            features = extract_frame_features(frame, metrics)
+            if prev_features is not None:
+                for metric in metrics:
+                    score = compute_metric_score(metric, prev_features[metric], features[metric])
+                    if is_scene_change(metric, score, thresholds[metric]):
+                        scene_changes[metric].append(frame_index / fps)
+            prev_features = features
+
     cap.release()
+    log.info(f"抽帧检测完成，粗检候选区间 {len(windows)} 个，共 {sum(e - s for s, e in windows)} 帧需要精检")
     return scene_changes
 
 
+def detect_by_frame_diff(video_path: str, threshold: float = 30.0) -> List[float]:
+    """
+    使用帧差法检测场景变化
+    优点：计算简单，速度快
+    缺点：对渐变场景不敏感
+    """
+    return detect_by_metrics(video_path, {METRIC_FRAME_DIFF: threshold},
+                             desc="检测视频转场-帧差法")[METRIC_FRAME_DIFF]
+
+
+def detect_by_histogram(video_path: str, threshold: float = 0.5) -> List[float]:
+    """
+    使用直方图比较法检测场景变化
+    优点：对光照变化不敏感
+    缺点：可能会漏检一些细微的场景变化
+    """
+    return detect_by_metrics(video_path, {METRIC_HISTOGRAM: threshold},
+                             desc="检测视频转场-直方图法")[METRIC_HISTOGRAM]
+
+
 def detect_by_optical_flow(video_path: str, threshold: float = 0.3) -> List[float]:
     """
     使用光流法检测场景变化
     优点：可以检测运动变化，对渐变场景敏感
     缺点：计算量较大
     """
+    return detect_by_metrics(video_path, {METRIC_OPTICAL_FLOW: threshold},
+                             desc="检测视频转场-光流法")[METRIC_OPTICAL_FLOW]
+
+
+# 8 位整数的 1 的个数查找表，numpy 不支持 bitwise_count 时用于计算 popcount
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def compute_frame_hash(frame: np.ndarray, hash_type: str = 'dhash') -> int:
+    """
+    计算一帧的 64 位感知哈希
+
+    Args:
+        frame: BGR 帧
+        hash_type: 哈希类型，可选值：
+                   - 'dhash': 差异哈希，缩放到 9x8 后比较相邻像素的亮度
+                   - 'phash': 感知哈希，缩放到 32x32 后取 DCT 低频 8x8 与中位数比较
+
+    Returns:
+        64 位哈希值
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if hash_type == 'dhash':
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = small[:, 1:] > small[:, :-1]
+    elif hash_type == 'phash':
+        small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA)
+        low_freq = cv2.dct(np.float32(small))[:8, :8]
+        # 中位数不包含直流分量
+        bits = low_freq > np.median(low_freq.flatten()[1:])
+    else:
+        raise ValueError(f"不支持的哈希类型: {hash_type}")
+    return int(np.packbits(bits.flatten()).view('>u8')[0])
+
+
+def hamming_distances(hashes: np.ndarray) -> np.ndarray:
+    """
+    向量化计算相邻两个 64 位哈希之间的汉明距离
+
+    Args:
+        hashes: uint64 哈希数组
+
+    Returns:
+        长度为 len(hashes) - 1 的汉明距离数组，第 i 个元素为第 i 帧与第 i+1 帧之间的距离
+    """
+    xor = np.bitwise_xor(hashes[1:], hashes[:-1])
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(xor)
+    return _POPCOUNT_TABLE[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def compute_hash_series(video_path: str, hash_type: str = 'dhash') -> Tuple[np.ndarray, float]:
+    """
+    计算视频逐帧的 64 位感知哈希，每帧只占 8 字节
+
+    Returns:
+        (uint64 哈希数组, 视频帧率)
+    """
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise ValueError("无法打开视频文件")
-    
+
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    prev_frame = None
-    scene_changes = []
-    
-    # ShiTomasi 角点检测参数
-    feature_params = dict(maxCorners=100,
-                         qualityLevel=0.3,
-                         minDistance=7,
-                         blockSize=7)
-    
-    # Lucas-Kanade 光流参数
-    lk_params = dict(winSize=(15, 15),
-                     maxLevel=2,
-                     criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
-    
-    for frame_count in tqdm(range(total_frames), desc="检测视频转场-光流法", position=0):
+    hashes = np.zeros(total_frames, dtype=np.uint64)
+    read_frames = 0
+
+    for frame_count in tqdm(range(total_frames), desc="检测视频转场-感知哈希法", position=0):
         ret, frame = cap.read()
         if not ret:
             break
-            
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        if prev_frame is not None:
-            # 检测特征点
-            p0 = cv2.goodFeaturesToTrack(prev_frame, mask=None, **feature_params)
-            
-            if p0 is not None:
-                # 计算光流
-                p1, st, err = cv2.calcOpticalFlowPyrLK(prev_frame, gray, p0, None, **lk_params)
-                
-                if p1 is not None:
-                    # 选择好的点
-                    good_new = p1[st==1]
-                    good_old = p0[st==1]
-                    
-                    # 计算点的平均移动距离
-                    if len(good_new) > 0 and len(good_old) > 0:
-                        distances = np.sqrt(np.sum((good_new - good_old) ** 2, axis=1))
-                        avg_movement = np.mean(distances)
-                        
-                        # 如果平均移动距离大于阈值，认为是转场点
-                        if avg_movement > threshold:
-                            time_point = frame_count / fps
-                            scene_changes.append(time_point)
-        
-        prev_frame = gray
-    
+        hashes[frame_count] = compute_frame_hash(frame, hash_type)
+        read_frames += 1
+
     cap.release()
-    return scene_changes
+    return hashes[:read_frames], fps
 
 
-def detect_combined(video_path: str, 
-                   frame_diff_threshold: float = 30.0,
-                   hist_threshold: float = 0.5) -> List[float]:
+def detect_by_phash(video_path: str, threshold: float = 12, hash_type: str = 'dhash') -> List[float]:
     """
-    组合多种方法检测场景变化
-    优点：结合多种方法的优势，检测更准确
-    缺点：计算量增加
+    使用感知哈希法检测场景变化
+    优点：每帧只保留 64 位哈希，比较只需要异或和 popcount，打分成本远低于整帧差分和直方图
+    缺点：只对画面结构的明显变化敏感，对细微变化和渐变不敏感
+
+    Args:
+        video_path: 视频文件路径
+        threshold: 汉明距离阈值（0-64），相邻帧哈希的汉明距离大于阈值认为是转场点
+        hash_type: 哈希类型，'dhash' 或 'phash'
+
+    Returns:
+        转场时间点列表（以秒为单位）
     """
-    # 获取各种方法的结果
-    frame_diff_scenes = detect_by_frame_diff(video_path, frame_diff_threshold)
-    hist_scenes = detect_by_histogram(video_path, hist_threshold)
-    
-    # 合并结果
-    all_scenes = sorted(set(frame_diff_scenes + hist_scenes))
-    
+    hashes, fps = compute_hash_series(video_path, hash_type)
+    distances = hamming_distances(hashes)
+    return ((np.flatnonzero(distances > threshold) + 1) / fps).tolist()
+
+
+def merge_scene_changes(scene_changes: List[float], min_interval: float = 1.0) -> List[float]:
+    """
+    合并相近的转场时间点
+
+    Args:
+        scene_changes: 转场时间点列表，可以无序、重复
+        min_interval: 间隔小于等于该值（秒）的转场点会被合并为它们的平均值
+
+    Returns:
+        合并后的转场时间点列表
+    """
+    all_scenes = sorted(set(scene_changes))
+
     # 合并相近的时间点（比如1秒内的多个检测点）
     merged_scenes = []
     if all_scenes:
         current_scene = all_scenes[0]
         for scene in all_scenes[1:]:
-            if scene - current_scene > 1.0:  # 如果间隔大于1秒
+            if scene - current_scene > min_interval:  # 如果间隔大于阈值
                 merged_scenes.append(current_scene)
                 current_scene = scene
             else:
                 # 取平均值
                 current_scene = (current_scene + scene) / 2
         merged_scenes.append(current_scene)
-    
-    return merged_scenes
\ No newline at end of file
+
+    return merged_scenes
+
+
+def detect_combined(video_path: str,
+                   frame_diff_threshold: Optional[float] = 30.0,
+                   hist_threshold: Optional[float] = 0.5,
+                   optical_flow_threshold: Optional[float] = None) -> List[float]:
+    """
+    组合多种方法检测场景变化，所有指标在同一次解码中计算
+    优点：结合多种方法的优势，检测更准确
+    缺点：计算量增加
+
+    Args:
+        video_path: 视频文件路径
+        frame_diff_threshold: 帧差法阈值，为 None 时不启用帧差法
+        hist_threshold: 直方图法阈值，为 None 时不启用直方图法
+        optical_flow_threshold: 光流法阈值，为 None 时不启用光流法（默认不启用）
+    """
+    thresholds = {}
+    if frame_diff_threshold is not None:
+        thresholds[METRIC_FRAME_DIFF] = frame_diff_threshold
+    if hist_threshold is not None:
+        thresholds[METRIC_HISTOGRAM] = hist_threshold
+    if optical_flow_threshold is not None:
+        thresholds[METRIC_OPTICAL_FLOW] = optical_flow_threshold
+    if not thresholds:
+        raise ValueError("至少需要启用一种检测指标")
+
+    # 获取各种方法的结果
+    results = detect_by_metrics(video_path, thresholds, desc="检测视频转场-组合方法")
+
+    # 合并结果
+    all_scenes = []
+    for scenes in results.values():
+        all_scenes.extend(scenes)
+    return merge_scene_changes(all_scenes)
@@ -0,0 +1,110 @@
+################################################################################
+# 快速光流法检测视频转场：特征点跨帧跟踪 + 低分辨率计算
+################################################################################
+
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+from .scene_detection_methods import FEATURE_PARAMS, LK_PARAMS, resize_frame
+from ..common.logger import log
+
+# Farneback 稠密光流参数
+FARNEBACK_PARAMS = dict(pyr_scale=0.5,
+                        levels=3,
+                        winsize=15,
+                        iterations=3,
+                        poly_n=5,
+                        poly_sigma=1.2,
+                        flags=0)
+
+
+def detect_by_optical_flow_fast(video_path: str,
+                                threshold: float = 0.3,
+                                resize_width: Optional[int] = 320,
+                                min_tracked_ratio: float = 0.5,
+                                dense: bool = False,
+                                stats: Optional[Dict[str, float]] = None) -> List[float]:
+    """
+    快速光流法检测场景变化，与 detect_by_optical_flow 的判断方式一致（特征点平均移动距离大于阈值），但：
+    1. 特征点跨帧持续跟踪，只有跟踪丢失的点过多时才重新检测角点（转场处大部分点会跟踪失败，随之重新检测）
+    2. 在缩放到 resize_width 的低分辨率图像上计算光流，移动距离按缩放比例换算回原分辨率，阈值含义不变
+    3. dense=True 时使用低分辨率 Farneback 稠密光流，取全图平均移动距离
+
+    Args:
+        video_path: 视频文件路径
+        threshold: 平均移动距离阈值（原分辨率像素）
+        resize_width: 计算光流的工作分辨率宽度，为 None 时使用原分辨率
+        min_tracked_ratio: 跟踪成功的点数低于上次检测角点数的该比例时重新检测角点
+        dense: 是否使用 Farneback 稠密光流
+        stats: 传入字典时写入处理帧数、耗时、处理帧率，便于和帧差法对比速度
+
+    Returns:
+        转场时间点列表（以秒为单位）
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    prev_gray = None
+    prev_points = None
+    seeded_points = 0
+    scene_changes = []
+    reseed_count = 0
+    processed_frames = 0
+    start_time = time.time()
+
+    for frame_count in tqdm(range(total_frames), desc="检测视频转场-快速光流法", position=0):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        processed_frames += 1
+
+        frame, scale = resize_frame(frame, resize_width)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        if prev_gray is not None:
+            avg_movement = None
+            if dense:
+                flow = cv2.calcOpticalFlowFarneback(prev_gray, gray, None, **FARNEBACK_PARAMS)
+                avg_movement = float(np.mean(np.linalg.norm(flow, axis=2))) / scale
+            else:
+                # 跟踪丢失的点过多时才重新检测角点
+                if prev_points is None or len(prev_points) == 0 or len(prev_points) < seeded_points * min_tracked_ratio:
+                    prev_points = cv2.goodFeaturesToTrack(prev_gray, mask=None, **FEATURE_PARAMS)
+                    seeded_points = 0 if prev_points is None else len(prev_points)
+                    reseed_count += 1
+
+                if prev_points is not None and len(prev_points) > 0:
+                    p1, st, err = cv2.calcOpticalFlowPyrLK(prev_gray, gray, prev_points, None, **LK_PARAMS)
+                    if p1 is not None:
+                        good_new = p1[st == 1]
+                        good_old = prev_points[st == 1]
+                        if len(good_new) > 0:
+                            distances = np.sqrt(np.sum((good_new - good_old) ** 2, axis=1))
+                            avg_movement = float(np.mean(distances)) / scale
+                        # 只保留跟踪成功的点，下一帧继续跟踪
+                        prev_points = good_new.reshape(-1, 1, 2)
+                    else:
+                        prev_points = None
+
+            if avg_movement is not None and avg_movement > threshold:
+                scene_changes.append(frame_count / fps)
+
+        prev_gray = gray
+
+    cap.release()
+
+    elapsed = time.time() - start_time
+    processing_fps = processed_frames / elapsed if elapsed > 0 else 0.0
+    log.info(f"快速光流法处理 {processed_frames} 帧，耗时 {elapsed:.2f} 秒，处理帧率 {processing_fps:.1f} fps，"
+             f"重新检测角点 {reseed_count} 次")
+    if stats is not None:
+        stats.update(frames=processed_frames, seconds=elapsed, fps=processing_fps, reseeds=reseed_count)
+
+    return scene_changes
@@ -0,0 +1,153 @@
+################################################################################
+# 多进程分段检测视频转场
+################################################################################
+
+import bisect
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+from tqdm import tqdm
+
+from .scene_detection_methods import (
+    SUPPORTED_METRICS,
+    extract_frame_features,
+    compute_metric_score,
+    is_scene_change
+)
+from .video_index import keyframe_frames, load_video_index
+from ..common.logger import log
+
+
+def _init_worker():
+    # 每个进程内 OpenCV 只用单线程，避免多进程 x 多线程导致 CPU 过载
+    cv2.setNumThreads(1)
+
+
+def _detect_chunk(video_path: str, thresholds: Dict[str, float],
+                  start_index: int, end_index: int) -> Dict[str, List[int]]:
+    """
+    在子进程中检测 [start_index, end_index) 区间内的转场帧
+
+    Args:
+        video_path: 视频文件路径
+        thresholds: 各指标的阈值
+        start_index: 起始帧（包含重叠部分）
+        end_index: 结束帧（不包含）
+
+    Returns:
+        各指标检测到的转场帧序号列表
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+
+    metrics = list(thresholds.keys())
+    scene_frames = {metric: [] for metric in metrics}
+    prev_features = None
+
+    # 直接跳转到分段起始帧
+    if start_index > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_index)
+
+    for frame_index in range(start_index, end_index):
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        features = extract_frame_features(frame, metrics)
+        if prev_features is not None:
+            for metric in metrics:
+                score = compute_metric_score(metric, prev_features[metric], features[metric])
+                if is_scene_change(metric, score, thresholds[metric]):
+                    scene_frames[metric].append(frame_index)
+        prev_features = features
+
+    cap.release()
+    return scene_frames
+
+
+def split_chunks(total_frames: int, chunk_frames: int, overlap_frames: int = 1,
+                 keyframes: Optional[List[int]] = None) -> List[Tuple[int, int]]:
+    """
+    将视频按帧数切成若干分段，每个分段向前重叠 overlap_frames 帧，保证分段边界上的相邻帧对也会被计算
+
+    指定 keyframes（关键帧的帧序号列表）时，分段起点对齐到不晚于原起点的关键帧，子进程跳转后无需从前一个关键帧解码到起点；
+    此时改为每个分段向后多读 overlap_frames 帧来覆盖分段边界
+
+    Returns:
+        分段列表，每个元素为 (起始帧, 结束帧)，结束帧不包含；没有帧时返回空列表
+    """
+    if total_frames <= 0:
+        return []
+    chunk_frames = max(1, chunk_frames)
+    overlap_frames = max(1, overlap_frames)
+    if keyframes:
+        starts = []
+        for chunk_start in range(0, total_frames, chunk_frames):
+            position = bisect.bisect_right(keyframes, chunk_start) - 1
+            start = keyframes[position] if position >= 0 else 0
+            if not starts or start > starts[-1]:
+                starts.append(start)
+        starts[0] = 0
+        return [(start, min(end + overlap_frames, total_frames))
+                for start, end in zip(starts, starts[1:] + [total_frames])]
+
+    chunks = []
+    for chunk_start in range(0, total_frames, chunk_frames):
+        chunk_end = min(chunk_start + chunk_frames, total_frames)
+        chunks.append((max(0, chunk_start - overlap_frames), chunk_end))
+    return chunks
+
+
+def detect_by_chunks(video_path: str, thresholds: Dict[str, float],
+                     workers: Optional[int] = None,
+                     chunk_seconds: Optional[float] = None,
+                     overlap_frames: int = 1,
+                     use_index: bool = True) -> Dict[str, List[float]]:
+    """
+    将视频按时间切成多个分段，由进程池并行检测，再合并各分段结果
+
+    Args:
+        video_path: 视频文件路径
+        thresholds: 各指标的阈值，例如 {'frame_diff': 30.0}
+        workers: 进程数，默认使用全部 CPU 核数
+        chunk_seconds: 每个分段的时长（秒），默认按进程数的 4 倍均分，便于负载均衡
+        overlap_frames: 相邻分段的重叠帧数，重叠部分的检测结果在合并时去重
+        use_index: 是否使用关键帧索引（视频同目录下的 .index.json 文件）将分段起点对齐到关键帧
+
+    Returns:
+        各指标检测到的转场时间点列表（以秒为单位）
+    """
+    for metric in thresholds:
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"不支持的检测指标: {metric}")
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    workers = workers or os.cpu_count() or 1
+    if chunk_seconds:
+        chunk_frames = int(chunk_seconds * fps)
+    else:
+        chunk_frames = -(-total_frames // (workers * 4))
+    keyframes = keyframe_frames(load_video_index(video_path)) if use_index else None
+    chunks = split_chunks(total_frames, chunk_frames, overlap_frames, keyframes)
+    log.info(f"并行检测转场，进程数: {workers}，分段数: {len(chunks)}")
+
+    # 按帧序号合并，重叠区域重复检测到的转场点自动去重
+    scene_frames = {metric: set() for metric in thresholds}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [executor.submit(_detect_chunk, video_path, thresholds, start_index, end_index)
+                   for start_index, end_index in chunks]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="检测视频转场-并行分段", position=0):
+            for metric, frames in future.result().items():
+                scene_frames[metric].update(frames)
+
+    return {metric: [frame_index / fps for frame_index in sorted(frames)]
+            for metric, frames in scene_frames.items()}
@@ -0,0 +1,188 @@
+################################################################################
+# 流式转场检测：以生成器的方式边检测边返回转场时间点
+################################################################################
+
+import queue
+import re
+from collections import deque
+import subprocess
+import threading
+from typing import Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .scene_detection_methods import (
+    SUPPORTED_METRICS,
+    extract_frame_features,
+    compute_metric_score,
+    is_scene_change
+)
+from ..common.logger import log
+
+# showinfo 输出中的时间戳，例如 "pts_time:12.345"
+_SHOWINFO_TIME_PATTERN = re.compile(r'\bpts_time:\s*(-?\d+(?:\.\d+)?)')
+
+# ffmpeg 异常退出时错误信息保留的 stderr 行数
+_STDERR_TAIL_LINES = 20
+
+# follow 模式下 rw_timeout 到期时 ffmpeg 输出的读取错误（EIO / ETIMEDOUT），这种退出表示文件写入结束
+_FOLLOW_TIMEOUT_PATTERN = re.compile(r'Input/output error|timed out', re.IGNORECASE)
+
+
+def iter_video_frames(video_path: str) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    使用 OpenCV 逐帧读取普通视频文件
+
+    Returns:
+        生成 (时间戳秒数, BGR 帧)
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame_count / fps, frame
+            frame_count += 1
+    finally:
+        cap.release()
+
+
+def iter_ffmpeg_frames(source: str,
+                       frame_size: Tuple[int, int] = (320, 180),
+                       follow: bool = False,
+                       idle_timeout: float = 30.0) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    使用 ffmpeg 解码为固定尺寸的原始帧，支持管道和仍在写入的文件
+
+    Args:
+        source: 视频来源，可以是文件路径、命名管道路径，或 '-' 表示从当前进程的标准输入读取
+        frame_size: 输出帧的 (宽, 高)，统一缩放后无需事先探测视频尺寸
+        follow: 文件仍在写入时设为 True，读到文件末尾后继续等待新数据（需要 mkv、ts、分片 mp4 等可流式读取的格式）
+        idle_timeout: follow 模式下超过该秒数没有新数据则认为文件写入结束
+
+    Returns:
+        生成 (时间戳秒数, BGR 帧)，时间戳来自 showinfo 输出的 pts_time
+    """
+    width, height = frame_size
+    command = ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'info']
+    if source == '-':
+        command += ['-i', 'pipe:0']
+    elif follow:
+        # file 协议的 follow 选项会在文件末尾重试读取，rw_timeout（微秒）控制等待新数据的最长时间
+        command += ['-follow', '1', '-rw_timeout', str(int(idle_timeout * 1000000)), '-i', f"file:{source}"]
+    else:
+        command += ['-i', source]
+    command += [
+        '-an', '-sn', '-dn',
+        '-vf', f"scale={width}:{height},showinfo",
+        # 按解码出的帧原样输出，不为了恒定帧率复制或丢弃帧，保证原始帧与 showinfo 的时间戳一一对应（可变帧率视频）
+        '-fps_mode', 'passthrough',
+        '-pix_fmt', 'bgr24',
+        '-f', 'rawvideo', '-'
+    ]
+
+    process = subprocess.Popen(
+        command,
+        stdin=None if source == '-' else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+    # 在后台线程中读取 stderr，按顺序取出每一帧的时间戳，同时避免 stderr 缓冲区写满阻塞 ffmpeg；
+    # 其余输出只保留最后几行，ffmpeg 异常退出时作为错误信息
+    timestamps = queue.Queue()
+    stderr_tail = deque(maxlen=_STDERR_TAIL_LINES)
+
+    def read_stderr():
+        for raw_line in process.stderr:
+            line = raw_line.decode('utf-8', errors='replace')
+            match = _SHOWINFO_TIME_PATTERN.search(line) if 'showinfo' in line else None
+            if match:
+                timestamps.put(float(match.group(1)))
+            elif line.strip():
+                stderr_tail.append(line.strip())
+        timestamps.put(None)
+
+    stderr_thread = threading.Thread(target=read_stderr, name="ffmpeg-stderr", daemon=True)
+    stderr_thread.start()
+
+    frame_bytes = width * height * 3
+    frame_count = 0
+    finished = False
+    try:
+        while True:
+            data = process.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            timestamp = timestamps.get()
+            if timestamp is None:
+                # stderr 已经结束却还有原始帧，帧与时间戳无法对应，继续读取会把时间戳错配给后面的帧
+                raise Exception("FFmpeg 输出的帧没有对应的 showinfo 时间戳")
+            frame_count += 1
+            yield timestamp, np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+        finished = True
+    finally:
+        # 调用方提前停止迭代时结束 ffmpeg，正常读完时等待 ffmpeg 退出以取得返回码
+        if not finished and process.poll() is None:
+            process.kill()
+        process.wait()
+        stderr_thread.join()
+
+    if process.returncode == 0:
+        return
+    # follow 模式下读到过帧之后因等待新数据超时而退出是正常结束，打不开文件、数据损坏、滤镜错误等仍然抛出异常
+    if follow and frame_count > 0 and any(_FOLLOW_TIMEOUT_PATTERN.search(line) for line in stderr_tail):
+        log.info(f"{idle_timeout} 秒内没有新数据，认为文件写入结束")
+        return
+    raise Exception(f"FFmpeg 错误（返回码 {process.returncode}）: {' '.join(stderr_tail)}")
+
+
+def iter_scene_changes(source: str,
+                       threshold: float = 30.0,
+                       method: str = 'frame_diff',
+                       follow: bool = False,
+                       frame_size: Optional[Tuple[int, int]] = None,
+                       idle_timeout: float = 30.0) -> Iterator[float]:
+    """
+    流式检测场景变化，每检测到一个转场点立即返回，下游无需等待整个视频检测完成
+
+    Args:
+        source: 视频来源，可以是文件路径、命名管道路径，或 '-' 表示标准输入
+        threshold: 判断转场的阈值，含义与对应的 detect_by_* 方法一致
+        method: 检测方法，'frame_diff'、'histogram' 或 'optical_flow'
+        follow: 文件仍在写入时设为 True
+        frame_size: 统一缩放的帧尺寸 (宽, 高)；普通文件默认按原分辨率用 OpenCV 读取，
+                    管道、仍在写入的文件默认缩放为 320x180 后用 ffmpeg 读取
+        idle_timeout: follow 模式下超过该秒数没有新数据则结束
+
+    Returns:
+        逐个生成转场时间点（以秒为单位）
+    """
+    if method not in SUPPORTED_METRICS:
+        raise ValueError(f"不支持的检测方法: {method}")
+
+    metrics = [method]
+    if source == '-' or follow or frame_size is not None:
+        frames = iter_ffmpeg_frames(source, frame_size or (320, 180), follow, idle_timeout)
+    else:
+        frames = iter_video_frames(source)
+
+    prev_features = None
+    scene_count = 0
+    for timestamp, frame in frames:
+        features = extract_frame_features(frame, metrics)
+        if prev_features is not None:
+            score = compute_metric_score(method, prev_features[method], features[method])
+            if is_scene_change(method, score, threshold):
+                scene_count += 1
+                yield timestamp
+        prev_features = features
+
+    log.info(f"流式转场检测结束，共检测到 {scene_count} 个转场点")
@@ -0,0 +1,189 @@
+################################################################################
+# 多线程流水线检测视频转场：解码线程 + 分析线程
+################################################################################
+
+import os
+import queue
+import threading
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+from .scene_detection_methods import (
+    SUPPORTED_METRICS,
+    extract_frame_features,
+    compute_metric_score,
+    is_scene_change
+)
+
+# 各种阻塞等待的超时时间（秒），超时后检查是否需要提前退出
+_WAIT_TIMEOUT = 0.1
+
+
+class FrameRingBuffer:
+    """
+    预分配的帧环形缓冲区，解码线程直接把帧解码到空闲的槽位中，分析线程用完后归还槽位
+    """
+
+    def __init__(self, size: int, shape: tuple):
+        self.frames = [np.empty(shape, dtype=np.uint8) for _ in range(size)]
+        self.free_slots = queue.Queue()
+        for slot in range(size):
+            self.free_slots.put(slot)
+
+    def acquire(self, stop_event: threading.Event) -> Optional[int]:
+        """获取一个空闲槽位，流水线停止时返回 None"""
+        while not stop_event.is_set():
+            try:
+                return self.free_slots.get(timeout=_WAIT_TIMEOUT)
+            except queue.Empty:
+                continue
+        return None
+
+    def release(self, slot: int):
+        """归还槽位"""
+        self.free_slots.put(slot)
+
+
+def detect_by_threads(video_path: str, thresholds: Dict[str, float],
+                      buffer_size: int = 8,
+                      analysis_threads: Optional[int] = None,
+                      desc: str = "检测视频转场-多线程流水线") -> Dict[str, List[float]]:
+    """
+    解码与分析并行的流水线检测：
+    - 解码线程把帧解码到预分配的环形缓冲区中
+    - 多个分析线程从缓冲区取帧提取特征，相邻两帧的特征都就绪后计算得分
+    OpenCV 在 cvtColor、GaussianBlur、calcHist 等计算中会释放 GIL，因此解码和分析可以真正重叠执行。
+    内存上限为 buffer_size 个原始帧加 buffer_size 份特征。
+
+    Args:
+        video_path: 视频文件路径
+        thresholds: 各指标的阈值，例如 {'frame_diff': 30.0}
+        buffer_size: 环形缓冲区的帧数，同时也是已解码未分析完的帧数上限
+        analysis_threads: 分析线程数，默认为 CPU 核数减一
+        desc: 进度条描述
+
+    Returns:
+        各指标检测到的转场时间点列表（以秒为单位）
+    """
+    metrics = list(thresholds.keys())
+    for metric in metrics:
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"不支持的检测指标: {metric}")
+    if buffer_size < 2:
+        raise ValueError(f"缓冲区大小必须大于等于2: {buffer_size}")
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    analysis_threads = analysis_threads or max(1, (os.cpu_count() or 1) - 1)
+
+    ring_buffer = FrameRingBuffer(buffer_size, (height, width, 3))
+    # 已解码但特征还未释放的帧数上限，保证特征占用的内存也有上限
+    feature_budget = threading.Semaphore(buffer_size)
+    work_queue = queue.Queue()
+    stop_event = threading.Event()
+    lock = threading.Lock()
+
+    pending_features = {}
+    feature_refs = {}
+    scene_frames = {metric: [] for metric in metrics}
+    errors = []
+    progress = tqdm(total=total_frames, desc=desc, position=0)
+
+    def decode():
+        try:
+            for frame_index in range(total_frames):
+                while not feature_budget.acquire(timeout=_WAIT_TIMEOUT):
+                    if stop_event.is_set():
+                        return
+                slot = ring_buffer.acquire(stop_event)
+                if slot is None:
+                    return
+                ret, frame = cap.read(ring_buffer.frames[slot])
+                if not ret:
+                    ring_buffer.release(slot)
+                    feature_budget.release()
+                    break
+                if frame is not ring_buffer.frames[slot]:
+                    # 实际帧的尺寸或类型与 CAP_PROP 读到的不一致时解码器会重新分配数组，改用返回的帧
+                    ring_buffer.frames[slot] = frame
+                work_queue.put((frame_index, slot))
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            for _ in range(analysis_threads):
+                work_queue.put(None)
+
+    def release_feature(frame_index: int):
+        # 调用方持有 lock；首帧只参与一个帧对，其余帧参与前后两个帧对
+        feature_refs[frame_index] = feature_refs.get(frame_index, 0) + 1
+        if feature_refs[frame_index] >= (1 if frame_index == 0 else 2):
+            del pending_features[frame_index]
+            del feature_refs[frame_index]
+            feature_budget.release()
+
+    def analyze():
+        while True:
+            item = work_queue.get()
+            if item is None or stop_event.is_set():
+                return
+            frame_index, slot = item
+            try:
+                features = extract_frame_features(ring_buffer.frames[slot], metrics)
+                ring_buffer.release(slot)
+
+                # 相邻帧的特征都就绪时，由后就绪的一方计算这一帧对，保证每个帧对只计算一次
+                pairs = []
+                with lock:
+                    pending_features[frame_index] = features
+                    if frame_index - 1 in pending_features:
+                        pairs.append((frame_index - 1, frame_index))
+                    if frame_index + 1 in pending_features:
+                        pairs.append((frame_index, frame_index + 1))
+
+                for prev_index, cur_index in pairs:
+                    prev_features = pending_features[prev_index]
+                    cur_features = pending_features[cur_index]
+                    changed = [metric for metric in metrics
+                               if is_scene_change(metric,
+                                                  compute_metric_score(metric, prev_features[metric],
+                                                                       cur_features[metric]),
+                                                  thresholds[metric])]
+                    with lock:
+                        for metric in changed:
+                            scene_frames[metric].append(cur_index)
+                        release_feature(prev_index)
+                        release_feature(cur_index)
+                        progress.update(1)
+            except Exception as e:
+                errors.append(e)
+                stop_event.set()
+                return
+
+    decoder = threading.Thread(target=decode, name="scene-decoder", daemon=True)
+    analyzers = [threading.Thread(target=analyze, name=f"scene-analyzer-{i}", daemon=True)
+                 for i in range(analysis_threads)]
+    decoder.start()
+    for analyzer in analyzers:
+        analyzer.start()
+    for analyzer in analyzers:
+        analyzer.join()
+    stop_event.set()
+    decoder.join()
+    cap.release()
+    progress.close()
+
+    if errors:
+        raise errors[0]
+
+    return {metric: [frame_index / fps for frame_index in sorted(frames)]
+            for metric, frames in scene_frames.items()}
@@ -2,12 +2,20 @@
 为视频添加字幕
 """
 import os
-from typing import Optional
+from typing import List, Optional, Tuple
 
 import pysrt
-from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip
+from moviepy.editor import VideoFileClip
 from tqdm import tqdm
 
+from .video_encode_profile import get_encode_profile, moviepy_encode_kwargs
+from .video_ffmpeg import probe_media_info
+from .video_ladder import transcode_ladder, write_clip_ladder
+from .video_subtitle_ass import burn_subtitles_ass, has_libass
+from .video_subtitle_render import SubtitleRenderCache, get_default_cache
+from .video_subtitle_soft import attach_clip_subtitles, mux_soft_subtitles
+from .video_scratch import ScratchSpace
+from .video_subtitle_compositor import SubtitleCompositor
 from ..common.logger import log
 
 
@@ -45,7 +53,13 @@ def add_subtitle(video_path: str,
                 fontsize: int = 24,
                 color: str = 'white',
                 stroke_color: str = 'black',
-                stroke_width: float = 1.0) -> str:
+                stroke_width: float = 1.0,
+                ladder_heights: Optional[List[int]] = None,
+                backend: Optional[str] = None,
+                render_cache: Optional[SubtitleRenderCache] = None,
+                mode: str = 'burn',
+                language: str = 'zho',
+                extra_subtitles: Optional[List[Tuple[str, str]]] = None) -> str:
     """
     为视频添加字幕
     
@@ -58,71 +72,106 @@ def add_subtitle(video_path: str,
         color: 字体颜色
         stroke_color: 描边颜色
         stroke_width: 描边宽度
+        ladder_heights: 同时输出的低分辨率版本高度列表，例如 [1080, 720, 480]，保存为 xxx_720p.mp4，
+                        字幕只合成一次，各版本在同一个 ffmpeg 进程中缩放编码
+        backend: 字幕烧录方式：
+                 - 'ass': 转换为 ASS 字幕，由 ffmpeg 的 libass 渲染，一次原生编码完成
+                 - 'moviepy': 每条字幕渲染为位图，用 moviepy 逐帧合成
+                 默认 ffmpeg 带有 libass 时使用 'ass'，否则使用 'moviepy'
+        render_cache: moviepy 方式下的字幕位图缓存，默认使用进程内共享的缓存（同时缓存到磁盘）
+        mode: 字幕添加方式：
+              - 'burn': 字幕烧录到画面中，需要重新编码视频（默认）
+              - 'soft': 视频和音频流复制，字幕作为文本字幕轨封装（mp4 为 mov_text），由播放器渲染，
+                        字体、颜色等样式参数不生效；指定 ladder_heights 时低分辨率版本需要重新编码，编码后封装同样的字幕轨
+        language: soft 模式下 srt_path 字幕轨的 ISO 639-2 语言代码
+        extra_subtitles: soft 模式下额外封装的字幕轨列表，每个元素为 (SRT 文件路径, 语言代码)，例如原文字幕
         
     Returns:
         str: 添加字幕后的视频文件路径
     """
     try:
+        # 如果没有指定输出路径，在原文件名后添加"_with_subtitle"
+        if output_path is None:
+            file_dir = os.path.dirname(video_path)
+            file_name = os.path.splitext(os.path.basename(video_path))[0]
+            output_path = os.path.join(file_dir, f"{file_name}_with_subtitle.mp4")
+        
+        if mode == 'soft':
+            subtitle_tracks = [(srt_path, language)] + (extra_subtitles or [])
+            mux_soft_subtitles(video_path, output_path, subtitle_tracks)
+            if ladder_heights:
+                # 重新编码只保留视频和音频，低分辨率版本编码后再封装字幕轨
+                duration = probe_media_info(output_path)['duration']
+                renditions = transcode_ladder(output_path, ladder_heights)
+                attach_clip_subtitles([(path, 0.0, duration) for path in renditions.values()], subtitle_tracks)
+            return output_path
+        elif mode != 'burn':
+            raise ValueError(f"不支持的字幕添加方式: {mode}")
+        
         # 如果没有指定字体，使用系统中文字体
         if font is None:
             font = get_system_font()
             log.info(f"使用系统字体: {font}")
         
+        if backend is None:
+            backend = 'ass' if has_libass() else 'moviepy'
+        if backend == 'ass':
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            return burn_subtitles_ass(video_path, srt_path, output_path, font, fontsize, color,
+                                      stroke_color, stroke_width, ladder_heights)
+        elif backend != 'moviepy':
+            raise ValueError(f"不支持的字幕烧录方式: {backend}")
+        
         # 加载视频
         video = VideoFileClip(video_path)
         
         # 加载字幕
         subs = pysrt.open(srt_path)
         
-        # 生成字幕剪辑
-        subtitle_clips = []
+        # 渲染字幕位图，相同文字和样式的位图只渲染一次
+        render_cache = render_cache or get_default_cache()
+        text_width = int(video.w * 0.8)  # 宽度设为视频宽度的80%
+        cues = []
         
         for sub in tqdm(subs, desc="处理字幕"):
             start_time = sub.start.ordinal / 1000  # 转换为秒
             end_time = sub.end.ordinal / 1000
-            duration = end_time - start_time
             
             try:
-                # 创建文本剪辑
-                text_clip = (TextClip(sub.text,
-                                    fontsize=fontsize,
-                                    font=font,
-                                    color=color,
-                                    stroke_color=stroke_color,
-                                    stroke_width=stroke_width,
-                                    size=(video.w * 0.8, None),  # 宽度设为视频宽度的80%
-                                    method='caption')
-                            .set_position(('center', 'bottom'))  # 设置位置在底部居中
-                            .set_duration(duration)
-                            .set_start(start_time))
-                subtitle_clips.append(text_clip)
+                rgba = render_cache.get(sub.text, font, fontsize, color, stroke_color, stroke_width, text_width)
+                cues.append((start_time, end_time, rgba))
             except Exception as e:
                 log.error(f"处理字幕时出错: {str(e)}, 字幕内容: {sub.text}")
                 continue
+        log.info(f"字幕位图缓存: {render_cache.stats()}")
         
-        # 合成视频
-        final_video = CompositeVideoClip([video] + subtitle_clips)
-        
-        # 如果没有指定输出路径，在原文件名后添加"_with_subtitle"
-        if output_path is None:
-            file_dir = os.path.dirname(video_path)
-            file_name = os.path.splitext(os.path.basename(video_path))[0]
-            output_path = os.path.join(file_dir, f"{file_name}_with_subtitle.mp4")
+        # 合成视频：按时间区间索引找到当前显示的字幕，底部居中混合到画面上
+        final_video = SubtitleCompositor(cues, video.size).apply(video)
         
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # 保存视频
-        final_video.write_videofile(
-            output_path,
-            codec='libx264',
-            audio_codec='aac',
-            temp_audiofile='temp-audio.m4a',
-            remove_temp=True,
-            verbose=False,
-            logger=None,
-            ffmpeg_params=['-hide_banner', '-loglevel', 'error']
-        )
+        if ladder_heights:
+            write_clip_ladder(final_video, output_path, ladder_heights)
+            video.close()
+            final_video.close()
+            return output_path
+        
+        # 使用当前主机该分辨率的编码参数调优结果
+        encode_kwargs = moviepy_encode_kwargs(get_encode_profile(video.w, video.h))
+        encode_kwargs['ffmpeg_params'] = ['-hide_banner', '-loglevel', 'error'] + encode_kwargs['ffmpeg_params']
+        
+        # 保存视频，临时音频写入任务独立的临时目录，避免并发任务在当前目录下冲突
+        with ScratchSpace(prefix="add_subtitle_") as scratch:
+            final_video.write_videofile(
+                output_path,
+                audio_codec='aac',
+                temp_audiofile=scratch.path('audio.m4a'),
+                remove_temp=True,
+                verbose=False,
+                logger=None,
+                **encode_kwargs
+            )
         
         # 关闭视频
         video.close()
@@ -0,0 +1,244 @@
+################################################################################
+# 编码参数自动调优：在当前机器上用源视频的一小段样本测试 x264 的 preset / CRF / 线程数组合，
+# 选出满足画质（SSIM）和码率要求的最快组合，按主机名和分辨率缓存，各编码环节统一使用
+#
+# 用法：
+#   python -m core.utils.video.video_encode_profile video.mp4 --min-ssim 0.97
+# process_youtube_video 在下载视频后调用 ensure_encode_profile，该主机该分辨率没有缓存时自动调优一次
+################################################################################
+
+import argparse
+import json
+import os
+import re
+import socket
+import time
+from typing import Dict, List, Optional
+
+from .video_ffmpeg import run_ffmpeg, probe_media_info
+from .video_scratch import ScratchSpace
+from ..common.logger import log
+
+# 没有缓存的调优结果时使用的编码参数，与之前写死的参数一致；
+# threads 为 None 时不指定线程数，由 x264 按 CPU 核数自动选择（完整长度视频的编码之前就是这样）
+DEFAULT_PROFILE = {'preset': 'medium', 'crf': 23, 'threads': None}
+
+# 多个片段并行编码时每个编码进程的默认线程数（没有调优结果时使用），与之前片段编码写死的参数一致
+DEFAULT_THREADS_PER_WORKER = 2
+
+# 参与测试的候选参数，preset 按速度从快到慢排列
+CANDIDATE_PRESETS = ['veryfast', 'faster', 'fast', 'medium']
+CANDIDATE_CRFS = [18, 23]
+
+# 默认缓存文件
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'video_transport', 'encode_profiles.json')
+
+# ssim 滤镜输出，例如 "SSIM Y:0.990 (20.0) U:0.995 (23.0) V:0.994 (22.4) All:0.992 (20.9)"
+_SSIM_PATTERN = re.compile(r'All:\s*([\d.]+)')
+
+
+def profile_key(width: int, height: int) -> str:
+    """
+    缓存键：主机名 + 分辨率
+    """
+    return f"{socket.gethostname()}/{width}x{height}"
+
+
+def _load_cache(cache_path: str) -> Dict[str, dict]:
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning(f"读取编码参数缓存失败: {str(e)}")
+        return {}
+
+
+def get_encode_profile(width: int, height: int, cache_path: Optional[str] = None) -> dict:
+    """
+    读取当前主机在该分辨率下缓存的编码参数，没有调优结果时返回 DEFAULT_PROFILE
+
+    Args:
+        width: 视频宽度
+        height: 视频高度
+        cache_path: 缓存文件路径，默认 ~/.cache/video_transport/encode_profiles.json
+
+    Returns:
+        {'preset', 'crf', 'threads'}
+    """
+    profile = _load_cache(cache_path or DEFAULT_CACHE_PATH).get(profile_key(width, height))
+    if profile is None:
+        return dict(DEFAULT_PROFILE)
+    return {key: profile.get(key, value) for key, value in DEFAULT_PROFILE.items()}
+
+
+def get_video_encode_profile(video_path: str, cache_path: Optional[str] = None) -> dict:
+    """
+    按视频文件的分辨率读取编码参数
+    """
+    info = probe_media_info(video_path)
+    return get_encode_profile(info['width'], info['height'], cache_path)
+
+
+def clip_encode_profile(profile: dict) -> dict:
+    """
+    多个片段并行编码时使用的编码参数：没有调优出线程数时使用 DEFAULT_THREADS_PER_WORKER，
+    避免每个编码进程都按 CPU 核数开线程
+    """
+    return dict(profile, threads=profile['threads'] or DEFAULT_THREADS_PER_WORKER)
+
+
+def ffmpeg_encode_args(profile: dict) -> List[str]:
+    """
+    转换为 ffmpeg 命令行的视频编码参数，threads 为 None 时不指定线程数
+    """
+    args = ['-c:v', 'libx264', '-preset', profile['preset'], '-crf', str(profile['crf'])]
+    if profile['threads']:
+        args += ['-threads', str(profile['threads'])]
+    return args
+
+
+def moviepy_encode_kwargs(profile: dict) -> dict:
+    """
+    转换为 moviepy write_videofile 的编码参数，crf 通过 ffmpeg_params 传入，threads 为 None 时不指定线程数
+    """
+    return {
+        'codec': 'libx264',
+        'preset': profile['preset'],
+        'threads': profile['threads'],
+        'ffmpeg_params': ['-crf', str(profile['crf'])],
+    }
+
+
+def _candidate_threads() -> List[int]:
+    cpu_count = os.cpu_count() or 1
+    return sorted({threads for threads in (1, 2, 4, cpu_count) if threads <= cpu_count})
+
+
+def _measure_profile(sample_path: str, output_path: str, duration: float, profile: dict) -> dict:
+    """
+    用指定参数编码样本，返回 {'seconds', 'ssim', 'bitrate_kbps'}
+    """
+    start_time = time.perf_counter()
+    run_ffmpeg(['-loglevel', 'error', '-i', sample_path, '-an'] + ffmpeg_encode_args(profile) + [output_path])
+    elapsed = time.perf_counter() - start_time
+
+    output = run_ffmpeg(['-loglevel', 'info', '-i', output_path, '-i', sample_path,
+                         '-lavfi', '[0:v][1:v]ssim', '-f', 'null', '-'])
+    match = _SSIM_PATTERN.search(output)
+    return {
+        'seconds': elapsed,
+        'ssim': float(match.group(1)) if match else 0.0,
+        'bitrate_kbps': os.path.getsize(output_path) * 8 / duration / 1000,
+    }
+
+
+def autotune_encode_profile(video_path: str,
+                            sample_seconds: float = 3.0,
+                            min_ssim: float = 0.97,
+                            max_bitrate_kbps: Optional[float] = None,
+                            cache_path: Optional[str] = None) -> dict:
+    """
+    在当前主机上测试编码参数组合，选出满足画质和码率要求的最快组合并写入缓存
+
+    测试分两步：先用 DEFAULT_PROFILE 的 preset/crf 测出最快的线程数，再用该线程数测试各 preset/crf 组合
+
+    Args:
+        video_path: 源视频路径，从视频中间截取样本
+        sample_seconds: 样本时长（秒）
+        min_ssim: 编码结果与样本的最低 SSIM
+        max_bitrate_kbps: 最高码率（kbps），为 None 时不限制
+        cache_path: 缓存文件路径，默认 ~/.cache/video_transport/encode_profiles.json
+
+    Returns:
+        选出的 {'preset', 'crf', 'threads'}
+    """
+    info = probe_media_info(video_path)
+    duration = min(sample_seconds, info['duration'])
+    sample_start = max(0.0, info['duration'] / 2 - duration / 2)
+
+    results = []
+    # 无损样本大约是原始 YUV 数据的一半
+    expected_bytes = int(info['width'] * info['height'] * 1.5 * (info['fps'] or 30) * duration / 2)
+    with ScratchSpace(prefix="encode_profile_", expected_bytes=expected_bytes) as scratch:
+        # 先无损截取样本，各组合的测试都从样本读取，避免重复跳转源视频
+        sample_path = scratch.path("sample.mkv")
+        run_ffmpeg(['-loglevel', 'error', '-ss', f"{sample_start:.3f}", '-t', f"{duration:.3f}", '-i', video_path,
+                    '-an', '-c:v', 'libx264', '-preset', 'ultrafast', '-qp', '0', sample_path])
+        output_path = scratch.path("encoded.mp4")
+
+        best_threads = DEFAULT_PROFILE['threads']
+        best_seconds = None
+        for threads in _candidate_threads():
+            profile = dict(DEFAULT_PROFILE, threads=threads)
+            seconds = _measure_profile(sample_path, output_path, duration, profile)['seconds']
+            log.info(f"编码线程数 {threads}: {seconds:.2f} 秒")
+            if best_seconds is None or seconds < best_seconds:
+                best_threads, best_seconds = threads, seconds
+
+        for preset in CANDIDATE_PRESETS:
+            for crf in CANDIDATE_CRFS:
+                profile = {'preset': preset, 'crf': crf, 'threads': best_threads}
+                measurement = _measure_profile(sample_path, output_path, duration, profile)
+                log.info(f"编码参数 {profile}: {measurement['seconds']:.2f} 秒，SSIM {measurement['ssim']:.4f}，"
+                         f"码率 {measurement['bitrate_kbps']:.0f} kbps")
+                results.append((profile, measurement))
+
+    def acceptable(measurement):
+        return (measurement['ssim'] >= min_ssim
+                and (max_bitrate_kbps is None or measurement['bitrate_kbps'] <= max_bitrate_kbps))
+
+    candidates = [result for result in results if acceptable(result[1])]
+    if candidates:
+        profile, measurement = min(candidates, key=lambda result: result[1]['seconds'])
+    else:
+        # 没有满足要求的组合时选画质最好的
+        log.warning(f"没有满足 SSIM >= {min_ssim} 且码率要求的编码参数，使用画质最好的组合")
+        profile, measurement = max(results, key=lambda result: result[1]['ssim'])
+
+    cache_path = cache_path or DEFAULT_CACHE_PATH
+    cache = _load_cache(cache_path)
+    cache[profile_key(info['width'], info['height'])] = dict(profile, ssim=measurement['ssim'],
+                                                             bitrate_kbps=measurement['bitrate_kbps'],
+                                                             tuned_at=time.strftime('%Y-%m-%d %H:%M:%S'))
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # 先写临时文件再重命名，避免并发读取到写了一半的文件
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, cache_path)
+
+    log.info(f"{info['width']}x{info['height']} 选用编码参数: {profile}")
+    return profile
+
+
+def ensure_encode_profile(video_path: str, cache_path: Optional[str] = None, **kwargs) -> dict:
+    """
+    读取视频分辨率对应的编码参数，当前主机没有该分辨率的调优结果时先调优并写入缓存，
+    之后各编码环节通过 get_encode_profile 读取到调优结果
+
+    Args:
+        video_path: 源视频路径
+        cache_path: 缓存文件路径，默认 ~/.cache/video_transport/encode_profiles.json
+        kwargs: 调优参数，见 autotune_encode_profile
+
+    Returns:
+        {'preset', 'crf', 'threads'}
+    """
+    info = probe_media_info(video_path)
+    if profile_key(info['width'], info['height']) in _load_cache(cache_path or DEFAULT_CACHE_PATH):
+        return get_encode_profile(info['width'], info['height'], cache_path)
+    log.info(f"{info['width']}x{info['height']} 没有编码参数调优结果，开始调优")
+    return autotune_encode_profile(video_path, cache_path=cache_path, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="编码参数自动调优")
+    parser.add_argument('video_path', help="用于截取样本的源视频")
+    parser.add_argument('--sample-seconds', type=float, default=3.0, help="样本时长（秒）")
+    parser.add_argument('--min-ssim', type=float, default=0.97, help="最低 SSIM")
+    parser.add_argument('--max-bitrate', type=float, default=None, help="最高码率（kbps）")
+    args = parser.parse_args()
+
+    autotune_encode_profile(args.video_path, args.sample_seconds, args.min_ssim, args.max_bitrate)
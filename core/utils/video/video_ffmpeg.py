@@ -0,0 +1,119 @@
+"""
+ffmpeg / ffprobe 命令行封装
+"""
+import json
+import subprocess
+from typing import List, Optional
+
+
+def run_ffmpeg(args: List[str]) -> str:
+    """
+    执行 ffmpeg 命令，失败时抛出异常
+
+    Args:
+        args: ffmpeg 参数（不包含 ffmpeg 本身）
+
+    Returns:
+        ffmpeg 标准错误输出
+    """
+    command = ['ffmpeg', '-hide_banner', '-nostdin', '-y'] + args
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    stdout, stderr = process.communicate()
+
+    if process.returncode != 0:
+        raise Exception(f"FFmpeg 错误: {stderr}")
+    return stderr
+
+
+def run_ffprobe(args: List[str]) -> str:
+    """
+    执行 ffprobe 命令并返回标准输出
+
+    Args:
+        args: ffprobe 参数（不包含 ffprobe 本身）
+
+    Returns:
+        ffprobe 标准输出
+    """
+    command = ['ffprobe', '-v', 'error'] + args
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    stdout, stderr = process.communicate()
+
+    if process.returncode != 0:
+        raise Exception(f"FFprobe 错误: {stderr}")
+    return stdout
+
+
+def probe_keyframe_times(video_path: str, read_seconds: Optional[float] = None) -> List[float]:
+    """
+    读取视频流关键帧的时间戳，只读取数据包信息，不解码
+
+    Args:
+        video_path: 视频文件路径
+        read_seconds: 只读取视频开头这么多秒的数据包，为 None 时读取整个视频
+
+    Returns:
+        按时间排序的关键帧时间戳列表（秒）
+    """
+    args = ['-select_streams', 'v:0']
+    if read_seconds is not None:
+        args += ['-read_intervals', f"%+{read_seconds:g}"]
+    output = run_ffprobe(args + [
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=p=0',
+        video_path
+    ])
+    keyframes = []
+    for line in output.splitlines():
+        parts = line.strip().split(',')
+        if len(parts) < 2 or 'K' not in parts[1] or parts[0] in ('', 'N/A'):
+            continue
+        keyframes.append(float(parts[0]))
+    return sorted(keyframes)
+
+
+def probe_media_info(video_path: str) -> dict:
+    """
+    读取视频的时长、分辨率、帧率以及是否包含音频
+
+    Args:
+        video_path: 视频文件路径
+
+    Returns:
+        {'duration', 'width', 'height', 'fps', 'has_audio', 'video_codec', 'video_profile', 'pix_fmt'}
+    """
+    output = run_ffprobe([
+        '-show_entries', 'format=duration:stream=codec_type,codec_name,profile,pix_fmt,width,height,avg_frame_rate',
+        '-of', 'json',
+        video_path
+    ])
+    data = json.loads(output)
+    streams = data.get('streams', [])
+    video_stream = next((stream for stream in streams if stream.get('codec_type') == 'video'), {})
+
+    fps = 0.0
+    frame_rate = video_stream.get('avg_frame_rate', '0/0')
+    numerator, _, denominator = frame_rate.partition('/')
+    if denominator and float(denominator) != 0:
+        fps = float(numerator) / float(denominator)
+
+    return {
+        'duration': float(data.get('format', {}).get('duration', 0.0)),
+        'width': int(video_stream.get('width', 0)),
+        'height': int(video_stream.get('height', 0)),
+        'fps': fps,
+        'has_audio': any(stream.get('codec_type') == 'audio' for stream in streams),
+        'video_codec': video_stream.get('codec_name'),
+        'video_profile': video_stream.get('profile'),
+        'pix_fmt': video_stream.get('pix_fmt'),
+    }
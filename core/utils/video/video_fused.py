@@ -0,0 +1,164 @@
+################################################################################
+# 合并编码计划：把"合并音视频 -> 烧录字幕 -> 按区间切分"三个环节合并为每个片段一个 ffmpeg 滤镜图，
+# 直接从原始视频和单独的音频读取，字幕按片段起点平移时间轴后叠加，每个片段只编码一次；
+# 完整长度的中间文件（v1_mixed.mp4、v1_with_subtitle.mp4）只在指定路径时才生成；
+# 指定 ladder_heights 时字幕叠加后在同一个滤镜图中分路缩放，同时输出各低分辨率版本
+################################################################################
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from .video_add_subtitle import get_system_font
+from .video_encode_profile import clip_encode_profile, ffmpeg_encode_args, get_encode_profile
+from .video_ffmpeg import probe_media_info, run_ffmpeg
+from .video_ladder import build_ladder_args, plan_renditions
+from .video_scratch import ScratchSpace
+from .video_split_ffmpeg import plan_clips, save_thumbnail
+from .video_subtitle_ass import build_ass_filter
+from ..common.logger import log
+
+
+def build_fused_clip_command(video_path: str, audio_path: Optional[str], start_time: float, end_time: float,
+                             output_path: str, subtitle_filter: Optional[str], profile: dict,
+                             has_video_audio: bool = True, renditions: Optional[List[dict]] = None) -> List[str]:
+    """
+    生成单个片段的 ffmpeg 参数：视频和音频各自在输入端跳转到片段起点，
+    字幕滤镜之前把时间戳平移回原视频的时间轴，渲染后再归零
+
+    Args:
+        video_path: 原始视频路径
+        audio_path: 单独的音频路径，为 None 时使用视频自带的音频
+        start_time: 片段在原视频中的开始时间
+        end_time: 片段在原视频中的结束时间
+        output_path: 输出路径
+        subtitle_filter: build_ass_filter 返回的字幕滤镜，为 None 时不叠加字幕
+        profile: 编码参数 {'preset', 'crf', 'threads'}
+        has_video_audio: 视频是否自带音频，audio_path 为 None 时使用
+        renditions: plan_renditions 的返回值（包含原分辨率版本），指定时字幕叠加后分路缩放，同时输出各版本
+
+    Returns:
+        ffmpeg 参数列表（不包含 ffmpeg 本身）
+    """
+    duration = end_time - start_time
+    seek = ['-ss', f"{start_time:.6f}", '-t', f"{duration:.6f}"]
+    args = ['-loglevel', 'error'] + seek + ['-i', video_path]
+    if audio_path is not None:
+        args += seek + ['-i', audio_path]
+        audio_input = '1:a:0'
+    else:
+        audio_input = '0:a:0' if has_video_audio else None
+
+    if subtitle_filter:
+        video_filter = f"setpts=PTS-STARTPTS+{start_time:.6f}/TB,{subtitle_filter},setpts=PTS-STARTPTS"
+    else:
+        video_filter = "setpts=PTS-STARTPTS"
+    if renditions:
+        source = renditions[0]
+        return args + build_ladder_args(renditions, audio_input, (source['width'], source['height']), profile,
+                                        video_filter=video_filter, audio_codec='aac', duration=duration)
+
+    args += (['-filter_complex', f"[0:v]{video_filter}[vout]", '-map', '[vout]']
+             + ffmpeg_encode_args(profile) + ['-pix_fmt', 'yuv420p'])
+    if audio_input is not None:
+        args += ['-map', audio_input, '-c:a', 'aac']
+    # 音频可能比视频长，按片段时长截断
+    args += ['-t', f"{duration:.6f}", output_path]
+    return args
+
+
+def _mix_stream_copy(video_path: str, audio_path: str, output_path: str, duration: float):
+    """
+    视频流复制、音频编码为 aac 合并成完整长度的文件，音频超过视频长度的部分截掉
+    """
+    run_ffmpeg(['-loglevel', 'error', '-i', video_path, '-i', audio_path,
+                '-map', '0:v:0', '-map', '1:a:0', '-c:v', 'copy', '-c:a', 'aac',
+                '-t', f"{duration:.6f}", output_path])
+
+
+def render_clips_fused(video_path: str, output_dir: str, time_ranges: List[tuple],
+                       srt_path: Optional[str] = None, audio_path: Optional[str] = None,
+                       font: Optional[str] = None, fontsize: int = 24, color: str = 'white',
+                       stroke_color: str = 'black', stroke_width: float = 1.0,
+                       workers: Optional[int] = None,
+                       mixed_path: Optional[str] = None,
+                       with_subtitle_path: Optional[str] = None,
+                       ladder_heights: Optional[List[int]] = None) -> List[str]:
+    """
+    合并音视频、烧录字幕、按区间切分一次完成，每个片段从原始视频只编码一次
+
+    Args:
+        video_path: 原始视频路径
+        output_dir: 片段输出目录，文件命名与 split_video_v2 相同
+        time_ranges: 时间区间列表，每个元素是一个元组 (start_time, end_time)
+        srt_path: 需要烧录的 SRT 字幕，为 None 时不叠加字幕
+        audio_path: 单独的音频路径，为 None 时使用视频自带的音频
+        font: 字体，如果不指定则自动选择系统中文字体
+        fontsize: 字体大小
+        color: 字体颜色
+        stroke_color: 描边颜色
+        stroke_width: 描边宽度
+        workers: 同时运行的 ffmpeg 编码进程数，默认按 CPU 核数除以每个进程的线程数计算
+        mixed_path: 指定时额外生成完整长度的音视频合并文件（视频流复制）
+        with_subtitle_path: 指定时额外生成完整长度的带字幕视频
+        ladder_heights: 每个输出同时输出的低分辨率版本高度列表，例如 [1080, 720, 480]，保存为 xxx_720p.mp4，
+                        不在返回的路径列表中
+
+    Returns:
+        与 time_ranges 中有效区间顺序一致的片段路径列表，任一片段编码失败时抛出异常（其他片段仍会编码完成）
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    info = probe_media_info(video_path)
+    profile = clip_encode_profile(get_encode_profile(info['width'], info['height']))
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // max(1, profile['threads']))
+
+    clips = plan_clips(video_path, output_dir, time_ranges)
+    jobs = [(start_time, end_time, output_path) for start_time, end_time, output_path, _ in clips]
+    if with_subtitle_path:
+        os.makedirs(os.path.dirname(with_subtitle_path) or '.', exist_ok=True)
+        jobs.append((0.0, info['duration'], with_subtitle_path))
+
+    with ScratchSpace(prefix="fused_") as scratch:
+        if mixed_path and audio_path:
+            os.makedirs(os.path.dirname(mixed_path) or '.', exist_ok=True)
+            _mix_stream_copy(video_path, audio_path, mixed_path, info['duration'])
+
+        subtitle_filter = None
+        if srt_path:
+            if font is None:
+                font = get_system_font()
+            subtitle_filter = build_ass_filter(srt_path, scratch.path("subtitle.ass"), info['width'],
+                                               info['height'], font, fontsize, color, stroke_color, stroke_width)
+
+        def encode(job: tuple) -> Optional[str]:
+            start_time, end_time, output_path = job
+            renditions = None
+            if ladder_heights:
+                renditions = plan_renditions(output_path, info['width'], info['height'], ladder_heights)
+            try:
+                run_ffmpeg(build_fused_clip_command(video_path, audio_path, start_time, end_time, output_path,
+                                                    subtitle_filter, profile, info['has_audio'], renditions))
+                return None
+            except Exception as e:
+                for path in [rendition['output_path'] for rendition in renditions or []] + [output_path]:
+                    if os.path.exists(path):
+                        os.remove(path)
+                return str(e)
+
+        log.info(f"合并编码 {len(jobs)} 个输出，进程数: {workers}")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            errors = list(executor.map(encode, jobs))
+
+    failed = []
+    for (start_time, end_time, output_path, thumbnail_path), error in zip(clips, errors):
+        if error:
+            failed.append(f"[{start_time:.2f}, {end_time:.2f}]: {error}")
+            continue
+        # 首帧缩略图从输出片段读取，包含烧录的字幕
+        save_thumbnail(output_path, thumbnail_path, 0.0)
+    if failed:
+        raise Exception(f"{len(failed)}/{len(clips)} 个片段编码失败: " + '; '.join(failed))
+    if with_subtitle_path and errors[-1]:
+        raise Exception(f"生成带字幕视频失败: {errors[-1]}")
+    return [output_path for _, _, output_path, _ in clips]
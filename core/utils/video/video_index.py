@@ -0,0 +1,144 @@
+################################################################################
+# 视频关键帧索引：用 ffprobe 读取数据包信息（不解码），记录关键帧时间戳、字节偏移和帧序号，
+# 以 JSON 文件缓存在视频同目录下，切分、提取缩略图、分段检测时直接跳转到目标所在的 GOP
+################################################################################
+
+import bisect
+import json
+import os
+from typing import List, Optional
+
+from .video_ffmpeg import run_ffprobe, probe_media_info
+from ..common.logger import log
+
+# 索引格式版本，格式变化时递增，旧的缓存文件会被重新生成
+INDEX_VERSION = 1
+
+
+def index_cache_path(video_path: str, cache_dir: Optional[str] = None) -> str:
+    """
+    索引缓存文件路径，默认保存在视频同目录下的隐藏文件中
+    """
+    directory = cache_dir or os.path.dirname(os.path.abspath(video_path))
+    return os.path.join(directory, f".{os.path.basename(video_path)}.index.json")
+
+
+def build_video_index(video_path: str) -> dict:
+    """
+    读取视频流所有数据包，生成关键帧索引
+
+    Args:
+        video_path: 视频文件路径
+
+    Returns:
+        {'version', 'size', 'mtime', 'fps', 'duration', 'frame_count',
+         'keyframes': [{'pts': 时间戳秒数, 'pos': 字节偏移, 'frame': 显示顺序的帧序号}]}
+    """
+    output = run_ffprobe([
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,pos,flags',
+        '-of', 'csv=p=0',
+        video_path
+    ])
+
+    packet_times = []
+    keyframes = []
+    for line in output.splitlines():
+        parts = line.strip().split(',')
+        if len(parts) < 3 or parts[0] in ('', 'N/A'):
+            continue
+        pts = float(parts[0])
+        packet_times.append(pts)
+        if 'K' in parts[2]:
+            keyframes.append({'pts': pts, 'pos': int(parts[1]) if parts[1].isdigit() else -1})
+
+    # 数据包按解码顺序排列，显示顺序的帧序号是时间戳更早的帧数
+    packet_times.sort()
+    keyframes.sort(key=lambda keyframe: keyframe['pts'])
+    for keyframe in keyframes:
+        keyframe['frame'] = bisect.bisect_left(packet_times, keyframe['pts'])
+
+    info = probe_media_info(video_path)
+    stat = os.stat(video_path)
+    return {
+        'version': INDEX_VERSION,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'fps': info['fps'],
+        'duration': info['duration'],
+        'frame_count': len(packet_times),
+        'keyframes': keyframes,
+    }
+
+
+def read_cached_index(video_path: str, cache_dir: Optional[str] = None) -> Optional[dict]:
+    """
+    只读取已有的索引缓存，不存在或视频文件已变化时返回 None，不生成索引
+    """
+    cache_path = index_cache_path(video_path, cache_dir)
+    if not os.path.exists(cache_path):
+        return None
+    stat = os.stat(video_path)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning(f"读取视频索引缓存失败: {str(e)}")
+        return None
+    if (index.get('version') == INDEX_VERSION and index.get('size') == stat.st_size
+            and index.get('mtime') == stat.st_mtime):
+        return index
+    return None
+
+
+def load_video_index(video_path: str, cache_dir: Optional[str] = None) -> dict:
+    """
+    读取视频的关键帧索引，缓存不存在或视频文件已变化时重新生成并写入缓存
+
+    Args:
+        video_path: 视频文件路径
+        cache_dir: 缓存目录，默认与视频同目录
+
+    Returns:
+        build_video_index 返回的索引
+    """
+    index = read_cached_index(video_path, cache_dir)
+    if index is not None:
+        return index
+
+    cache_path = index_cache_path(video_path, cache_dir)
+    index = build_video_index(video_path)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # 先写临时文件再重命名，避免并发读取到写了一半的索引
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        log.warning(f"写入视频索引失败: {str(e)}")
+    log.info(f"生成视频索引: {len(index['keyframes'])} 个关键帧，{index['frame_count']} 帧")
+    return index
+
+
+def keyframe_times(index: dict) -> List[float]:
+    """
+    关键帧时间戳列表（秒），按时间排序
+    """
+    return [keyframe['pts'] for keyframe in index['keyframes']]
+
+
+def keyframe_frames(index: dict) -> List[int]:
+    """
+    关键帧的帧序号列表，按时间排序
+    """
+    return [keyframe['frame'] for keyframe in index['keyframes']]
+
+
+def keyframe_before(index: dict, frame_index: int) -> Optional[dict]:
+    """
+    找到指定帧所在 GOP 的关键帧（帧序号不大于 frame_index 的最后一个关键帧），没有时返回 None
+    """
+    frames = keyframe_frames(index)
+    position = bisect.bisect_right(frames, frame_index) - 1
+    return index['keyframes'][position] if position >= 0 else None
@@ -0,0 +1,198 @@
+################################################################################
+# 多码率阶梯：源视频只解码（合成）一次，在同一个 ffmpeg 滤镜图中用 split/scale 分出多路，
+# 同时编码原分辨率和 1080p/720p/480p 等低分辨率版本
+################################################################################
+
+import os
+import subprocess
+from typing import Dict, List, Optional
+
+from moviepy.editor import VideoClip
+
+from .video_encode_profile import ffmpeg_encode_args, get_encode_profile
+from .video_ffmpeg import probe_media_info, run_ffmpeg
+from .video_scratch import ScratchSpace
+from ..common.logger import log
+
+# 默认输出的分辨率（高度）
+DEFAULT_LADDER_HEIGHTS = [1080, 720, 480]
+
+
+def rendition_path(output_path: str, height: int) -> str:
+    """
+    低分辨率版本的输出路径，例如 v1.mp4 -> v1_720p.mp4
+    """
+    file_name, ext = os.path.splitext(output_path)
+    return f"{file_name}_{height}p{ext}"
+
+
+def scaled_size(width: int, height: int, target_height: int) -> tuple:
+    """
+    按高度等比缩放后的尺寸，宽高都取偶数（yuv420p 要求）
+    """
+    target_width = int(round(width * target_height / height / 2)) * 2
+    return target_width, target_height - target_height % 2
+
+
+def plan_renditions(output_path: str, width: int, height: int, heights: List[int],
+                    include_source: bool = True) -> List[dict]:
+    """
+    计算需要输出的各路版本，高度不低于源视频的版本不输出（不放大）
+
+    Args:
+        output_path: 原分辨率版本的输出路径，低分辨率版本的路径由它派生
+        width: 源视频宽度
+        height: 源视频高度
+        heights: 低分辨率版本的高度列表
+        include_source: 是否输出原分辨率版本
+
+    Returns:
+        [{'height', 'width', 'output_path'}]，原分辨率版本（如果有）在最前
+    """
+    renditions = []
+    if include_source:
+        renditions.append({'height': height, 'width': width, 'output_path': output_path})
+    for target_height in sorted(set(heights), reverse=True):
+        if target_height >= height:
+            log.info(f"源视频高度 {height} 不高于 {target_height}p，跳过该版本")
+            continue
+        target_width, target_height = scaled_size(width, height, target_height)
+        renditions.append({'height': target_height, 'width': target_width,
+                           'output_path': rendition_path(output_path, target_height)})
+    return renditions
+
+
+def build_ladder_args(renditions: List[dict], audio_input: Optional[str], source_size: tuple,
+                      profile: Optional[dict] = None, video_filter: Optional[str] = None,
+                      audio_codec: str = 'copy', duration: Optional[float] = None) -> List[str]:
+    """
+    生成滤镜图和各路输出的 ffmpeg 参数（输入参数之后的部分），视频来自第 0 个输入
+
+    Args:
+        renditions: plan_renditions 的返回值
+        audio_input: 音频所在的输入流，例如 '0:a' 或 '1:a'，为 None 时不输出音频；音频按 audio_codec 输出到每一路
+        source_size: 源视频尺寸 (width, height)，与源尺寸相同的版本不缩放
+        profile: 原分辨率版本的编码参数 {'preset', 'crf', 'threads'}，默认读取编码参数调优结果；
+                 低分辨率版本总是按自己的分辨率读取调优结果，没有调优出线程数时沿用 profile 的线程数
+        video_filter: 分路之前先执行的滤镜，例如烧录字幕的 ass 滤镜
+        audio_codec: 音频编码，默认流复制
+        duration: 每一路输出的时长（秒），为 None 时不限制
+
+    Returns:
+        ffmpeg 参数列表
+    """
+    labels = [f"v{i}" for i in range(len(renditions))]
+    source = f"[0:v]{video_filter}," if video_filter else "[0:v]"
+    filters = [f"{source}split={len(renditions)}" + ''.join(f"[{label}]" for label in labels)]
+    for label, rendition in zip(labels, renditions):
+        if (rendition['width'], rendition['height']) != tuple(source_size):
+            filters.append(f"[{label}]scale={rendition['width']}:{rendition['height']},setsar=1[{label}s]")
+        else:
+            filters.append(f"[{label}]null[{label}s]")
+
+    args = ['-filter_complex', ';'.join(filters)]
+    for label, rendition in zip(labels, renditions):
+        is_source = (rendition['width'], rendition['height']) == tuple(source_size)
+        rendition_profile = (profile if is_source else None) or get_encode_profile(rendition['width'],
+                                                                                   rendition['height'])
+        if profile and not rendition_profile['threads']:
+            # 没有调优出线程数的低分辨率版本沿用原分辨率版本的线程数（并行编码多个片段时不会按 CPU 核数开线程）
+            rendition_profile = dict(rendition_profile, threads=profile['threads'])
+        args += ['-map', f"[{label}s]"] + ffmpeg_encode_args(rendition_profile) + ['-pix_fmt', 'yuv420p']
+        if audio_input is not None:
+            args += ['-map', audio_input, '-c:a', audio_codec]
+        if duration is not None:
+            args += ['-t', f"{duration:.6f}"]
+        args += [rendition['output_path']]
+    return args
+
+
+def transcode_ladder(video_path: str, heights: Optional[List[int]] = None) -> Dict[int, str]:
+    """
+    为已有的视频文件生成低分辨率版本，源视频只解码一次，音频流复制
+
+    Args:
+        video_path: 视频文件路径，低分辨率版本保存在同目录，例如 v1_720p.mp4
+        heights: 低分辨率版本的高度列表，默认 DEFAULT_LADDER_HEIGHTS
+
+    Returns:
+        {高度: 输出路径}
+    """
+    info = probe_media_info(video_path)
+    renditions = plan_renditions(video_path, info['width'], info['height'], heights or DEFAULT_LADDER_HEIGHTS,
+                                 include_source=False)
+    if not renditions:
+        return {}
+
+    run_ffmpeg(['-loglevel', 'error', '-i', video_path]
+               + build_ladder_args(renditions, '0:a' if info['has_audio'] else None,
+                                   (info['width'], info['height'])))
+    return {rendition['height']: rendition['output_path'] for rendition in renditions}
+
+
+def _remove_renditions(renditions: List[dict]):
+    """
+    删除不完整的输出，包括各低分辨率版本
+    """
+    for rendition in renditions:
+        if os.path.exists(rendition['output_path']):
+            os.remove(rendition['output_path'])
+
+
+def write_clip_ladder(clip: VideoClip, output_path: str, heights: Optional[List[int]] = None,
+                      profile: Optional[dict] = None) -> Dict[int, str]:
+    """
+    将 moviepy 片段（可以是叠加了字幕的合成片段）逐帧合成一次，通过管道交给一个 ffmpeg 进程，
+    同时编码原分辨率版本和各低分辨率版本
+
+    Args:
+        clip: 视频片段
+        output_path: 原分辨率版本的输出路径，低分辨率版本保存在同目录，例如 v1_720p.mp4
+        heights: 低分辨率版本的高度列表，默认 DEFAULT_LADDER_HEIGHTS
+        profile: 原分辨率版本的编码参数 {'preset', 'crf', 'threads'}，低分辨率版本按自己的分辨率读取调优结果
+
+    Returns:
+        {高度: 输出路径}，包含原分辨率版本
+    """
+    width, height = clip.size
+    renditions = plan_renditions(output_path, width, height, heights or DEFAULT_LADDER_HEIGHTS)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    with ScratchSpace(prefix="ladder_") as scratch:
+        input_args = ['-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{width}x{height}",
+                      '-r', f"{clip.fps}", '-i', '-']
+        audio_input = None
+        if clip.audio is not None:
+            # 音频只编码一次，各路输出直接复制
+            audio_path = scratch.path("audio.m4a")
+            clip.audio.write_audiofile(audio_path, fps=44100, codec='aac', verbose=False, logger=None)
+            input_args += ['-i', audio_path]
+            audio_input = '1:a'
+
+        command = (['ffmpeg', '-hide_banner', '-nostdin', '-y', '-loglevel', 'error'] + input_args
+                   + build_ladder_args(renditions, audio_input, (width, height), profile))
+        # ffmpeg 的输出写入临时文件，避免管道写满阻塞
+        log_path = scratch.path("ffmpeg.log")
+        with open(log_path, 'w+') as log_file:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=log_file)
+            try:
+                try:
+                    for frame in clip.iter_frames(dtype='uint8'):
+                        process.stdin.write(frame.tobytes())
+                    process.stdin.close()
+                except BrokenPipeError:
+                    # ffmpeg 已经退出，错误信息在日志中
+                    pass
+            except BaseException:
+                # 读取帧出错时如果关闭 stdin，ffmpeg 会把截断的输入当作正常结束，所以直接结束 ffmpeg
+                process.kill()
+                process.wait()
+                _remove_renditions(renditions)
+                raise
+            returncode = process.wait()
+            if returncode != 0:
+                _remove_renditions(renditions)
+                log_file.seek(0)
+                raise Exception(f"FFmpeg 错误: {log_file.read()}")
+
+    return {rendition['height']: rendition['output_path'] for rendition in renditions}
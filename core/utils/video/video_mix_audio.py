@@ -1,6 +1,9 @@
 import os
 from moviepy.editor import VideoFileClip, AudioFileClip
 
+from .video_encode_profile import get_encode_profile, moviepy_encode_kwargs
+from .video_scratch import ScratchSpace
+
 
 def mix_video_audio(video_path: str, audio_path: str, output_path: str) -> str:
     """
@@ -32,7 +35,9 @@ def mix_video_audio(video_path: str, audio_path: str, output_path: str) -> str:
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
         # 写入新的视频文件
-        final_video.write_videofile(output_path, codec='libx264', audio_codec='aac')
+        with ScratchSpace(prefix="mix_audio_") as scratch:
+            final_video.write_videofile(output_path, audio_codec='aac', temp_audiofile=scratch.path('audio.m4a'),
+                                        **moviepy_encode_kwargs(get_encode_profile(video.w, video.h)))
         
         # 关闭文件以释放资源
         video.close()
@@ -0,0 +1,149 @@
+################################################################################
+# 流媒体打包：把成品视频用流复制（不重新编码）打包成 fMP4 HLS 分段和播放列表，可选同时生成 DASH，
+# 分段边界落在关键帧上
+################################################################################
+
+import os
+import shutil
+from typing import Dict, List, Sequence
+
+from .video_ffmpeg import probe_keyframe_times, run_ffmpeg
+from .video_index import keyframe_times, read_cached_index
+from ..common.logger import log
+
+# 支持的打包格式
+SUPPORTED_FORMATS = ('hls', 'dash')
+
+# 默认分段时长（秒）
+DEFAULT_SEGMENT_SECONDS = 6.0
+
+# 检查关键帧间隔时只读取视频开头的时长（秒），编码器的关键帧间隔设置在整个视频中通常不变
+KEYFRAME_CHECK_SECONDS = 60.0
+
+
+def _check_keyframe_interval(video_path: str, segment_seconds: float):
+    """
+    流复制只能在关键帧处切分，关键帧间隔大于分段时长时分段会被拉长，这里提前给出提示。
+    有关键帧索引缓存时直接使用，否则只读取视频开头的数据包，不生成索引文件
+    """
+    index = read_cached_index(video_path)
+    if index is not None:
+        times = keyframe_times(index)
+    else:
+        times = probe_keyframe_times(video_path, KEYFRAME_CHECK_SECONDS)
+    max_interval = max((b - a for a, b in zip(times, times[1:])), default=0.0)
+    if max_interval > segment_seconds:
+        log.warning(f"视频最大关键帧间隔 {max_interval:.2f} 秒，大于分段时长 {segment_seconds:.2f} 秒，"
+                    f"部分分段会比目标时长更长: {video_path}")
+
+
+def package_hls(video_path: str, output_dir: str, segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+                playlist_name: str = "index.m3u8") -> str:
+    """
+    打包为 fMP4 HLS：init.mp4 + seg_xxxxx.m4s 分段 + VOD 播放列表
+
+    Args:
+        video_path: 视频文件路径
+        output_dir: 输出目录
+        segment_seconds: 目标分段时长（秒），实际分段在该时长之后的第一个关键帧处切分
+        playlist_name: 播放列表文件名
+
+    Returns:
+        播放列表路径
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    playlist_path = os.path.join(output_dir, playlist_name)
+    run_ffmpeg([
+        '-loglevel', 'error',
+        '-i', video_path,
+        '-map', '0:v:0', '-map', '0:a?',
+        '-c', 'copy',
+        '-f', 'hls',
+        '-hls_time', f"{segment_seconds:g}",
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_type', 'fmp4',
+        '-hls_fmp4_init_filename', 'init.mp4',
+        '-hls_segment_filename', os.path.join(output_dir, 'seg_%05d.m4s'),
+        playlist_path
+    ])
+    return playlist_path
+
+
+def package_dash(video_path: str, output_dir: str, segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+                 manifest_name: str = "manifest.mpd") -> str:
+    """
+    打包为 DASH：每路流一个初始化分段 + 按编号命名的媒体分段 + MPD 清单
+
+    Args:
+        video_path: 视频文件路径
+        output_dir: 输出目录
+        segment_seconds: 目标分段时长（秒）
+        manifest_name: 清单文件名
+
+    Returns:
+        清单路径
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, manifest_name)
+    run_ffmpeg([
+        '-loglevel', 'error',
+        '-i', video_path,
+        '-map', '0:v:0', '-map', '0:a?',
+        '-c', 'copy',
+        '-f', 'dash',
+        '-seg_duration', f"{segment_seconds:g}",
+        '-use_template', '1',
+        '-use_timeline', '1',
+        '-init_seg_name', 'init-$RepresentationID$.m4s',
+        '-media_seg_name', 'chunk-$RepresentationID$-$Number%05d$.m4s',
+        manifest_path
+    ])
+    return manifest_path
+
+
+def package_video(video_path: str, output_dir: str, formats: Sequence[str] = ('hls',),
+                  segment_seconds: float = DEFAULT_SEGMENT_SECONDS) -> Dict[str, str]:
+    """
+    按指定格式打包视频，每种格式输出到 output_dir 下的同名子目录，子目录在打包前清空，
+    避免重新打包时残留上次更多的分段
+
+    Args:
+        video_path: 视频文件路径
+        output_dir: 输出目录
+        formats: 打包格式，可选 'hls'、'dash'
+        segment_seconds: 目标分段时长（秒）
+
+    Returns:
+        {格式: 播放列表或清单路径}
+    """
+    for package_format in formats:
+        if package_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的打包格式: {package_format}")
+
+    _check_keyframe_interval(video_path, segment_seconds)
+    outputs = {}
+    for package_format in formats:
+        package_dir = os.path.join(output_dir, package_format)
+        if os.path.isdir(package_dir):
+            shutil.rmtree(package_dir)
+        if package_format == 'hls':
+            outputs[package_format] = package_hls(video_path, package_dir, segment_seconds)
+        else:
+            outputs[package_format] = package_dash(video_path, package_dir, segment_seconds)
+    return outputs
+
+
+def package_videos(video_paths: List[str], output_dir: str, formats: Sequence[str] = ('hls',),
+                   segment_seconds: float = DEFAULT_SEGMENT_SECONDS) -> Dict[str, Dict[str, str]]:
+    """
+    批量打包，每个视频输出到 output_dir 下以视频文件名（不含扩展名）命名的子目录
+
+    Returns:
+        {视频路径: {格式: 播放列表或清单路径}}
+    """
+    results = {}
+    for video_path in video_paths:
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        results[video_path] = package_video(video_path, os.path.join(output_dir, name), formats, segment_seconds)
+    log.info(f"完成打包 {len(results)} 个视频，格式: {', '.join(formats)}")
+    return results
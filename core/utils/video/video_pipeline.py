@@ -6,11 +6,15 @@
 3. 下载字幕，命名为v1.srt
 4. 通过大模型生成分段，将返回结果写入到llm.txt文件中
 5. 分割视频，写入到output/spilt文件夹中
+6. 将带字幕的视频和切分后的视频打包为 HLS（可选 DASH），写入到output/package文件夹中
+合并编码模式（fused=True）下，合并音视频、添加字幕、切分三个环节合并为每个片段一次编码
+下载视频后，如果当前主机还没有该分辨率的编码参数调优结果，先调优一次（autotune_encoder=False 时跳过，使用默认参数）
 '''
 
 import os
+import shutil
 import warnings
-from typing import Optional, List, Tuple
+from typing import Optional, List, Sequence, Tuple
 
 from moviepy.editor import VideoFileClip
 
@@ -19,9 +23,17 @@ from core.utils.srt.srt_download import get_srt_file
 from core.utils.srt.srt_download_impl.youtube import extract_video_id
 from core.utils.video.video_add_subtitle import add_subtitle
 from core.utils.video.video_download import download_video_by_url, download_audio_by_url
+from core.utils.video.video_encode_profile import ensure_encode_profile
+from core.utils.video.video_ffmpeg import probe_media_info
+from core.utils.video.video_fused import render_clips_fused
+from core.utils.video.video_ladder import plan_renditions
 from core.utils.video.video_mix_audio import mix_video_audio
+from core.utils.video.video_package import package_videos
 from core.utils.video.video_spilt_with_llm import srt_spilt_by_llm_v2, get_time_ranges
 from core.utils.video.video_split import split_video_v2
+from core.utils.video.video_split_ffmpeg import plan_clips
+from core.utils.video.video_subtitle_ass import has_libass
+from core.utils.video.video_subtitle_soft import attach_clip_subtitles
 from core.utils.video.video_srt_transfer import translate_srt_file
 
 # 过滤 imageio 的警告
@@ -42,8 +54,9 @@ def suppress_warnings(func):
 
 
 class ProcessState:
-    def __init__(self, output_dir: str):
+    def __init__(self, output_dir: str, subtitle_mode: str = 'burn'):
         self.output_dir = output_dir
+        self.subtitle_mode = subtitle_mode  # 'burn' 烧录字幕，'soft' 封装软字幕
         self.video_path = os.path.join(output_dir, "v1.mp4")
         self.audio_path = os.path.join(output_dir, "v1.mp3")
         self.mixed_path = os.path.join(output_dir, "v1_mixed.mp4")
@@ -51,7 +64,9 @@ class ProcessState:
         self.srt_zh_path = os.path.join(output_dir, "v1_zh-cn.srt")  # 添加中文字幕路径
         self.llm_spilt_path = os.path.join(output_dir, "llm_spilt.txt")  # 大模型切分后的结果
         self.with_subtitle_path = os.path.join(output_dir, "v1_with_subtitle.mp4")
+        self.soft_subtitle_path = os.path.join(output_dir, "v1_soft_subtitle.mp4")
         self.split_dir = os.path.join(output_dir, "output", "split")
+        self.package_dir = os.path.join(output_dir, "output", "package")
 
     def has_video(self) -> bool:
         """检查视频是否已下载"""
@@ -77,16 +92,39 @@ class ProcessState:
         """检查字幕已添加到视频中"""
         return os.path.exists(self.with_subtitle_path) and os.path.getsize(self.with_subtitle_path) > 0
 
+    def has_soft_subtitle(self) -> bool:
+        """检查软字幕视频是否存在"""
+        return os.path.exists(self.soft_subtitle_path) and os.path.getsize(self.soft_subtitle_path) > 0
+
+    def get_subtitle_tracks(self) -> List[Tuple[str, str]]:
+        """获取软字幕模式下封装的字幕轨：中文字幕（默认）和原文字幕"""
+        return [(self.srt_zh_path, 'zho'), (self.srt_path, 'und')]
+
     def has_llm_spilt(self ) -> bool:
         """检查大模型切分后的结果是否存在"""
         return os.path.exists(self.llm_spilt_path) and os.path.getsize(self.llm_spilt_path) > 0
 
-    def has_split_videos(self) -> bool:
-        """检查是否已有切分的视频"""
+    def has_split_videos(self, clip_paths: Optional[List[str]] = None) -> bool:
+        """检查是否已有切分的视频，指定 clip_paths 时检查这些片段是否全部生成"""
+        if clip_paths is not None:
+            return all(os.path.exists(path) and os.path.getsize(path) > 0 for path in clip_paths)
         return os.path.exists(self.split_dir) and len(os.listdir(self.split_dir)) > 0
 
+    def has_package(self) -> bool:
+        """检查是否已打包"""
+        return os.path.exists(self.package_dir) and len(os.listdir(self.package_dir)) > 0
+
+    def get_split_video_paths(self) -> List[str]:
+        """获取切分后的视频路径列表"""
+        if not os.path.exists(self.split_dir):
+            return []
+        return [os.path.join(self.split_dir, name) for name in sorted(os.listdir(self.split_dir))
+                if name.endswith('.mp4')]
+
     def get_final_video_path(self) -> str:
         """获取最终使用的视频路径"""
+        if self.subtitle_mode == 'soft' and self.has_soft_subtitle():
+            return self.soft_subtitle_path
         return self.with_subtitle_path if self.has_with_subtitle() else self.mixed_path
 
 
@@ -95,7 +133,13 @@ def process_youtube_video(
         url: str,
         output_base_dir: str,
         split_ranges: Optional[List[Tuple[float, float]]] = None,
-        force_reprocess: bool = False
+        force_reprocess: bool = False,
+        package_formats: Optional[Sequence[str]] = ('hls',),
+        ladder_heights: Optional[List[int]] = None,
+        subtitle_mode: str = 'burn',
+        fused: bool = False,
+        keep_intermediates: bool = False,
+        autotune_encoder: bool = True
 ) -> str:
     """
     处理YouTube视频的完整流程，支持断点续传
@@ -106,6 +150,16 @@ def process_youtube_video(
         split_ranges: 视频切分时间区间列表，每个元素是(开始时间,结束时间)的元组
                     如果为None，则不进行视频切分
         force_reprocess: 是否强制重新处理所有步骤
+        package_formats: 打包格式，可选 'hls'、'dash'，如果为None，则不进行打包
+        ladder_heights: 带字幕的视频和切分后的视频同时输出的低分辨率版本高度列表，例如 [1080, 720, 480]，
+                    如果为None，则只输出原分辨率
+        subtitle_mode: 字幕添加方式，'burn' 烧录到画面中（需要重新编码），
+                    'soft' 将中文字幕和原文字幕作为文本字幕轨封装（流复制，不重新编码），切分后的视频同样带有软字幕
+        fused: 是否使用合并编码：每个片段直接从原始视频和音频编码一次，同时烧录字幕，
+                    不生成 v1_mixed.mp4 和 v1_with_subtitle.mp4（只支持 'burn' 方式，需要 ffmpeg 带有 libass）
+        keep_intermediates: 合并编码时是否仍然生成 v1_with_subtitle.mp4，以及视频没有音频时的 v1_mixed.mp4（视频流复制），
+                    视频自带音频时与逐个环节处理一样不生成 v1_mixed.mp4
+        autotune_encoder: 当前主机没有该分辨率的编码参数调优结果时，是否先调优（结果缓存，只需调优一次）
     
     Returns:
         str: 处理后的视频目录路径
@@ -120,7 +174,11 @@ def process_youtube_video(
     os.makedirs(output_dir, exist_ok=True)
 
     # 初始化状态管理器
-    state = ProcessState(output_dir)
+    state = ProcessState(output_dir, subtitle_mode)
+
+    if fused and (subtitle_mode != 'burn' or not has_libass()):
+        log.warning("合并编码只支持 ffmpeg（libass）烧录字幕，改为逐个环节处理")
+        fused = False
 
     try:
         # 1. 下载视频
@@ -130,8 +188,19 @@ def process_youtube_video(
         else:
             log.info("视频已存在，跳过下载")
 
+        # 1.1 编码参数调优，之后各编码环节读取缓存的调优结果
+        if autotune_encoder:
+            ensure_encode_profile(state.video_path)
+
         # 2. 检查视频是否有音频，如果没有则下载并合并
-        if not state.has_mixed_video():  # 如果没有合并的视频，检查是否需要合并
+        needs_audio = False
+        if fused:
+            # 合并编码时不单独合并音视频，切分时直接读取音频文件
+            needs_audio = not probe_media_info(state.video_path)['has_audio']
+            if needs_audio and (force_reprocess or not state.has_audio()):
+                log.info("视频没有音频，开始下载音频")
+                download_audio_by_url(url, state.audio_path)
+        elif not state.has_mixed_video():  # 如果没有合并的视频，检查是否需要合并
             video = VideoFileClip(state.video_path)
             needs_audio = video.audio is None
             video.close()
@@ -168,7 +237,24 @@ def process_youtube_video(
             log.info("中文字幕已存在，跳过翻译")
 
         # 4. 添加字幕到视频中
-        if force_reprocess or not state.has_with_subtitle():
+        if fused:
+            log.info("合并编码模式，字幕在切分时烧录")
+        elif subtitle_mode == 'soft':
+            if force_reprocess or not state.has_soft_subtitle():
+                log.info("开始封装软字幕")
+                add_subtitle(
+                    video_path=state.mixed_path,
+                    srt_path=state.srt_zh_path,
+                    output_path=state.soft_subtitle_path,
+                    mode='soft',
+                    language='zho',
+                    extra_subtitles=state.get_subtitle_tracks()[1:],
+                    ladder_heights=ladder_heights
+                )
+                log.info("完成封装软字幕")
+            else:
+                log.info("软字幕已封装，跳过字幕添加步骤")
+        elif force_reprocess or not state.has_with_subtitle():
             log.info("开始添加字幕到视频中")
             add_subtitle(
                 video_path=state.mixed_path,
@@ -177,7 +263,8 @@ def process_youtube_video(
                 fontsize=40,  # 稍微大一点的字体
                 color='white',
                 stroke_color='white',
-                stroke_width=2  # 稍微粗一点的描边
+                stroke_width=2,  # 稍微粗一点的描边
+                ladder_heights=ladder_heights
             )
             log.info("完成添加字幕到视频中")
         else:
@@ -200,17 +287,65 @@ def process_youtube_video(
             log.info("大模型切分结果已存在，跳过大模型切分步骤")
 
         # 6. 如果需要切分视频
-        if split_ranges:
-            if force_reprocess or not state.has_split_videos():
+        if fused:
+            # 上次部分片段失败时重新编码
+            clips = plan_clips(state.video_path, state.split_dir, split_ranges or [])
+            if force_reprocess or not clips or not state.has_split_videos([clip[2] for clip in clips]):
+                os.makedirs(state.split_dir, exist_ok=True)
+                log.info("开始合并编码：音视频合并、添加字幕、切分一次完成")
+                render_clips_fused(
+                    state.video_path,
+                    state.split_dir,
+                    split_ranges or [],
+                    srt_path=state.srt_zh_path,
+                    audio_path=state.audio_path if needs_audio else None,
+                    fontsize=40,
+                    color='white',
+                    stroke_color='white',
+                    stroke_width=2,
+                    mixed_path=state.mixed_path if keep_intermediates and needs_audio else None,
+                    with_subtitle_path=state.with_subtitle_path if keep_intermediates else None,
+                    ladder_heights=ladder_heights
+                )
+                log.info("完成合并编码")
+            else:
+                log.info("视频已切分，跳过切分步骤")
+        elif split_ranges:
+            # 上次切分部分片段失败时重新切分
+            clips = plan_clips(state.get_final_video_path(), state.split_dir, split_ranges)
+            if force_reprocess or not state.has_split_videos([clip[2] for clip in clips]):
                 # 创建切分输出目录
                 os.makedirs(state.split_dir, exist_ok=True)
 
-                # 切分视频
+                # 切分视频，任一片段失败时抛出异常
                 log.info("开始切分视频")
-                split_video_v2(state.get_final_video_path(), state.split_dir, split_ranges)
+                split_video_v2(state.get_final_video_path(), state.split_dir, split_ranges,
+                               ladder_heights=ladder_heights)
+                
+                # 切分只保留视频和音频，按片段的时间区间截取字幕重新封装，低分辨率版本同样封装
+                if subtitle_mode == 'soft':
+                    info = probe_media_info(state.get_final_video_path())
+                    soft_clips = []
+                    for start_time, end_time, output_path, _ in clips:
+                        renditions = plan_renditions(output_path, info['width'], info['height'], ladder_heights or [])
+                        soft_clips += [(rendition['output_path'], start_time, end_time) for rendition in renditions]
+                    attach_clip_subtitles(soft_clips, state.get_subtitle_tracks())
             else:
                 log.info("视频已切分，跳过切分步骤")
 
+        # 7. 打包为流媒体格式（流复制，不重新编码）
+        if package_formats:
+            if force_reprocess or not state.has_package():
+                log.info("开始打包视频")
+                # 清空上次的打包结果，避免残留已经不存在的片段
+                shutil.rmtree(state.package_dir, ignore_errors=True)
+                # 合并编码时完整长度的视频可能没有生成
+                final_videos = [path for path in [state.get_final_video_path()] if os.path.exists(path)]
+                package_videos(final_videos + state.get_split_video_paths(), state.package_dir, package_formats)
+                log.info("完成打包视频")
+            else:
+                log.info("视频已打包，跳过打包步骤")
+
     except Exception as e:
         log.error(f"处理过程中出错: {str(e)}")
         # 继续抛出异常，但保留已完成的步骤
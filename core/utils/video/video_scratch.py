@@ -0,0 +1,72 @@
+################################################################################
+# 任务级临时目录：每个任务一个独立目录，空间足够时优先放在内存文件系统（/dev/shm），
+# 任务结束（包括异常）时整个目录被删除
+################################################################################
+
+import itertools
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Optional
+
+# 内存文件系统目录
+SHM_DIR = '/dev/shm'
+
+# 使用内存文件系统时至少保留的剩余空间，避免把内存占满
+SHM_RESERVE_BYTES = 512 * 1024 * 1024
+
+
+def _choose_base_dir(expected_bytes: int) -> str:
+    """
+    选择临时目录所在的位置：/dev/shm 可写且剩余空间足够时使用 /dev/shm，否则使用系统临时目录
+    """
+    if os.path.isdir(SHM_DIR) and os.access(SHM_DIR, os.W_OK):
+        try:
+            free_bytes = shutil.disk_usage(SHM_DIR).free
+        except OSError:
+            free_bytes = 0
+        if free_bytes >= expected_bytes + SHM_RESERVE_BYTES:
+            return SHM_DIR
+    return tempfile.gettempdir()
+
+
+class ScratchSpace:
+    """
+    任务级临时目录，推荐用 with 语句使用：
+
+        with ScratchSpace(prefix="add_subtitle_") as scratch:
+            temp_audio_path = scratch.path("audio.m4a")
+
+    退出 with 语句（包括异常）时删除整个目录；没有用 with 语句时，对象被回收或进程退出时删除
+    """
+
+    def __init__(self, prefix: str = "video_job_", expected_bytes: int = 0, base_dir: Optional[str] = None):
+        """
+        Args:
+            prefix: 目录名前缀
+            expected_bytes: 预计占用的空间（字节），用于判断内存文件系统是否放得下
+            base_dir: 指定临时目录所在位置，默认自动选择
+        """
+        self.base_dir = base_dir or _choose_base_dir(expected_bytes)
+        self.dir = tempfile.mkdtemp(prefix=prefix, dir=self.base_dir)
+        self._counter = itertools.count()
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.dir, True)
+
+    def path(self, name: str) -> str:
+        """
+        生成临时文件路径（不创建文件），同一个任务内多次使用相同名称也不会冲突
+        """
+        return os.path.join(self.dir, f"{next(self._counter):03d}_{name}")
+
+    def cleanup(self):
+        """
+        删除临时目录及其中的所有文件
+        """
+        self._finalizer()
+
+    def __enter__(self) -> 'ScratchSpace':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
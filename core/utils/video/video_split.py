@@ -3,21 +3,49 @@
 ################################################################################
 
 import os
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
 
 from moviepy.editor import VideoFileClip
-from tqdm import tqdm
 
 from .scene_detection_methods import (
     detect_by_frame_diff,
     detect_by_histogram,
     detect_by_optical_flow,
-    detect_combined
+    detect_combined,
+    detect_by_phash,
+    detect_by_sampling,
+    merge_scene_changes
 )
+from .scene_detection_cache import detect_with_cache
+from .scene_detection_ffmpeg import detect_by_ffmpeg
+from .scene_detection_optical_flow import detect_by_optical_flow_fast
+from .scene_detection_parallel import detect_by_chunks
+from .scene_detection_stream import iter_scene_changes
+from .video_ffmpeg import probe_media_info
+from .video_split_ffmpeg import plan_clips, split_video_ffmpeg, split_video_single_pass
+from .video_split_parallel import encode_clips, write_clip
+from .video_split_planner import split_video_planned
+from .video_thumbnail import make_sprite_sheet, save_thumbnails
+from .scene_detection_threaded import detect_by_threads
 from ..common.logger import log
 
 
-def detect_scene_changes(video_path: str, threshold: float = 30.0, method: str = 'frame_diff') -> List[float]:
+def _method_thresholds(method: str, threshold: float) -> Dict[str, float]:
+    """
+    将检测方法转换为各指标的阈值
+    """
+    if method == 'combined':
+        return {'frame_diff': threshold, 'histogram': threshold}
+    elif method in ('frame_diff', 'histogram', 'optical_flow'):
+        return {method: threshold}
+    else:
+        raise ValueError(f"不支持的检测方法: {method}")
+
+
+def detect_scene_changes(video_path: str, threshold: float = 30.0, method: str = 'frame_diff',
+                         stride: int = 1, resize_width: Optional[int] = None,
+                         workers: int = 1, threads: int = 0, use_cache: bool = False) -> List[float]:
     """
     检测视频中的转场时间点
     
@@ -28,11 +56,41 @@ def detect_scene_changes(video_path: str, threshold: float = 30.0, method: str =
                - 'frame_diff': 帧差法（默认）
                - 'histogram': 直方图比较法
                - 'optical_flow': 光流法
+               - 'optical_flow_fast': 快速光流法（特征点跨帧跟踪 + 低分辨率）
                - 'combined': 组合方法
+               - 'phash': 感知哈希法，threshold 为相邻帧哈希的汉明距离（0-64）
+               - 'ffmpeg': ffmpeg 原生 select 滤镜，threshold 为 scene 分数的百分比（0-100）
+        stride: 抽帧间隔（帧数），大于1时使用由粗到细的抽帧检测
+        resize_width: 抽帧粗检的工作分辨率宽度，指定时使用由粗到细的抽帧检测
+        workers: 并行检测的进程数，大于1时将视频分段后由进程池并行检测
+        threads: 分析线程数，大于0时使用解码线程+分析线程的流水线检测
+        use_cache: 是否缓存逐帧得分序列（视频同目录下的 .npy 文件），再次调整阈值时无需重新解码
         
     Returns:
         转场时间点列表（以秒为单位）
     """
+    sampling = stride > 1 or resize_width is not None
+    if sum([sampling, workers > 1, threads > 0, use_cache]) > 1:
+        raise ValueError("抽帧检测、多进程并行检测、多线程流水线检测、得分缓存只能选择一种")
+
+    if workers > 1 or threads > 0 or sampling or use_cache:
+        thresholds = _method_thresholds(method, threshold)
+        if use_cache:
+            # 缓存检测：读取或生成逐帧得分序列后做向量化阈值判断
+            results = detect_with_cache(video_path, thresholds)
+        elif workers > 1:
+            # 并行检测：按时间分段，每个进程跳转到自己的分段逐帧检测
+            results = detect_by_chunks(video_path, thresholds, workers=workers)
+        elif threads > 0:
+            # 流水线检测：解码线程和分析线程并行
+            results = detect_by_threads(video_path, thresholds, analysis_threads=threads)
+        else:
+            # 抽帧检测：粗检使用抽帧+低分辨率，精检只在候选区间内逐帧进行
+            results = detect_by_sampling(video_path, thresholds, stride=stride, resize_width=resize_width)
+        if method == 'combined':
+            return merge_scene_changes(results['frame_diff'] + results['histogram'])
+        return results[method]
+
     # 根据方法选择相应的检测函数
     if method == 'frame_diff':
         return detect_by_frame_diff(video_path, threshold)
@@ -40,13 +98,54 @@ def detect_scene_changes(video_path: str, threshold: float = 30.0, method: str =
         return detect_by_histogram(video_path, threshold)
     elif method == 'optical_flow':
         return detect_by_optical_flow(video_path, threshold)
+    elif method == 'optical_flow_fast':
+        return detect_by_optical_flow_fast(video_path, threshold)
+    elif method == 'phash':
+        return detect_by_phash(video_path, threshold)
+    elif method == 'ffmpeg':
+        return detect_by_ffmpeg(video_path, threshold)
     elif method == 'combined':
         return detect_combined(video_path, threshold, threshold)
     else:
         raise ValueError(f"不支持的检测方法: {method}")
 
 
-def split_video(video_path: str, output_dir: str, scene_changes: List[float], min_duration: float = 10.0) -> List[str]:
+def _encode_clips_with_thumbnails(video_path: str, clips: List[tuple], workers: Optional[int],
+                                  threads_per_worker: Optional[int], sprite_sheet: bool, desc: str,
+                                  ladder_heights: Optional[List[int]] = None) -> List[str]:
+    """
+    编码片段的同时在后台线程中批量提取首帧缩略图（以及可选的预览雪碧图），
+    缩略图一次按时间顺序读取完成，不需要每个片段编码后再跳转解码。
+    单个片段失败不影响其他片段，全部编码结束后如有失败的片段则抛出异常，列出失败的时间区间
+
+    Returns:
+        与 clips 顺序一致的片段路径列表
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(save_thumbnails, video_path, [(clip[0], clip[3]) for clip in clips])]
+        if sprite_sheet and clips:
+            futures.append(executor.submit(make_sprite_sheet, video_path, os.path.dirname(clips[0][2])))
+        results = encode_clips(video_path, [clip[:3] + (None,) for clip in clips], workers, threads_per_worker, desc,
+                               ladder_heights)
+        for future in futures:
+            future.result()
+
+    failed = []
+    for clip, result in zip(clips, results):
+        if result['error'] is None:
+            continue
+        failed.append(f"[{clip[0]:.2f}, {clip[1]:.2f}]: {result['error']}")
+        if os.path.exists(clip[3]):
+            # 编码失败的片段不保留缩略图
+            os.remove(clip[3])
+    if failed:
+        raise Exception(f"{len(failed)}/{len(clips)} 个片段编码失败: " + '; '.join(failed))
+    return [result['output_path'] for result in results]
+
+
+def split_video(video_path: str, output_dir: str, scene_changes: List[float], min_duration: float = 10.0,
+                workers: Optional[int] = None, threads_per_worker: Optional[int] = None,
+                sprite_sheet: bool = False) -> List[str]:
     """
     根据检测到的转场点切分视频
     
@@ -55,9 +154,12 @@ def split_video(video_path: str, output_dir: str, scene_changes: List[float], mi
         output_dir: 输出目录
         scene_changes: 转场时间点列表
         min_duration: 最小视频时长（秒），小于这个时长的片段会被合并
+        workers: 并行编码的进程数，默认按 CPU 核数自动计算，为 1 时依次编码
+        threads_per_worker: 每个编码进程的 ffmpeg 线程数，默认使用编码参数调优结果中的线程数
+        sprite_sheet: 是否在输出目录生成源视频的预览雪碧图和 WebVTT 索引
         
     Returns:
-        切分后的视频文件路径列表
+        切分后的视频文件路径列表，任一片段编码失败时抛出异常（其他片段仍会编码完成）
     """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -68,11 +170,8 @@ def split_video(video_path: str, output_dir: str, scene_changes: List[float], mi
         if os.path.isfile(file_path):
             os.remove(file_path)
     
-    # 使用 moviepy 加载视频
-    video = VideoFileClip(video_path)
-    
     # 添加视频起始点和结束点
-    time_points = [0] + scene_changes + [video.duration]
+    time_points = [0] + scene_changes + [probe_media_info(video_path)['duration']]
     
     # 合并过短的片段
     merged_points = []
@@ -100,72 +199,102 @@ def split_video(video_path: str, output_dir: str, scene_changes: List[float], mi
     # 添加最后的结束点
     merged_points.append(time_points[-1])
     
-    output_files = []
+    clips = []
     # 按照合并后的时间点切分视频
-    for i in tqdm(range(len(merged_points) - 1), desc="按照时间点切分视频", position=0):
-        start_time = merged_points[i]
-        end_time = merged_points[i + 1]
-        
-        # 设置输出文件
+    for i in range(len(merged_points) - 1):
+        # 设置输出文件和首帧图片保存路径
         output_path = os.path.join(output_dir, f"scene_{i:03d}.mp4")
-        # 设置首帧图片保存路径
         thumbnail_path = os.path.join(output_dir, f"scene_{i:03d}_thumb.jpg")
+        clips.append((merged_points[i], merged_points[i + 1], output_path, thumbnail_path))
+    
+    return _encode_clips_with_thumbnails(video_path, clips, workers, threads_per_worker, sprite_sheet,
+                                         desc="按照时间点切分视频")
+
+
+def split_video_streaming(video_path: str, output_dir: str, scene_changes: Iterable[float],
+                          min_duration: float = 10.0) -> List[str]:
+    """
+    边检测边切分视频：scene_changes 可以是 iter_scene_changes 返回的生成器，
+    每当确定一个不短于 min_duration 的片段，就交给后台线程编码，检测继续在当前线程进行。
+    片段在确定下一个片段后才开始编码，最后一个片段过短时可以与它合并
+    
+    Args:
+        video_path: 源视频路径
+        output_dir: 输出目录，切分前清空
+        scene_changes: 按时间顺序产生的转场时间点
+        min_duration: 最小视频时长（秒），小于这个时长的片段会与后面的片段合并，最后一个片段过短时与前一个片段合并
         
-        # 提取视频片段
-        clip = video.subclip(start_time, end_time)
-        
-        # 保存视频片段（保留音频）
+    Returns:
+        切分后的视频文件路径列表，任一片段编码失败时抛出异常（其他片段仍会编码完成）
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 清空输出目录
+    for filename in os.listdir(output_dir):
+        file_path = os.path.join(output_dir, filename)
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+    
+    # 使用 moviepy 加载视频
+    video = VideoFileClip(video_path)
+    
+    def write_segment(index: int, start_time: float, end_time: float) -> Optional[str]:
+        output_path = os.path.join(output_dir, f"scene_{index:03d}.mp4")
+        thumbnail_path = os.path.join(output_dir, f"scene_{index:03d}_thumb.jpg")
         try:
-            # 确保当前目录可写
-            temp_dir = os.path.dirname(output_path)
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # 设置临时文件路径
-            temp_audio_path = os.path.join(temp_dir, f'temp_audio_{i}.m4a')
-            
-            # 先检查视频是否有音频
-            has_audio = clip.audio is not None
-            
-            # 设置 ffmpeg_params 来避免 stdout 错误
-            ffmpeg_params = ['-hide_banner', '-loglevel', 'error']
-            
-            clip.write_videofile(
-                output_path,
-                codec='libx264',
-                audio_codec='aac' if has_audio else None,
-                temp_audiofile=temp_audio_path if has_audio else None,
-                remove_temp=True,
-                verbose=False,
-                logger=None,
-                ffmpeg_params=ffmpeg_params,
-                preset='medium',  # 使用更稳定的编码预设
-                threads=2  # 限制线程数以提高稳定性
-            )
-            
+            clip = video.subclip(start_time, end_time)
+            # 子片段与原视频共用读取器，这里不能关闭子片段
+            write_clip(clip, output_path, thumbnail_path)
         except Exception as e:
-            log.error(f"保存视频片段时出错: {str(e)}")
-            if os.path.exists(output_path):
-                try:
-                    os.remove(output_path)
-                except:
-                    pass
-            raise
-        
-        # 保存首帧缩略图
-        clip.save_frame(thumbnail_path, t=0)
-        
-        # 关闭当前片段
-        clip.close()
-        
-        output_files.append(output_path)
+            return str(e)
+        log.info(f"片段 {index} 切分完成: [{start_time:.2f}, {end_time:.2f}]")
+        return None
     
-    # 关闭原视频
-    video.close()
-    
-    return output_files
+    # 单个编码线程按顺序编码，和检测并行
+    segments = []
+    futures = []
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            def submit(start_time: float, end_time: float):
+                futures.append(executor.submit(write_segment, len(segments), start_time, end_time))
+                segments.append((start_time, end_time))
+
+            # 已确定但还没有开始编码的片段
+            pending = None
+            start_time = 0.0
+            for scene_time in scene_changes:
+                if scene_time - start_time < min_duration:
+                    continue
+                if pending is not None:
+                    submit(*pending)
+                pending = (start_time, scene_time)
+                start_time = scene_time
+            
+            # 最后一个片段，过短时与前一个片段合并
+            if pending is not None and video.duration - start_time < min_duration:
+                submit(pending[0], video.duration)
+            else:
+                if pending is not None:
+                    submit(*pending)
+                if video.duration - start_time > 0:
+                    submit(start_time, video.duration)
+            
+            errors = [future.result() for future in futures]
+    finally:
+        # 关闭原视频
+        video.close()
 
+    failed = [f"[{start_time:.2f}, {end_time:.2f}]: {error}"
+              for (start_time, end_time), error in zip(segments, errors) if error]
+    if failed:
+        raise Exception(f"{len(failed)}/{len(segments)} 个片段编码失败: " + '; '.join(failed))
+    return [os.path.join(output_dir, f"scene_{index:03d}.mp4") for index in range(len(segments))]
 
-def split_video_v2(video_path: str, output_dir: str, time_ranges: List[tuple]) -> List[str]:
+
+def split_video_v2(video_path: str, output_dir: str, time_ranges: List[tuple], mode: str = 'reencode',
+                   keyframe_tolerance: Optional[float] = None, workers: Optional[int] = None,
+                   threads_per_worker: Optional[int] = None, sprite_sheet: bool = False,
+                   ladder_heights: Optional[List[int]] = None) -> List[str]:
     """
     根据指定的时间区间列表切分视频
     
@@ -174,87 +303,43 @@ def split_video_v2(video_path: str, output_dir: str, time_ranges: List[tuple]) -
         output_dir: 输出目录
         time_ranges: 时间区间列表，每个元素是一个元组 (start_time, end_time)
                     例如: [(0, 10), (15, 25), (30, 40)] 表示提取 0-10秒、1-25秒和30-40秒的片段
+        mode: 切分模式：
+              - 'reencode': 使用 moviepy 逐帧重新编码（默认）
+              - 'copy': ffmpeg 流复制，片段起点对齐到关键帧，速度最快
+              - 'smart': 只重新编码片段开头不完整的 GOP，其余流复制，起点精确
+              - 'single_pass': 单个 ffmpeg 进程只解码一遍源视频，同时编码所有片段，适合区间重叠或相邻较多的情况
+              - 'planned': 区间重叠的部分只编码一次，再流复制拼接出各个片段，可先用 plan_spans 预览节省的编码时长
+        keyframe_tolerance: copy/smart 模式下片段起点对齐到关键帧的最大允许偏移（秒）
+        workers: reencode/planned 模式下并行编码的进程数，默认按 CPU 核数自动计算，为 1 时依次编码
+        threads_per_worker: reencode 模式下每个编码进程的 ffmpeg 线程数，默认使用编码参数调优结果中的线程数
+        sprite_sheet: reencode 模式下是否在输出目录生成源视频的预览雪碧图和 WebVTT 索引
+        ladder_heights: reencode 模式下每个片段同时输出的低分辨率版本高度列表，例如 [1080, 720, 480]，
+                        保存为 clip_000_0.0-10.0_720p.mp4，不在返回的路径列表中
         
     Returns:
-        切分后的视频文件路径列表
+        切分后的视频文件路径列表；reencode 模式下任一片段编码失败时抛出异常（其他片段仍会编码完成）
     """
+    if mode in ('copy', 'smart'):
+        return split_video_ffmpeg(video_path, output_dir, time_ranges, mode, keyframe_tolerance)
+    elif mode == 'single_pass':
+        return split_video_single_pass(video_path, output_dir, time_ranges)
+    elif mode == 'planned':
+        return split_video_planned(video_path, output_dir, time_ranges, workers=workers)
+    elif mode != 'reencode':
+        raise ValueError(f"不支持的切分模式: {mode}")
+    
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    # 使用 moviepy 加载视频
-    video = VideoFileClip(video_path)
+    clips = plan_clips(video_path, output_dir, time_ranges)
     
-    output_files = []
-    # 按照时间区间切分视频
-    for i, (start_time, end_time) in enumerate(tqdm(time_ranges, desc="按照时间区间切分视频", position=0)):
-        # 验证时间区间
-        if start_time >= end_time:
-            print(f"\n警告: 跳过无效的时间区间 [{start_time}, {end_time}]")
-            continue
-        
-        if start_time < 0 or end_time > video.duration:
-            print(f"\n警告: 时间区间 [{start_time}, {end_time}] 超出视频范围 [0, {video.duration}]")
-            continue
-        
-        # 设置输出文件
-        output_path = os.path.join(output_dir, f"clip_{i:03d}_{start_time:.1f}-{end_time:.1f}.mp4")
-        # 设置首帧图片保存路径
-        thumbnail_path = os.path.join(output_dir, f"clip_{i:03d}_{start_time:.1f}-{end_time:.1f}_thumb.jpg")
-        
-        # 提取视频片段
-        try:
-            clip = video.subclip(start_time, end_time)
-            
-            # 确保当前目录可写
-            temp_dir = os.path.dirname(output_path)
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # 设置临时文件路径
-            temp_audio_path = os.path.join(temp_dir, f'temp_audio_{i}.m4a')
-            
-            # 先检查视频是否有音频
-            has_audio = clip.audio is not None
-            
-            # 设置 ffmpeg_params 来避免 stdout 错误
-            ffmpeg_params = ['-hide_banner', '-loglevel', 'error']
-            
-            clip.write_videofile(
-                output_path,
-                codec='libx264',
-                audio_codec='aac' if has_audio else None,
-                temp_audiofile=temp_audio_path if has_audio else None,
-                remove_temp=True,
-                verbose=False,
-                logger=None,
-                ffmpeg_params=ffmpeg_params,
-                preset='medium',  # 使用更稳定的编码预设
-                threads=2  # 限制线程数以提高稳定性
-            )
-            
-            # 保存首帧缩略图
-            clip.save_frame(thumbnail_path, t=0)
-            
-            # 关闭当前片段
-            # clip.close()
-            
-            output_files.append(output_path)
-            
-        except Exception as e:
-            log.error(f"保存视频片段时出错: {str(e)}")
-            if os.path.exists(output_path):
-                try:
-                    os.remove(output_path)
-                except:
-                    pass
-            raise
-    
-    # 关闭原视频
-    video.close()
-    
-    return output_files
+    return _encode_clips_with_thumbnails(video_path, clips, workers, threads_per_worker, sprite_sheet,
+                                         desc="按照时间区间切分视频", ladder_heights=ladder_heights)
 
 
-def detect_scene_and_spilt(video_path: str, output_dir: str, threshold: float = 30.0, min_duration: float = 30.0):
+def detect_scene_and_spilt(video_path: str, output_dir: str, threshold: float = 30.0, min_duration: float = 30.0,
+                           stride: int = 1, resize_width: Optional[int] = None, workers: int = 1,
+                           use_cache: bool = False, streaming: bool = False):
     """
     检测视频转场并切分视频
     
@@ -263,9 +348,21 @@ def detect_scene_and_spilt(video_path: str, output_dir: str, threshold: float =
         output_dir: 输出目录
         threshold: 判断转场的阈值，值越大检测越不敏感
         min_duration: 最小视频时长（秒）
+        stride: 转场检测的抽帧间隔（帧数），大于1时以少量边界精度换取更快的检测速度
+        resize_width: 转场检测粗检的工作分辨率宽度，例如 320
+        workers: 转场检测的并行进程数
+        use_cache: 是否缓存转场检测的逐帧得分序列，调整 threshold 重新运行时无需重新解码
+        streaming: 是否边检测边切分，检测到第一个足够长的片段就开始编码（只支持逐帧帧差法，
+                   不能与 stride、resize_width、workers、use_cache 同时使用）
     """
+    if streaming:
+        if stride > 1 or resize_width is not None or workers > 1 or use_cache:
+            raise ValueError("边检测边切分只支持逐帧检测，不能与抽帧检测、并行检测、得分缓存同时使用")
+        return split_video_streaming(video_path, output_dir, iter_scene_changes(video_path, threshold), min_duration)
+    
     # 检测转场
-    scene_changes = detect_scene_changes(video_path, threshold)
+    scene_changes = detect_scene_changes(video_path, threshold, stride=stride, resize_width=resize_width,
+                                         workers=workers, use_cache=use_cache)
 
     # 切分视频
     return split_video(video_path, output_dir, scene_changes, min_duration)
@@ -0,0 +1,346 @@
+################################################################################
+# 使用 ffmpeg 流复制切分视频，不重新编码（或只重新编码片段开头不完整的 GOP）
+################################################################################
+
+import bisect
+import os
+from typing import List, Optional
+
+from tqdm import tqdm
+
+from .video_encode_profile import ffmpeg_encode_args, get_encode_profile, get_video_encode_profile
+from .video_ffmpeg import run_ffmpeg, probe_media_info
+from .video_index import keyframe_times, load_video_index
+from .video_scratch import ScratchSpace
+from .video_thumbnail import save_thumbnails
+from ..common.logger import log
+
+# 时间戳比较的误差（秒）
+TIME_EPSILON = 0.001
+
+# smart 模式重新编码片段开头时 CRF 的上限：开头与流复制的原视频帧直接拼接，画质需要接近原视频，
+# 否则拼接处会出现明显的画质跳变
+SMART_CRF = 18
+
+# smart 模式可以流复制拼接的源视频 H.264 profile 及重新编码开头时对应的 libx264 -profile:v，
+# 开头和原视频的编码格式、像素格式、profile 不一致时拼接出的文件无法正常解码
+SMART_H264_PROFILES = {
+    'Constrained Baseline': 'baseline',
+    'Baseline': 'baseline',
+    'Main': 'main',
+    'High': 'high',
+}
+
+
+def nearest_keyframe(keyframes: List[float], time_point: float) -> float:
+    """
+    找到离指定时间最近的关键帧
+    """
+    index = bisect.bisect_left(keyframes, time_point)
+    candidates = keyframes[max(0, index - 1):index + 1]
+    return min(candidates, key=lambda keyframe: abs(keyframe - time_point))
+
+
+def next_keyframe(keyframes: List[float], time_point: float) -> Optional[float]:
+    """
+    找到指定时间之后（不包含）的第一个关键帧，没有时返回 None
+    """
+    index = bisect.bisect_right(keyframes, time_point + TIME_EPSILON)
+    return keyframes[index] if index < len(keyframes) else None
+
+
+def cut_clip_copy(video_path: str, output_path: str, start_time: float, end_time: float):
+    """
+    流复制切出 [start_time, end_time] 片段，start_time 需要是关键帧时间，否则片段开头会从前一个关键帧开始
+    """
+    run_ffmpeg([
+        '-loglevel', 'error',
+        '-ss', f"{start_time + TIME_EPSILON / 2:.6f}",
+        '-i', video_path,
+        '-t', f"{end_time - start_time:.6f}",
+        '-map', '0:v:0', '-map', '0:a?',
+        '-c', 'copy',
+        '-avoid_negative_ts', 'make_zero',
+        output_path
+    ])
+
+
+def smart_cut_head_args(info: dict) -> Optional[List[str]]:
+    """
+    检查源视频能否与 libx264 重新编码的开头拼接，可以时返回开头需要额外指定的编码参数，否则返回 None
+
+    Args:
+        info: probe_media_info 的返回值
+
+    Returns:
+        ['-profile:v', ..., '-pix_fmt', 'yuv420p']，源视频不是 8 位 4:2:0 的 H.264 时返回 None
+    """
+    x264_profile = SMART_H264_PROFILES.get(info.get('video_profile'))
+    if info.get('video_codec') != 'h264' or info.get('pix_fmt') not in ('yuv420p', 'yuvj420p') or x264_profile is None:
+        return None
+    return ['-profile:v', x264_profile, '-pix_fmt', info['pix_fmt']]
+
+
+def cut_clip_reencode(video_path: str, output_path: str, start_time: float, end_time: float,
+                      with_audio: bool = True, profile: Optional[dict] = None,
+                      video_args: Optional[List[str]] = None):
+    """
+    重新编码切出 [start_time, end_time] 片段，输入端 -ss 在重新编码时是精确到帧的，
+    profile 为编码参数，默认使用当前主机该分辨率缓存的调优结果，video_args 为额外的视频编码参数
+    """
+    args = [
+        '-loglevel', 'error',
+        '-ss', f"{start_time:.6f}",
+        '-i', video_path,
+        '-t', f"{end_time - start_time:.6f}",
+        '-map', '0:v:0',
+    ] + ffmpeg_encode_args(profile or get_video_encode_profile(video_path)) + (video_args or [])
+    if with_audio:
+        args += ['-map', '0:a?', '-c:a', 'aac']
+    else:
+        args += ['-an']
+    run_ffmpeg(args + [output_path])
+
+
+def cut_clip_smart(video_path: str, output_path: str, start_time: float, end_time: float,
+                   keyframes: List[float], profile: Optional[dict] = None, info: Optional[dict] = None):
+    """
+    只重新编码片段开头到第一个关键帧之间的部分，其余部分流复制，最后拼接：
+    1. 视频 [start_time, 第一个关键帧) 按原视频的 H.264 profile 和像素格式重新编码到临时文件
+    2. concat 拼接重新编码的开头和原视频的 [第一个关键帧, end_time]（inpoint/outpoint 直接流复制，不生成中间文件），
+       音频从原视频按 [start_time, end_time] 重新编码为 aac，保证音画同步
+    片段内没有关键帧，或原视频不是 8 位 4:2:0 的 H.264（HEVC、VP9、10 位等）时整段重新编码。
+    重新编码开头时 CRF 不超过 SMART_CRF，preset 和线程数使用 profile；info 为 probe_media_info 的返回值，默认重新读取
+    """
+    head_args = smart_cut_head_args(info or probe_media_info(video_path))
+    keyframe = next_keyframe(keyframes, start_time)
+    if head_args is None or keyframe is None or keyframe >= end_time - TIME_EPSILON:
+        cut_clip_reencode(video_path, output_path, start_time, end_time, profile=profile)
+        return
+
+    with ScratchSpace(prefix="smart_cut_") as scratch:
+        head_path = scratch.path("head.mp4")
+        list_path = scratch.path("concat.txt")
+
+        profile = profile or get_video_encode_profile(video_path)
+        head_profile = dict(profile, crf=min(profile['crf'], SMART_CRF))
+        cut_clip_reencode(video_path, head_path, start_time, keyframe, with_audio=False, profile=head_profile,
+                          video_args=head_args)
+        with open(list_path, 'w') as f:
+            f.write(f"file '{head_path}'\n"
+                    f"file '{os.path.abspath(video_path)}'\n"
+                    f"inpoint {keyframe:.6f}\n"
+                    f"outpoint {end_time:.6f}\n")
+
+        run_ffmpeg([
+            '-loglevel', 'error',
+            '-f', 'concat', '-safe', '0', '-i', list_path,
+            '-ss', f"{start_time:.6f}", '-t', f"{end_time - start_time:.6f}", '-i', video_path,
+            '-map', '0:v:0', '-map', '1:a?',
+            '-c:v', 'copy', '-c:a', 'aac',
+            '-shortest',
+            output_path
+        ])
+
+
+def save_thumbnail(video_path: str, thumbnail_path: str, time_point: float):
+    """
+    保存指定时间点的一帧作为缩略图
+    """
+    run_ffmpeg([
+        '-loglevel', 'error',
+        '-ss', f"{time_point:.6f}",
+        '-i', video_path,
+        '-frames:v', '1',
+        '-q:v', '2',
+        thumbnail_path
+    ])
+
+
+def plan_clips(video_path: str, output_dir: str, time_ranges: List[tuple]) -> List[tuple]:
+    """
+    验证时间区间并生成每个片段的输出路径，跳过无效或超出视频范围的区间
+
+    Args:
+        video_path: 源视频路径
+        output_dir: 输出目录
+        time_ranges: 时间区间列表，每个元素是一个元组 (start_time, end_time)
+
+    Returns:
+        片段列表，每个元素是一个元组 (start_time, end_time, output_path, thumbnail_path)
+    """
+    duration = probe_media_info(video_path)['duration']
+
+    clips = []
+    for i, (start_time, end_time) in enumerate(time_ranges):
+        # 验证时间区间
+        if start_time >= end_time:
+            print(f"\n警告: 跳过无效的时间区间 [{start_time}, {end_time}]")
+            continue
+
+        if start_time < 0 or end_time > duration:
+            print(f"\n警告: 时间区间 [{start_time}, {end_time}] 超出视频范围 [0, {duration}]")
+            continue
+
+        # 设置输出文件
+        output_path = os.path.join(output_dir, f"clip_{i:03d}_{start_time:.1f}-{end_time:.1f}.mp4")
+        # 设置首帧图片保存路径
+        thumbnail_path = os.path.join(output_dir, f"clip_{i:03d}_{start_time:.1f}-{end_time:.1f}_thumb.jpg")
+        clips.append((start_time, end_time, output_path, thumbnail_path))
+    return clips
+
+
+def split_video_ffmpeg(video_path: str, output_dir: str, time_ranges: List[tuple],
+                       mode: str = 'copy', keyframe_tolerance: Optional[float] = None) -> List[str]:
+    """
+    使用 ffmpeg 按时间区间切分视频，不经过 moviepy 逐帧编码
+
+    Args:
+        video_path: 源视频路径
+        output_dir: 输出目录
+        time_ranges: 时间区间列表，每个元素是一个元组 (start_time, end_time)
+        mode: 切分模式：
+              - 'copy': 全部流复制，片段起点对齐到最近的关键帧；
+                        指定 keyframe_tolerance 时，对齐距离超过容差的片段改用 smart 方式
+              - 'smart': 片段起点不是关键帧时，只重新编码起点到下一个关键帧之间的部分，其余流复制；
+                         指定 keyframe_tolerance 时，容差内有关键帧的片段直接对齐到关键帧并流复制
+        keyframe_tolerance: 起点对齐到关键帧的最大允许偏移（秒）
+
+    Returns:
+        切分后的视频文件路径列表
+    """
+    if mode not in ('copy', 'smart'):
+        raise ValueError(f"不支持的切分模式: {mode}")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 关键帧时间戳来自缓存的视频索引，同一个视频多次切分时不需要重新读取数据包
+    keyframes = keyframe_times(load_video_index(video_path))
+    if not keyframes:
+        raise ValueError(f"无法读取视频关键帧: {video_path}")
+
+    info = probe_media_info(video_path)
+    profile = get_encode_profile(info['width'], info['height'])
+    if (mode == 'smart' or keyframe_tolerance is not None) and smart_cut_head_args(info) is None:
+        log.warning(f"源视频（{info['video_codec']} {info['video_profile']} {info['pix_fmt']}）不能与 libx264 "
+                    f"重新编码的开头拼接，起点不是关键帧的片段整段重新编码")
+    output_files = []
+    thumbnails = []
+    for i, (start_time, end_time, output_path, thumbnail_path) in enumerate(
+            tqdm(plan_clips(video_path, output_dir, time_ranges), desc="按照时间区间切分视频", position=0)):
+        keyframe = nearest_keyframe(keyframes, start_time)
+        offset = abs(keyframe - start_time)
+        if mode == 'copy':
+            use_copy = keyframe_tolerance is None or offset <= keyframe_tolerance
+        else:
+            use_copy = offset <= (keyframe_tolerance or TIME_EPSILON)
+
+        try:
+            if use_copy and keyframe < end_time:
+                if offset > TIME_EPSILON:
+                    log.info(f"片段 {i} 起点 {start_time:.3f} 对齐到关键帧 {keyframe:.3f}")
+                cut_clip_copy(video_path, output_path, keyframe, end_time)
+                thumbnail_time = keyframe
+            else:
+                cut_clip_smart(video_path, output_path, start_time, end_time, keyframes, profile, info)
+                thumbnail_time = start_time
+        except Exception as e:
+            log.error(f"保存视频片段时出错: {str(e)}")
+            if os.path.exists(output_path):
+                try:
+                    os.remove(output_path)
+                except:
+                    pass
+            raise
+
+        thumbnails.append((thumbnail_time, thumbnail_path))
+        output_files.append(output_path)
+
+    # 所有片段的首帧缩略图一次按时间顺序读取
+    save_thumbnails(video_path, thumbnails)
+
+    return output_files
+
+
+def build_single_pass_command(video_path: str, clips: List[tuple], has_audio: bool = True,
+                              profile: Optional[dict] = None) -> List[str]:
+    """
+    生成一次解码、多路输出的 ffmpeg 参数：源视频只解码一次，split 成多路后各自 trim 到片段区间再编码
+
+    Args:
+        video_path: 源视频路径
+        clips: plan_clips 返回的片段列表
+        has_audio: 源视频是否包含音频
+        profile: 编码参数，默认使用当前主机该分辨率缓存的调优结果
+
+    Returns:
+        ffmpeg 参数列表（不包含 ffmpeg 本身）
+    """
+    # 输入端跳转到最早的片段起点，只解码 [最早起点, 最晚终点] 之间的内容
+    offset = min(clip[0] for clip in clips)
+    span = max(clip[1] for clip in clips) - offset
+    count = len(clips)
+    encode_args = ffmpeg_encode_args(profile or get_video_encode_profile(video_path))
+
+    filters = [f"[0:v]split={count}" + ''.join(f"[v{i}]" for i in range(count))]
+    if has_audio:
+        filters.append(f"[0:a]asplit={count}" + ''.join(f"[a{i}]" for i in range(count)))
+    for i, (start_time, end_time, _, _) in enumerate(clips):
+        trim = f"start={start_time - offset:.6f}:end={end_time - offset:.6f}"
+        filters.append(f"[v{i}]trim={trim},setpts=PTS-STARTPTS[vout{i}]")
+        if has_audio:
+            filters.append(f"[a{i}]atrim={trim},asetpts=PTS-STARTPTS[aout{i}]")
+
+    args = [
+        '-loglevel', 'error',
+        '-ss', f"{offset:.6f}",
+        '-t', f"{span:.6f}",
+        '-i', video_path,
+        '-filter_complex', ';'.join(filters),
+    ]
+    for i, (_, _, output_path, _) in enumerate(clips):
+        args += ['-map', f"[vout{i}]"] + encode_args
+        if has_audio:
+            args += ['-map', f"[aout{i}]", '-c:a', 'aac']
+        args.append(output_path)
+    return args
+
+
+def split_video_single_pass(video_path: str, output_dir: str, time_ranges: List[tuple]) -> List[str]:
+    """
+    一次解码切分所有片段：单个 ffmpeg 进程按时间顺序解码源视频一遍，
+    每一帧分发给区间覆盖该时间点的所有片段编码器，重叠或相邻的区间不会重复解码
+
+    Args:
+        video_path: 源视频路径
+        output_dir: 输出目录
+        time_ranges: 时间区间列表，每个元素是一个元组 (start_time, end_time)
+
+    Returns:
+        切分后的视频文件路径列表
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    clips = plan_clips(video_path, output_dir, time_ranges)
+    if not clips:
+        return []
+
+    has_audio = probe_media_info(video_path)['has_audio']
+    log.info(f"一次解码切分 {len(clips)} 个片段")
+    try:
+        run_ffmpeg(build_single_pass_command(video_path, clips, has_audio))
+    except Exception as e:
+        log.error(f"保存视频片段时出错: {str(e)}")
+        for _, _, output_path, _ in clips:
+            if os.path.exists(output_path):
+                try:
+                    os.remove(output_path)
+                except:
+                    pass
+        raise
+
+    # 从编码后的片段保存首帧缩略图，不需要再次跳转源视频
+    for _, _, output_path, thumbnail_path in clips:
+        save_thumbnail(output_path, thumbnail_path, 0)
+
+    return [clip[2] for clip in clips]
@@ -0,0 +1,155 @@
+################################################################################
+# 多进程并行编码视频片段：每个进程独立读取源视频、独立调用 ffmpeg 编码
+################################################################################
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+from moviepy.editor import VideoFileClip
+from tqdm import tqdm
+
+from .video_encode_profile import (
+    clip_encode_profile,
+    get_encode_profile,
+    get_video_encode_profile,
+    moviepy_encode_kwargs
+)
+from .video_ladder import write_clip_ladder
+from .video_scratch import ScratchSpace
+from ..common.logger import log
+
+
+def write_clip(clip: VideoFileClip, output_path: str, thumbnail_path: Optional[str],
+               profile: Optional[dict] = None, ladder_heights: Optional[List[int]] = None):
+    """
+    保存视频片段（保留音频）和首帧缩略图，保存失败时删除不完整的输出文件
+
+    Args:
+        clip: 视频片段
+        output_path: 输出视频路径
+        thumbnail_path: 首帧缩略图路径，为 None 时不保存（由调用方批量提取）
+        profile: 编码参数 {'preset', 'crf', 'threads'}，默认使用当前主机该分辨率缓存的调优结果
+                 （没有调优出线程数时使用 DEFAULT_THREADS_PER_WORKER）
+        ladder_heights: 同时输出的低分辨率版本高度列表，例如 [720, 480]，保存为 clip_000_720p.mp4，
+                        片段只解码一次；profile 只用于原分辨率版本，低分辨率版本按自己的分辨率读取调优结果
+    """
+    if ladder_heights:
+        write_clip_ladder(clip, output_path, ladder_heights, profile)
+        if thumbnail_path:
+            clip.save_frame(thumbnail_path, t=0)
+        return
+
+    scratch = ScratchSpace(prefix="split_clip_")
+    try:
+        # 确保当前目录可写
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        # 先检查视频是否有音频
+        has_audio = clip.audio is not None
+
+        encode_kwargs = moviepy_encode_kwargs(profile or clip_encode_profile(get_encode_profile(clip.w, clip.h)))
+        # 设置 ffmpeg_params 来避免 stdout 错误
+        encode_kwargs['ffmpeg_params'] = ['-hide_banner', '-loglevel', 'error'] + encode_kwargs['ffmpeg_params']
+
+        clip.write_videofile(
+            output_path,
+            audio_codec='aac' if has_audio else None,
+            # 临时音频写入任务独立的临时目录，避免并发任务冲突，也不占用输出目录
+            temp_audiofile=scratch.path("audio.m4a") if has_audio else None,
+            remove_temp=True,
+            verbose=False,
+            logger=None,
+            **encode_kwargs
+        )
+
+    except Exception as e:
+        log.error(f"保存视频片段时出错: {str(e)}")
+        if os.path.exists(output_path):
+            try:
+                os.remove(output_path)
+            except:
+                pass
+        raise
+    finally:
+        scratch.cleanup()
+
+    # 保存首帧缩略图
+    if thumbnail_path:
+        clip.save_frame(thumbnail_path, t=0)
+
+
+def _encode_clip(video_path: str, index: int, start_time: float, end_time: float,
+                 output_path: str, thumbnail_path: Optional[str], profile: dict,
+                 ladder_heights: Optional[List[int]] = None) -> Tuple[int, Optional[str]]:
+    """
+    编码单个片段，在子进程中运行时每个片段打开自己的读取器
+
+    Returns:
+        (片段序号, 错误信息)，成功时错误信息为 None
+    """
+    video = None
+    try:
+        video = VideoFileClip(video_path)
+        # 子片段与原视频共用读取器，这里不能关闭子片段，只在最后关闭原视频
+        clip = video.subclip(start_time, end_time)
+        write_clip(clip, output_path, thumbnail_path, profile, ladder_heights)
+        return index, None
+    except Exception as e:
+        return index, str(e)
+    finally:
+        if video is not None:
+            video.close()
+
+
+def encode_clips(video_path: str, clips: List[tuple], workers: Optional[int] = None,
+                 threads_per_worker: Optional[int] = None,
+                 desc: str = "并行编码视频片段",
+                 ladder_heights: Optional[List[int]] = None) -> List[dict]:
+    """
+    并行编码多个视频片段，单个片段失败不影响其他片段
+
+    Args:
+        video_path: 源视频路径
+        clips: 片段列表，每个元素是一个元组 (start_time, end_time, output_path, thumbnail_path)，
+               thumbnail_path 为 None 时不保存缩略图
+        workers: 编码进程数，默认按 CPU 核数除以每个进程的线程数计算；为 1 时在当前进程中依次编码
+        threads_per_worker: 每个进程的 ffmpeg 编码线程数，默认使用编码参数调优结果中的线程数
+        desc: 进度条描述
+        ladder_heights: 每个片段同时输出的低分辨率版本高度列表
+
+    Returns:
+        与 clips 顺序一致的结果列表，每个元素为 {'output_path', 'error'}，成功时 error 为 None
+    """
+    # 编码参数在父进程中读取一次，所有片段使用相同的参数
+    profile = clip_encode_profile(get_video_encode_profile(video_path))
+    if threads_per_worker:
+        profile['threads'] = threads_per_worker
+    threads_per_worker = profile['threads']
+
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // max(1, threads_per_worker))
+    workers = max(1, min(workers, len(clips)))
+
+    errors = {}
+    if workers == 1:
+        for index, (start_time, end_time, output_path, thumbnail_path) in enumerate(tqdm(clips, desc=desc, position=0)):
+            _, errors[index] = _encode_clip(video_path, index, start_time, end_time,
+                                            output_path, thumbnail_path, profile, ladder_heights)
+    else:
+        log.info(f"并行编码视频片段，进程数: {workers}，每个进程线程数: {threads_per_worker}")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_encode_clip, video_path, index, start_time, end_time,
+                                       output_path, thumbnail_path, profile, ladder_heights)
+                       for index, (start_time, end_time, output_path, thumbnail_path) in enumerate(clips)]
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc, position=0):
+                index, error = future.result()
+                errors[index] = error
+
+    results = []
+    for index, (start_time, end_time, output_path, _) in enumerate(clips):
+        error = errors.get(index)
+        if error:
+            log.error(f"片段 {index} [{start_time:.2f}, {end_time:.2f}] 编码失败: {error}")
+        results.append({'output_path': output_path, 'error': error})
+    return results
@@ -0,0 +1,159 @@
+################################################################################
+# 重叠感知的切分计划：把所有时间区间拆成互不重叠的基本片段，每个基本片段只编码一次，
+# 再用流复制拼接出各个请求的片段
+################################################################################
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from .video_encode_profile import clip_encode_profile, ffmpeg_encode_args, get_video_encode_profile
+from .video_ffmpeg import run_ffmpeg
+from .video_scratch import ScratchSpace
+from .video_split_ffmpeg import plan_clips
+from .video_thumbnail import save_thumbnails
+from ..common.logger import log
+
+
+def _snap_points(points: List[float], snap_tolerance: float) -> dict:
+    """
+    将相距不超过 snap_tolerance 的时间点合并为同一个点（取每组中最早的点），避免产生极短的基本片段
+
+    Returns:
+        {原时间点: 合并后的时间点}
+    """
+    mapping = {}
+    anchor = None
+    for point in sorted(set(points)):
+        if anchor is None or point - anchor > snap_tolerance:
+            anchor = point
+        mapping[point] = anchor
+    return mapping
+
+
+def plan_spans(time_ranges: List[tuple], snap_tolerance: float = 0.1) -> dict:
+    """
+    计算切分计划（不编码），可用于预览能节省多少编码时长
+
+    Args:
+        time_ranges: 时间区间列表，每个元素是一个元组 (start_time, end_time)
+        snap_tolerance: 区间端点相距不超过该秒数时视为同一个点；短于该秒数的区间保留原始端点
+
+    Returns:
+        {
+            'spans': [(start_time, end_time)]，需要编码的基本片段，按时间排序,
+            'clips': [[基本片段序号]]，与 time_ranges 一一对应，区间无效时为空列表,
+            'requested_seconds': 逐个区间编码的总时长,
+            'encoded_seconds': 按计划编码的总时长,
+            'saved_seconds': 节省的编码时长,
+        }
+    """
+    points = [point for time_range in time_ranges for point in time_range]
+    mapping = _snap_points(points, snap_tolerance)
+    snapped_ranges = []
+    for start_time, end_time in time_ranges:
+        snapped_range = (mapping[start_time], mapping[end_time])
+        if start_time < end_time and snapped_range[0] >= snapped_range[1]:
+            # 区间短于 snap_tolerance，两个端点合并成同一个点，保留原始端点，不能因为合并而丢掉这个片段
+            log.warning(f"时间区间 [{start_time}, {end_time}] 短于合并容差 {snap_tolerance} 秒，保留原始端点")
+            snapped_range = (start_time, end_time)
+        snapped_ranges.append(snapped_range)
+
+    # 有效区间的端点把时间轴切成若干段，只保留被至少一个区间覆盖的段
+    boundaries = sorted({point for time_range in snapped_ranges if time_range[0] < time_range[1]
+                         for point in time_range})
+    spans = []
+    for start_time, end_time in zip(boundaries, boundaries[1:]):
+        if any(range_start <= start_time and end_time <= range_end for range_start, range_end in snapped_ranges):
+            spans.append((start_time, end_time))
+
+    clips = []
+    for range_start, range_end in snapped_ranges:
+        clips.append([i for i, (start_time, end_time) in enumerate(spans)
+                      if range_start <= start_time and end_time <= range_end])
+
+    requested_seconds = sum(max(0.0, end_time - start_time) for start_time, end_time in snapped_ranges)
+    encoded_seconds = sum(end_time - start_time for start_time, end_time in spans)
+    return {
+        'spans': spans,
+        'clips': clips,
+        'requested_seconds': requested_seconds,
+        'encoded_seconds': encoded_seconds,
+        'saved_seconds': requested_seconds - encoded_seconds,
+    }
+
+
+def split_video_planned(video_path: str, output_dir: str, time_ranges: List[tuple],
+                        snap_tolerance: float = 0.1, workers: Optional[int] = None) -> List[str]:
+    """
+    按切分计划切分视频：每个基本片段只编码一次（只编码视频），
+    每个请求的片段由基本片段流复制拼接而成，音频从原视频按片段区间重新编码，保证拼接处没有音频间隙
+
+    Args:
+        video_path: 源视频路径
+        output_dir: 输出目录
+        time_ranges: 时间区间列表，每个元素是一个元组 (start_time, end_time)
+        snap_tolerance: 区间端点相距不超过该秒数时视为同一个点，片段边界最多移动该秒数
+        workers: 同时运行的 ffmpeg 编码进程数，默认按 CPU 核数除以每个进程的线程数计算
+
+    Returns:
+        切分后的视频文件路径列表
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    clips = plan_clips(video_path, output_dir, time_ranges)
+    if not clips:
+        return []
+    plan = plan_spans([(start_time, end_time) for start_time, end_time, _, _ in clips], snap_tolerance)
+    log.info(f"切分计划: {len(clips)} 个片段，{len(plan['spans'])} 个基本片段，"
+             f"编码 {plan['encoded_seconds']:.1f} 秒（逐个编码需要 {plan['requested_seconds']:.1f} 秒，"
+             f"节省 {plan['saved_seconds']:.1f} 秒）")
+
+    profile = clip_encode_profile(get_video_encode_profile(video_path))
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // max(1, profile['threads']))
+
+    output_files = []
+    with ScratchSpace(prefix="split_plan_") as scratch:
+        span_paths = [scratch.path(f"span_{i:03d}.mp4") for i in range(len(plan['spans']))]
+
+        def encode_span(i: int):
+            start_time, end_time = plan['spans'][i]
+            run_ffmpeg(['-loglevel', 'error', '-ss', f"{start_time:.6f}", '-i', video_path,
+                        '-t', f"{end_time - start_time:.6f}", '-map', '0:v:0', '-an']
+                       + ffmpeg_encode_args(profile) + [span_paths[i]])
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(encode_span, range(len(span_paths))))
+
+        for (_, _, output_path, _), span_indexes in zip(clips, plan['clips']):
+            if not span_indexes:
+                continue
+            start_time = plan['spans'][span_indexes[0]][0]
+            end_time = plan['spans'][span_indexes[-1]][1]
+            list_path = scratch.path("concat.txt")
+            with open(list_path, 'w') as f:
+                f.writelines(f"file '{span_paths[i]}'\n" for i in span_indexes)
+            try:
+                run_ffmpeg([
+                    '-loglevel', 'error',
+                    '-f', 'concat', '-safe', '0', '-i', list_path,
+                    '-ss', f"{start_time:.6f}", '-t', f"{end_time - start_time:.6f}", '-i', video_path,
+                    '-map', '0:v:0', '-map', '1:a?',
+                    '-c:v', 'copy', '-c:a', 'aac',
+                    # 基本片段的时长按帧对齐，拼接后可能略长，按片段时长截断
+                    '-t', f"{end_time - start_time:.6f}",
+                    output_path
+                ])
+            except Exception as e:
+                log.error(f"保存视频片段时出错: {str(e)}")
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                raise
+            output_files.append(output_path)
+
+    # 所有片段的首帧缩略图一次按时间顺序读取
+    save_thumbnails(video_path, [(plan['spans'][span_indexes[0]][0], thumbnail_path)
+                                 for (_, _, _, thumbnail_path), span_indexes in zip(clips, plan['clips'])
+                                 if span_indexes])
+    return output_files
@@ -0,0 +1,246 @@
+################################################################################
+# ASS 字幕烧录：把 SRT 转换为带样式的 ASS 文件，由 ffmpeg 的 ass 滤镜（libass）在一次原生编码中渲染到画面上，
+# 不需要为每条字幕生成 TextClip 再在 Python 中逐帧合成
+################################################################################
+
+import functools
+import os
+import re
+import subprocess
+from typing import List, Optional
+
+import pysrt
+from PIL import ImageColor, ImageFont
+
+from .video_encode_profile import ffmpeg_encode_args, get_encode_profile
+from .video_ffmpeg import probe_media_info, run_ffmpeg
+from .video_ladder import build_ladder_args, plan_renditions
+from .video_scratch import ScratchSpace
+from ..common.logger import log
+
+# 字幕区域宽度占视频宽度的比例，与 TextClip 的 size=(video.w * 0.8, None) 一致
+TEXT_WIDTH_RATIO = 0.8
+
+# 字幕距离画面底部的距离（像素）
+MARGIN_BOTTOM = 10
+
+# 换行时的最小单位：中日韩文字逐字，其他文字按单词
+_CJK_CHARS = r'\u2e80-\u9fff\uac00-\ud7af\uff00-\uffef'
+_WRAP_TOKEN_PATTERN = re.compile(rf'[{_CJK_CHARS}]|[^\s{_CJK_CHARS}]+|\s+')
+
+
+@functools.lru_cache(maxsize=1)
+def has_libass() -> bool:
+    """
+    检查 ffmpeg 是否带有 libass（ass 滤镜）
+    """
+    try:
+        output = subprocess.run(['ffmpeg', '-hide_banner', '-filters'], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, universal_newlines=True).stdout
+    except OSError:
+        return False
+    return any(line.split()[1:2] == ['ass'] for line in output.splitlines() if line.strip())
+
+
+def color_to_ass(color: str) -> str:
+    """
+    颜色名称或 #RRGGBB 转换为 ASS 颜色格式 &HAABBGGRR
+    """
+    red, green, blue = ImageColor.getrgb(color)[:3]
+    return f"&H00{blue:02X}{green:02X}{red:02X}"
+
+
+def resolve_font(font: str) -> tuple:
+    """
+    将字体文件路径或字体名称转换为 (ASS 字体名称, 字体目录)，字体名称无法从文件读取时使用文件名
+    """
+    if not os.path.isfile(font):
+        return font, None
+    try:
+        family = ImageFont.truetype(font).getname()[0]
+    except OSError:
+        family = os.path.splitext(os.path.basename(font))[0]
+    return family, os.path.dirname(os.path.abspath(font))
+
+
+def _format_time(ordinal: int) -> str:
+    """
+    毫秒数转换为 ASS 时间格式 H:MM:SS.cc
+    """
+    centiseconds = max(0, ordinal) // 10
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    seconds, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{seconds:02d}.{centiseconds:02d}"
+
+
+def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: float) -> List[str]:
+    """
+    按实际字体宽度折行。libass 只在空格处自动换行，中文没有空格，需要预先折行
+    """
+    lines = []
+    for paragraph in text.strip().splitlines():
+        line = ''
+        for token in _WRAP_TOKEN_PATTERN.findall(paragraph.strip()):
+            if line and not token.isspace() and font.getlength(line + token) > max_width:
+                lines.append(line.rstrip())
+                line = token
+            else:
+                line += token
+        lines.append(line.rstrip())
+    return lines
+
+
+def _escape_text(lines: List[str]) -> str:
+    """
+    转义 ASS 特殊字符，各行用 ASS 强制换行连接
+    """
+    return '\\N'.join(line.replace('\\', '\\\\').replace('{', '\\{').replace('}', '\\}') for line in lines)
+
+
+def srt_to_ass(subs: pysrt.SubRipFile, ass_path: str, width: int, height: int,
+               font_name: str, fontsize: int = 24, color: str = 'white',
+               stroke_color: str = 'black', stroke_width: float = 1.0,
+               font_path: Optional[str] = None) -> str:
+    """
+    将 SRT 字幕转换为 ASS 文件，样式与 TextClip 方式一致：底部居中，宽度为视频宽度的 80%，自动换行
+
+    Args:
+        subs: pysrt 读取的字幕
+        ass_path: 输出的 ASS 文件路径
+        width: 视频宽度，作为 ASS 的 PlayResX，字号以像素为单位
+        height: 视频高度，作为 ASS 的 PlayResY
+        font_name: 字体名称
+        fontsize: 字体大小
+        color: 字体颜色
+        stroke_color: 描边颜色
+        stroke_width: 描边宽度
+        font_path: 字体文件路径，指定时按字体实际宽度预先折行，否则只由 libass 在空格处换行
+
+    Returns:
+        ASS 文件路径
+    """
+    margin = int(width * (1 - TEXT_WIDTH_RATIO) / 2)
+    measure_font = ImageFont.truetype(font_path, fontsize) if font_path else None
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{font_name},{fontsize},{color_to_ass(color)},{color_to_ass(color)},"
+        f"{color_to_ass(stroke_color)},&H00000000,0,0,0,0,100,100,0,0,1,{stroke_width:g},0,"
+        f"2,{margin},{margin},{MARGIN_BOTTOM},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for sub in subs:
+        if sub.end.ordinal <= sub.start.ordinal or not sub.text.strip():
+            continue
+        if measure_font is not None:
+            text_lines = wrap_text(sub.text, measure_font, width - 2 * margin)
+        else:
+            text_lines = [line.strip() for line in sub.text.strip().splitlines()]
+        lines.append(f"Dialogue: 0,{_format_time(sub.start.ordinal)},{_format_time(sub.end.ordinal)},"
+                     f"Default,,0,0,0,,{_escape_text(text_lines)}")
+
+    with open(ass_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return ass_path
+
+
+def _escape_filter_path(path: str) -> str:
+    """
+    转义滤镜参数中的路径，路径要经过两层解析：
+    1. 滤镜选项值：用单引号包裹，冒号、逗号等不再作为分隔符，路径中的单引号写成 '\\''
+    2. 滤镜图：对上一步结果中的 \\ ' [ ] , ; 再加一层反斜杠转义
+    Windows 路径的反斜杠先换成正斜杠（libass 同样支持），例如 C:\\subs\\a.ass -> \\'C:/subs/a.ass\\'
+    """
+    quoted = "'" + path.replace('\\', '/').replace("'", "'\\''") + "'"
+    return re.sub(r"([\\'\[\],;])", r"\\\1", quoted)
+
+
+def build_ass_filter(srt_path: str, ass_path: str, width: int, height: int, font: str,
+                     fontsize: int = 24, color: str = 'white', stroke_color: str = 'black',
+                     stroke_width: float = 1.0) -> str:
+    """
+    将 SRT 转换为 ASS 文件，返回渲染该文件的 ass 滤镜
+
+    Args:
+        srt_path: SRT字幕文件路径
+        ass_path: 输出的 ASS 文件路径
+        width: 视频宽度
+        height: 视频高度
+        font: 字体文件路径或字体名称
+        其余参数同 srt_to_ass
+
+    Returns:
+        ass 滤镜字符串，例如 ass=/tmp/subtitle.ass:fontsdir=/usr/share/fonts
+    """
+    font_name, fonts_dir = resolve_font(font)
+    srt_to_ass(pysrt.open(srt_path), ass_path, width, height, font_name, fontsize, color, stroke_color,
+               stroke_width, font if fonts_dir else None)
+    video_filter = f"ass={_escape_filter_path(ass_path)}"
+    if fonts_dir:
+        video_filter += f":fontsdir={_escape_filter_path(fonts_dir)}"
+    log.info(f"使用 libass 烧录字幕，字体: {font_name}")
+    return video_filter
+
+
+def burn_subtitles_ass(video_path: str, srt_path: str, output_path: str, font: str,
+                       fontsize: int = 24, color: str = 'white', stroke_color: str = 'black',
+                       stroke_width: float = 1.0, ladder_heights: Optional[List[int]] = None) -> str:
+    """
+    用 ffmpeg 的 ass 滤镜烧录字幕，视频一次解码一次编码，音频流复制
+
+    Args:
+        video_path: 视频文件路径
+        srt_path: SRT字幕文件路径
+        output_path: 输出文件路径
+        font: 字体文件路径或字体名称
+        fontsize: 字体大小
+        color: 字体颜色
+        stroke_color: 描边颜色
+        stroke_width: 描边宽度
+        ladder_heights: 同时输出的低分辨率版本高度列表，字幕渲染后在同一个滤镜图中缩放
+
+    Returns:
+        str: 添加字幕后的视频文件路径
+    """
+    info = probe_media_info(video_path)
+
+    with ScratchSpace(prefix="add_subtitle_ass_") as scratch:
+        video_filter = build_ass_filter(srt_path, scratch.path("subtitle.ass"), info['width'], info['height'],
+                                        font, fontsize, color, stroke_color, stroke_width)
+
+        audio_input = '0:a' if info['has_audio'] else None
+        output_paths = [output_path]
+        if ladder_heights:
+            renditions = plan_renditions(output_path, info['width'], info['height'], ladder_heights)
+            output_paths = [rendition['output_path'] for rendition in renditions]
+            args = build_ladder_args(renditions, audio_input, (info['width'], info['height']),
+                                     video_filter=video_filter)
+        else:
+            args = (['-vf', video_filter, '-map', '0:v:0']
+                    + ffmpeg_encode_args(get_encode_profile(info['width'], info['height']))
+                    + ['-pix_fmt', 'yuv420p'])
+            if audio_input is not None:
+                args += ['-map', audio_input, '-c:a', 'copy']
+            args += [output_path]
+
+        try:
+            run_ffmpeg(['-loglevel', 'error', '-i', video_path] + args)
+        except Exception:
+            # 删除所有不完整的输出，包括各低分辨率版本
+            for path in output_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+    return output_path
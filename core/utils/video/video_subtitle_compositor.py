@@ -0,0 +1,114 @@
+################################################################################
+# 按时间区间索引的字幕合成：预先把所有字幕的起止时间切成互不重叠的基本区间并记录每个区间内显示的字幕，
+# 每帧用 bisect 找到当前区间，只在字幕位图的不透明区域内做 alpha 混合，单帧开销与字幕总数无关；
+# 解码得到的画面是只读的，有字幕的帧先复制到预先分配、逐帧复用的输出缓冲区再混合
+################################################################################
+
+import bisect
+from typing import List, Tuple
+
+import numpy as np
+from moviepy.editor import VideoClip
+
+
+class _Cue:
+    """
+    单条字幕：位图裁剪到不透明区域，预先计算好混合所需的数组
+    """
+
+    def __init__(self, rgba: np.ndarray, frame_size: Tuple[int, int]):
+        frame_width, frame_height = frame_size
+        bitmap_height, bitmap_width = rgba.shape[:2]
+        # 位图在画面中底部居中，超出画面的部分裁掉
+        left = (frame_width - bitmap_width) // 2
+        top = frame_height - bitmap_height
+
+        rows = np.flatnonzero(rgba[..., 3].any(axis=1))
+        cols = np.flatnonzero(rgba[..., 3].any(axis=0))
+        if len(rows) == 0:
+            self.box = None
+            return
+        y0, y1 = max(rows[0], -top), min(rows[-1] + 1, frame_height - top)
+        x0, x1 = max(cols[0], -left), min(cols[-1] + 1, frame_width - left)
+        if y0 >= y1 or x0 >= x1:
+            self.box = None
+            return
+
+        self.box = (top + y0, top + y1, left + x0, left + x1)
+        alpha = rgba[y0:y1, x0:x1, 3:4].astype(np.float32) / 255
+        # 加 0.5 使写回 uint8 时四舍五入
+        self.color = rgba[y0:y1, x0:x1, :3].astype(np.float32) * alpha + 0.5
+        self.inverse_alpha = 1 - alpha
+
+    def blend(self, frame: np.ndarray):
+        """
+        在 frame 上原地混合，frame 为 SubtitleCompositor 的输出缓冲区
+        """
+        y0, y1, x0, x1 = self.box
+        region = frame[y0:y1, x0:x1]
+        region[...] = region * self.inverse_alpha + self.color
+
+
+class SubtitleCompositor:
+    """
+    字幕合成器：
+
+        compositor = SubtitleCompositor([(start, end, rgba), ...], video.size)
+        final_video = compositor.apply(video)
+
+    字幕位图底部居中显示在画面中。有字幕的帧返回内部复用的缓冲区，内容在下一次 composite 时被覆盖，
+    调用方需要在取下一帧之前用完（moviepy 写文件时每帧写入 ffmpeg 后才取下一帧）
+    """
+
+    def __init__(self, cues: List[tuple], frame_size: Tuple[int, int]):
+        """
+        Args:
+            cues: 字幕列表，每个元素为 (start_time, end_time, rgba)，rgba 为 (高, 宽, 4) 的 uint8 数组
+            frame_size: 画面尺寸 (width, height)
+        """
+        prepared = []
+        for start_time, end_time, rgba in cues:
+            if end_time <= start_time:
+                continue
+            cue = _Cue(rgba, frame_size)
+            if cue.box is not None:
+                prepared.append((start_time, end_time, cue))
+
+        # 所有起止时间把时间轴切成基本区间，self.active[i] 是 [boundaries[i], boundaries[i + 1]) 内显示的字幕
+        self.boundaries = sorted({time_point for start_time, end_time, _ in prepared
+                                  for time_point in (start_time, end_time)})
+        self.active = [[] for _ in self.boundaries]
+        for start_time, end_time, cue in prepared:
+            for i in range(bisect.bisect_left(self.boundaries, start_time),
+                           bisect.bisect_left(self.boundaries, end_time)):
+                self.active[i].append(cue)
+        self._buffer = None
+
+    def active_cues(self, t: float) -> list:
+        """
+        t 时刻显示的字幕
+        """
+        i = bisect.bisect_right(self.boundaries, t) - 1
+        return self.active[i] if i >= 0 else []
+
+    def composite(self, frame: np.ndarray, t: float) -> np.ndarray:
+        """
+        将 t 时刻的字幕混合到画面上。没有字幕时直接返回原画面；
+        有字幕时把画面复制到复用的输出缓冲区后在缓冲区上混合，不修改原画面（解码的帧是只读的，
+        ImageClip 等每帧返回同一个数组），只有画面尺寸变化时才重新分配缓冲区
+        """
+        cues = self.active_cues(t)
+        if not cues:
+            return frame
+        if self._buffer is None or self._buffer.shape != frame.shape or self._buffer.dtype != frame.dtype:
+            self._buffer = np.empty_like(frame)
+        np.copyto(self._buffer, frame)
+        for cue in cues:
+            cue.blend(self._buffer)
+        return self._buffer
+
+    def apply(self, clip: VideoClip) -> VideoClip:
+        """
+        返回叠加了字幕的新片段，音频保持不变
+        """
+        return clip.fl(lambda get_frame, t: self.composite(get_frame(t), t))
@@ -0,0 +1,231 @@
+################################################################################
+# 字幕位图渲染缓存：在进程内用 PIL 渲染字幕文字（不再为每条字幕启动 ImageMagick），
+# 渲染结果按 (文字, 字体, 字号, 颜色, 描边, 宽度) 缓存：内存中按字节上限做 LRU 淘汰，磁盘上保存 PNG 供下次运行复用，
+# 磁盘缓存超过字节上限时按最后使用时间（文件修改时间）删除最旧的 PNG
+################################################################################
+
+import functools
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from .video_subtitle_ass import wrap_text
+from ..common.logger import log
+
+# 默认磁盘缓存目录
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'video_transport', 'subtitle_bitmaps')
+
+# 默认内存缓存上限（字节）
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 默认磁盘缓存上限（字节）
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+# 行间距占字号的比例
+LINE_SPACING_RATIO = 0.2
+
+
+@functools.lru_cache(maxsize=32)
+def load_font(font: str, fontsize: int) -> ImageFont.FreeTypeFont:
+    """
+    加载字体，font 可以是字体文件路径或字体名称，找不到时使用 PIL 自带字体
+    """
+    try:
+        return ImageFont.truetype(font, fontsize)
+    except OSError:
+        log.warning(f"无法加载字体 {font}，使用默认字体")
+        return ImageFont.load_default(size=fontsize)
+
+
+def render_text_rgba(text: str, font: str, fontsize: int, color: str = 'white',
+                     stroke_color: str = 'black', stroke_width: float = 1.0,
+                     max_width: Optional[int] = None) -> np.ndarray:
+    """
+    将字幕文字渲染为带透明通道的位图，多行居中，超过 max_width 时自动折行
+
+    Returns:
+        形状为 (高, 宽, 4) 的 uint8 RGBA 数组
+    """
+    image_font = load_font(font, fontsize)
+    stroke = int(round(stroke_width))
+    lines = wrap_text(text, image_font, max_width - 2 * stroke) if max_width else text.strip().splitlines()
+    content = '\n'.join(lines) or ' '
+    spacing = int(fontsize * LINE_SPACING_RATIO)
+
+    measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+    left, top, right, bottom = measure.multiline_textbbox((0, 0), content, font=image_font, spacing=spacing,
+                                                          align='center', stroke_width=stroke)
+    width = max_width or (right - left)
+    image = Image.new('RGBA', (max(1, width), max(1, bottom - top)), (0, 0, 0, 0))
+    ImageDraw.Draw(image).multiline_text(((width - (right - left)) / 2 - left, -top), content, font=image_font,
+                                         fill=color, spacing=spacing, align='center',
+                                         stroke_width=stroke, stroke_fill=stroke_color)
+    return np.asarray(image)
+
+
+class SubtitleRenderCache:
+    """
+    字幕位图缓存：
+
+        cache = SubtitleRenderCache()
+        rgba = cache.get(text, font, fontsize, color, stroke_color, stroke_width, width)
+
+    内存中的位图总字节数超过 max_bytes 时淘汰最久未使用的位图；cache_dir 不为 None 时渲染结果同时保存为 PNG，
+    每个缓存对象第一次写入磁盘前检查一次磁盘缓存大小，超过 max_disk_bytes 时删除最久未使用的 PNG
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        """
+        Args:
+            max_bytes: 内存缓存上限（字节）
+            cache_dir: 磁盘缓存目录，为 None 时不使用磁盘缓存
+            max_disk_bytes: 磁盘缓存上限（字节）
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._disk_pruned = False
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def make_key(text: str, font: str, fontsize: int, color: str, stroke_color: str,
+                 stroke_width: float, width: Optional[int]) -> str:
+        """
+        缓存键：渲染参数的哈希值，也用作 PNG 文件名
+        """
+        params = json.dumps([text, font, fontsize, color, stroke_color, stroke_width, width], ensure_ascii=False)
+        return hashlib.sha1(params.encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def _load_png(self, key: str) -> Optional[np.ndarray]:
+        if self.cache_dir is None:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with Image.open(path) as image:
+                rgba = np.asarray(image.convert('RGBA'))
+            # 更新修改时间，清理磁盘缓存时按修改时间判断最近是否使用
+            os.utime(path)
+            return rgba
+        except OSError as e:
+            log.warning(f"读取字幕位图缓存失败: {str(e)}")
+            return None
+
+    def prune_disk_cache(self) -> int:
+        """
+        磁盘缓存超过 max_disk_bytes 时按修改时间从旧到新删除 PNG，直到不超过上限
+
+        Returns:
+            删除的文件数
+        """
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return 0
+        files = []
+        total_bytes = 0
+        for directory, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if not filename.endswith('.png'):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total_bytes += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(files):
+            if total_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
+            removed += 1
+        if removed:
+            log.info(f"清理字幕位图磁盘缓存: 删除 {removed} 个文件")
+        return removed
+
+    def _save_png(self, key: str, rgba: np.ndarray):
+        if self.cache_dir is None:
+            return
+        if not self._disk_pruned:
+            self._disk_pruned = True
+            self.prune_disk_cache()
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再重命名，避免并发读取到写了一半的文件
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            Image.fromarray(rgba, 'RGBA').save(temp_path, format='PNG')
+            os.replace(temp_path, path)
+        except OSError as e:
+            log.warning(f"写入字幕位图缓存失败: {str(e)}")
+
+    def _put(self, key: str, rgba: np.ndarray):
+        self._entries[key] = rgba
+        self.current_bytes += rgba.nbytes
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+
+    def get(self, text: str, font: str, fontsize: int, color: str = 'white', stroke_color: str = 'black',
+            stroke_width: float = 1.0, width: Optional[int] = None) -> np.ndarray:
+        """
+        获取字幕位图，依次查找内存缓存、磁盘缓存，都没有时渲染
+
+        Returns:
+            形状为 (高, 宽, 4) 的 uint8 RGBA 数组，调用方不能修改
+        """
+        key = self.make_key(text, font, fontsize, color, stroke_color, stroke_width, width)
+        rgba = self._entries.get(key)
+        if rgba is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rgba
+
+        rgba = self._load_png(key)
+        if rgba is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            rgba = render_text_rgba(text, font, fontsize, color, stroke_color, stroke_width, width)
+            self._save_png(key, rgba)
+        self._put(key, rgba)
+        return rgba
+
+    def stats(self) -> dict:
+        """
+        缓存统计 {'hits', 'disk_hits', 'misses', 'entries', 'bytes'}
+        """
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'entries': len(self._entries), 'bytes': self.current_bytes}
+
+
+_default_cache = None
+
+
+def get_default_cache() -> SubtitleRenderCache:
+    """
+    进程内共享的默认缓存，同一进程内多次添加字幕时复用内存中的位图
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SubtitleRenderCache()
+    return _default_cache
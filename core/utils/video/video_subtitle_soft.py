@@ -0,0 +1,109 @@
+################################################################################
+# 软字幕：视频和音频流复制，SRT 作为文本字幕轨封装进容器（mp4 为 mov_text，webm 为 WebVTT，mkv 为 SRT），
+# 可同时封装原文和译文多条字幕轨，由播放器渲染，不需要重新编码视频
+################################################################################
+
+import os
+import shutil
+from typing import List, Tuple
+
+import pysrt
+
+from .video_ffmpeg import run_ffmpeg
+from .video_scratch import ScratchSpace
+from ..common.logger import log
+
+# 各容器使用的文本字幕编码
+SUBTITLE_CODECS = {
+    '.mp4': 'mov_text',
+    '.m4v': 'mov_text',
+    '.mov': 'mov_text',
+    '.webm': 'webvtt',
+    '.mkv': 'srt',
+}
+
+
+def subtitle_codec_for(output_path: str) -> str:
+    """
+    按输出文件扩展名选择文本字幕编码
+    """
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext not in SUBTITLE_CODECS:
+        raise ValueError(f"不支持封装软字幕的容器格式: {ext}")
+    return SUBTITLE_CODECS[ext]
+
+
+def slice_srt(srt_path: str, output_path: str, start_time: float, end_time: float) -> str:
+    """
+    截取 [start_time, end_time) 内显示的字幕，时间轴平移到从 0 开始，跨越边界的字幕截断到边界
+
+    Returns:
+        输出的 SRT 文件路径
+    """
+    start_ms = int(round(start_time * 1000))
+    end_ms = int(round(end_time * 1000))
+    subs = pysrt.open(srt_path).slice(starts_before=end_ms, ends_after=start_ms)
+    for sub in subs:
+        sub.start.ordinal = max(sub.start.ordinal, start_ms) - start_ms
+        sub.end.ordinal = min(sub.end.ordinal, end_ms) - start_ms
+    subs.clean_indexes()
+    subs.save(output_path, encoding='utf-8')
+    return output_path
+
+
+def mux_soft_subtitles(video_path: str, output_path: str, subtitle_tracks: List[Tuple[str, str]]) -> str:
+    """
+    将 SRT 字幕作为文本字幕轨封装到视频中，视频和音频流复制，第一条字幕轨设为默认
+
+    Args:
+        video_path: 视频文件路径
+        output_path: 输出文件路径，不能与 video_path 相同
+        subtitle_tracks: 字幕轨列表，每个元素为 (SRT 文件路径, ISO 639-2 语言代码)，例如 [('v1_zh-cn.srt', 'zho')]
+
+    Returns:
+        str: 封装后的视频文件路径
+    """
+    codec = subtitle_codec_for(output_path)
+    args = ['-loglevel', 'error', '-i', video_path]
+    for srt_path, _ in subtitle_tracks:
+        args += ['-f', 'srt', '-i', srt_path]
+    args += ['-map', '0:v', '-map', '0:a?']
+    for i in range(len(subtitle_tracks)):
+        args += ['-map', f"{i + 1}:0"]
+    args += ['-c:v', 'copy', '-c:a', 'copy', '-c:s', codec]
+    for i, (_, language) in enumerate(subtitle_tracks):
+        args += [f"-metadata:s:s:{i}", f"language={language}",
+                 f"-disposition:s:{i}", 'default' if i == 0 else '0']
+    args += [output_path]
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    try:
+        run_ffmpeg(args)
+    except Exception:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    return output_path
+
+
+def attach_clip_subtitles(clips: List[Tuple[str, float, float]], subtitle_tracks: List[Tuple[str, str]]) -> List[str]:
+    """
+    为切分后的片段封装对应时间段的软字幕，片段文件原地替换
+
+    Args:
+        clips: 片段列表，每个元素为 (片段路径, 在原视频中的开始时间, 结束时间)
+        subtitle_tracks: 原视频的字幕轨列表，每个元素为 (SRT 文件路径, ISO 639-2 语言代码)
+
+    Returns:
+        片段路径列表
+    """
+    with ScratchSpace(prefix="soft_subtitle_") as scratch:
+        for clip_path, start_time, end_time in clips:
+            clip_tracks = [(slice_srt(srt_path, scratch.path("clip.srt"), start_time, end_time), language)
+                           for srt_path, language in subtitle_tracks]
+            temp_path = scratch.path(os.path.basename(clip_path))
+            mux_soft_subtitles(clip_path, temp_path, clip_tracks)
+            # 临时目录可能在内存文件系统中，不能直接重命名
+            shutil.move(temp_path, clip_path)
+    log.info(f"完成 {len(clips)} 个片段的软字幕封装")
+    return [clip_path for clip_path, _, _ in clips]
@@ -0,0 +1,181 @@
+################################################################################
+# 批量提取缩略图：一次按时间顺序跳转读取所有时间点，线程池并行写图片；生成预览雪碧图和 WebVTT 索引
+################################################################################
+
+import bisect
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Tuple
+
+import cv2
+import numpy as np
+
+from .video_index import keyframe_frames, load_video_index, read_cached_index
+from ..common.logger import log
+
+# 没有关键帧索引时，目标帧在当前位置之后不超过该秒数时顺序读取，超过时才跳转（跳转需要从前一个关键帧重新解码）
+SEEK_THRESHOLD_SECONDS = 2.0
+
+
+def iter_frames_at(video_path: str, timestamps: List[float],
+                   use_index: bool = False) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    按时间顺序一次读取多个时间点的帧，相近的时间点顺序读取，相距较远时才跳转
+
+    Args:
+        video_path: 视频文件路径
+        timestamps: 时间点列表（秒），不要求有序
+        use_index: 没有关键帧索引缓存时是否生成（扫描所有数据包，并在视频同目录写入 .index.json）。
+                   有索引时按索引判断跳转：目标帧所在 GOP 的关键帧在当前位置之后时才跳转，否则顺序读取；
+                   已有的索引缓存总是使用，没有索引时按 SEEK_THRESHOLD_SECONDS 判断
+
+    Returns:
+        生成 (时间点在 timestamps 中的序号, BGR 帧)，按时间顺序生成，读取失败的时间点会被跳过
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    seek_threshold = int(SEEK_THRESHOLD_SECONDS * fps)
+    index = load_video_index(video_path) if use_index else read_cached_index(video_path)
+    keyframes = keyframe_frames(index) if index is not None else None
+
+    def should_seek(position: int, frame_index: int) -> bool:
+        if frame_index < position:
+            return True
+        if keyframes:
+            # 当前位置和目标帧之间有关键帧时，跳转到该关键帧比顺序解码更快
+            gop = bisect.bisect_right(keyframes, frame_index) - 1
+            return gop >= 0 and keyframes[gop] > position
+        return frame_index - position > seek_threshold
+
+    # 与 moviepy 的 get_frame(t) 一致，取 t 所在的帧
+    targets = sorted((min(max(int(t * fps + 1e-6), 0), max(total_frames - 1, 0)), i) for i, t in enumerate(timestamps))
+    position = 0
+    frame = None
+    try:
+        for frame_index, request_index in targets:
+            if frame is None or frame_index != position - 1:
+                if should_seek(position, frame_index):
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+                    position = frame_index
+                # 顺序跳过中间的帧，只解码不转换颜色
+                while position < frame_index:
+                    if not cap.grab():
+                        break
+                    position += 1
+                ret, frame = cap.read()
+                if not ret:
+                    frame = None
+                    log.warning(f"读取第 {frame_index} 帧失败")
+                    continue
+                position += 1
+            yield request_index, frame
+    finally:
+        cap.release()
+
+
+def save_thumbnails(video_path: str, thumbnails: List[Tuple[float, str]], write_threads: int = 4) -> List[str]:
+    """
+    批量保存缩略图，解码在当前线程一次完成，图片编码和写文件交给线程池
+
+    Args:
+        video_path: 视频文件路径
+        thumbnails: 缩略图列表，每个元素是一个元组 (时间点, 图片保存路径)
+        write_threads: 写图片的线程数
+
+    Returns:
+        成功保存的图片路径列表，与 thumbnails 顺序一致
+    """
+    if not thumbnails:
+        return []
+
+    saved = [False] * len(thumbnails)
+    with ThreadPoolExecutor(max_workers=write_threads) as executor:
+        futures = {}
+        for request_index, frame in iter_frames_at(video_path, [t for t, _ in thumbnails]):
+            thumbnail_path = thumbnails[request_index][1]
+            os.makedirs(os.path.dirname(thumbnail_path) or '.', exist_ok=True)
+            futures[request_index] = executor.submit(cv2.imwrite, thumbnail_path, frame)
+        for request_index, future in futures.items():
+            saved[request_index] = bool(future.result())
+
+    return [path for (_, path), ok in zip(thumbnails, saved) if ok]
+
+
+def _format_vtt_time(seconds: float) -> str:
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+
+def make_sprite_sheet(video_path: str, output_dir: str, interval: float = 10.0, tile_width: int = 160,
+                      columns: int = 10, rows: int = 10, name: str = "sprite") -> Tuple[List[str], str]:
+    """
+    每隔 interval 秒取一帧缩小后拼成雪碧图，并生成 WebVTT 索引，用于进度条拖动预览
+    （WebVTT 每一条对应雪碧图中的一个区域，格式为 sprite_000.jpg#xywh=x,y,w,h）
+
+    Args:
+        video_path: 视频文件路径
+        output_dir: 输出目录
+        interval: 取帧间隔（秒）
+        tile_width: 每个小图的宽度，高度按视频宽高比计算
+        columns: 每张雪碧图的列数
+        rows: 每张雪碧图的最大行数，超过 columns * rows 个小图时生成多张雪碧图
+        name: 输出文件名前缀
+
+    Returns:
+        (雪碧图路径列表, WebVTT 文件路径)
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+
+    duration = frame_count / fps if fps > 0 else 0.0
+    tile_height = max(1, int(round(tile_width * height / width))) if width > 0 else tile_width
+    timestamps = [i * interval for i in range(max(1, math.ceil(duration / interval)))]
+    tiles_per_sheet = columns * rows
+    sheet_count = math.ceil(len(timestamps) / tiles_per_sheet)
+
+    os.makedirs(output_dir, exist_ok=True)
+    sheets = []
+    for sheet_index in range(sheet_count):
+        tiles = min(tiles_per_sheet, len(timestamps) - sheet_index * tiles_per_sheet)
+        sheet_rows = math.ceil(tiles / columns)
+        sheets.append(np.zeros((sheet_rows * tile_height, min(tiles, columns) * tile_width, 3), np.uint8))
+
+    # 小图直接缩放写入雪碧图对应位置
+    for tile_index, frame in iter_frames_at(video_path, timestamps):
+        sheet = sheets[tile_index // tiles_per_sheet]
+        row, column = divmod(tile_index % tiles_per_sheet, columns)
+        y, x = row * tile_height, column * tile_width
+        sheet[y:y + tile_height, x:x + tile_width] = cv2.resize(frame, (tile_width, tile_height),
+                                                                interpolation=cv2.INTER_AREA)
+
+    sprite_paths = []
+    for sheet_index, sheet in enumerate(sheets):
+        sprite_path = os.path.join(output_dir, f"{name}_{sheet_index:03d}.jpg")
+        cv2.imwrite(sprite_path, sheet)
+        sprite_paths.append(sprite_path)
+
+    vtt_path = os.path.join(output_dir, f"{name}.vtt")
+    with open(vtt_path, 'w', encoding='utf-8') as f:
+        f.write("WEBVTT\n\n")
+        for tile_index, start_time in enumerate(timestamps):
+            end_time = min(start_time + interval, duration)
+            row, column = divmod(tile_index % tiles_per_sheet, columns)
+            sprite_name = os.path.basename(sprite_paths[tile_index // tiles_per_sheet])
+            f.write(f"{_format_vtt_time(start_time)} --> {_format_vtt_time(end_time)}\n")
+            f.write(f"{sprite_name}#xywh={column * tile_width},{row * tile_height},{tile_width},{tile_height}\n\n")
+
+    log.info(f"生成预览雪碧图 {len(sprite_paths)} 张，共 {len(timestamps)} 个小图: {vtt_path}")
+    return sprite_paths, vtt_path
+
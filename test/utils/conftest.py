@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试目录没有 __init__.py，把它加入 sys.path，各测试模块才能导入 video_test_helper（与 pytest 的导入模式无关）
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,46 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from core.utils.video import scene_detection_benchmark
+
+
+class SceneDetectionBenchmarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_make_synthetic_video(self):
+        video_path = os.path.join(self.temp_dir, "synthetic.mp4")
+        ground_truth = scene_detection_benchmark.make_synthetic_video(video_path, 320, 180, fps=25, duration=10,
+                                                                      scene_duration=3.0, fade_duration=1.0)
+        self.assertEqual(ground_truth, {'cuts': [3.0, 9.0], 'fades': [(6.0, 7.0)]})
+        frames, _ = scene_detection_benchmark.measure_decode(video_path)
+        self.assertEqual(frames, 250)
+
+    def test_score_detections(self):
+        ground_truth = {'cuts': [3.0, 9.0], 'fades': [(6.0, 7.0)]}
+        scores = scene_detection_benchmark.score_detections([3.1, 3.2, 6.5, 12.0], ground_truth, tolerance=0.5)
+        self.assertEqual(scores['true_positives'], 2)
+        self.assertAlmostEqual(scores['precision'], 0.5)
+        self.assertAlmostEqual(scores['recall'], 2 / 3)
+
+    def test_peak_rss_without_resource(self):
+        self.assertGreater(scene_detection_benchmark._peak_rss_mb(), 0)
+        # Windows 上没有 resource 模块，也没有安装 psutil 时不报告峰值内存
+        with mock.patch.dict(sys.modules, {'resource': None, 'psutil': None}):
+            self.assertIsNone(scene_detection_benchmark._peak_rss_mb())
+
+    def test_run_benchmark(self):
+        report = scene_detection_benchmark.run_benchmark([(160, 90)], [4], detectors=['frame_diff'])
+        self.assertEqual(len(report['results']), 1)
+        record = report['results'][0]
+        self.assertEqual(record['detector'], 'frame_diff')
+        self.assertEqual(record['recall'], 1.0)
+        self.assertGreater(record['decode_fps'], 0)
@@ -0,0 +1,30 @@
+import os
+
+from core.utils.video import scene_detection_cache, scene_detection_methods
+from video_test_helper import VideoTestCase, make_test_video
+
+
+class SceneDetectionCacheTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "cuts.mp4")
+        make_test_video(cls.video_path, [1.0, 3.0])
+
+    def test_detect_with_cache(self):
+        cache_dir = os.path.join(self.temp_dir, "cache")
+        thresholds = {'frame_diff': 30.0, 'histogram': 0.5}
+        results = scene_detection_cache.detect_with_cache(self.video_path, thresholds, cache_dir=cache_dir)
+        self.assertEqual(results, scene_detection_methods.detect_by_metrics(self.video_path, thresholds))
+        self.assertEqual(len([f for f in os.listdir(cache_dir) if f.endswith('.npy')]), 2)
+
+        # 第二次调用直接读取缓存，换阈值后结果与重新解码一致
+        results = scene_detection_cache.detect_with_cache(self.video_path, {'frame_diff': 5.0}, cache_dir=cache_dir)
+        self.assertEqual(results['frame_diff'], scene_detection_methods.detect_by_frame_diff(self.video_path, 5.0))
+
+    def test_min_interval(self):
+        cache_dir = os.path.join(self.temp_dir, "cache_min_interval")
+        results = scene_detection_cache.detect_with_cache(self.video_path, {'frame_diff': 30.0},
+                                                          min_interval=2.5, cache_dir=cache_dir)
+        self.assertEqual(results['frame_diff'], [1.0])
@@ -0,0 +1,27 @@
+import os
+
+from core.utils.video import scene_detection_ffmpeg
+from video_test_helper import VideoTestCase, make_test_video
+
+
+class SceneDetectionFFmpegTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "cuts.mp4")
+        cls.cut_times = [2.0, 4.0]
+        make_test_video(cls.video_path, cls.cut_times)
+
+    def test_detect_by_ffmpeg(self):
+        self.assertEqual(scene_detection_ffmpeg.detect_by_ffmpeg(self.video_path, threshold=10), self.cut_times)
+
+    def test_detect_by_ffmpeg_scdet(self):
+        scene_changes = scene_detection_ffmpeg.detect_by_ffmpeg(self.video_path, threshold=5, filter_name='scdet')
+        self.assertEqual(scene_changes, self.cut_times)
+
+    def test_parse_scene_times(self):
+        output = ("[Parsed_showinfo_2 @ 0x1] n:   0 pts:  25600 pts_time:2       duration:    512\n"
+                  "[scdet @ 0x2] lavfi.scd.score: 33.493, lavfi.scd.time: 4.5\n")
+        self.assertEqual(scene_detection_ffmpeg.parse_scene_times(output, 'select'), [2.0])
+        self.assertEqual(scene_detection_ffmpeg.parse_scene_times(output, 'scdet'), [4.5])
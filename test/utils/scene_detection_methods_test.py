@@ -0,0 +1,53 @@
+import os
+
+import cv2
+import numpy as np
+
+from core.utils.video import scene_detection_methods
+from video_test_helper import VideoTestCase, make_test_video
+
+
+class SceneDetectionMethodsTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "cuts.mp4")
+        cls.cut_times = [2.0, 4.0]
+        make_test_video(cls.video_path, cls.cut_times)
+
+    def test_detect_by_metrics_single_pass(self):
+        results = scene_detection_methods.detect_by_metrics(self.video_path, {'frame_diff': 30.0, 'histogram': 0.5})
+        self.assertEqual(results['frame_diff'], scene_detection_methods.detect_by_frame_diff(self.video_path, 30.0))
+        self.assertEqual(results['histogram'], scene_detection_methods.detect_by_histogram(self.video_path, 0.5))
+
+    def test_detect_combined(self):
+        scene_changes = scene_detection_methods.detect_combined(self.video_path)
+        self.assertEqual(scene_changes, self.cut_times)
+
+    def test_merge_scene_changes(self):
+        merged = scene_detection_methods.merge_scene_changes([3.0, 1.0, 1.5, 3.0])
+        self.assertEqual(merged, [1.25, 3.0])
+
+    def test_detect_by_sampling(self):
+        thresholds = {'frame_diff': 30.0, 'histogram': 0.5}
+        sampled = scene_detection_methods.detect_by_sampling(self.video_path, thresholds, stride=5, resize_width=160)
+        self.assertEqual(sampled, scene_detection_methods.detect_by_metrics(self.video_path, thresholds))
+
+    def test_frame_hash(self):
+        rng = np.random.default_rng(1)
+        frames = [cv2.resize(rng.integers(0, 255, (6, 8, 3), dtype=np.uint8), (320, 240),
+                             interpolation=cv2.INTER_NEAREST) for _ in range(2)]
+        for hash_type in ('dhash', 'phash'):
+            hashes = np.array([scene_detection_methods.compute_frame_hash(frame, hash_type)
+                               for frame in (frames[0], frames[0], frames[1])], dtype=np.uint64)
+            distances = scene_detection_methods.hamming_distances(hashes)
+            self.assertEqual(distances[0], 0)
+            self.assertGreater(distances[1], 12)
+
+    def test_detect_by_phash(self):
+        video_path = os.path.join(self.temp_dir, "textured.mp4")
+        make_test_video(video_path, self.cut_times, textured=True)
+        for hash_type in ('dhash', 'phash'):
+            self.assertEqual(scene_detection_methods.detect_by_phash(video_path, threshold=12, hash_type=hash_type),
+                             self.cut_times)
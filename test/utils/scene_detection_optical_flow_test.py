@@ -0,0 +1,28 @@
+import os
+
+from core.utils.video import scene_detection_optical_flow
+from video_test_helper import VideoTestCase, make_test_video
+
+
+class SceneDetectionOpticalFlowTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "cuts.mp4")
+        make_test_video(cls.video_path, [2.0], duration=4.0, size=(640, 360))
+
+    def test_detect_by_optical_flow_fast(self):
+        stats = {}
+        # 方块每帧移动 3 像素，阈值 1 时几乎每帧都会被判断为运动
+        scene_changes = scene_detection_optical_flow.detect_by_optical_flow_fast(self.video_path, threshold=1.0,
+                                                                                 stats=stats)
+        self.assertEqual(stats['frames'], 100)
+        self.assertGreater(stats['fps'], 0)
+        self.assertGreater(len(scene_changes), 50)
+        self.assertLess(stats['reseeds'], 20)
+
+    def test_dense(self):
+        scene_changes = scene_detection_optical_flow.detect_by_optical_flow_fast(self.video_path, threshold=50.0,
+                                                                                 resize_width=160, dense=True)
+        self.assertEqual(scene_changes, [])
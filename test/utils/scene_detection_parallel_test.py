@@ -0,0 +1,27 @@
+import os
+
+from core.utils.video import scene_detection_methods, scene_detection_parallel
+from video_test_helper import VideoTestCase, make_test_video
+
+
+class SceneDetectionParallelTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "cuts.mp4")
+        make_test_video(cls.video_path, [1.0, 2.0, 4.0])
+
+    def test_split_chunks(self):
+        chunks = scene_detection_parallel.split_chunks(100, 40, overlap_frames=2)
+        self.assertEqual(chunks, [(0, 40), (38, 80), (78, 100)])
+
+    def test_split_chunks_no_frames(self):
+        self.assertEqual(scene_detection_parallel.split_chunks(0, 40), [])
+        self.assertEqual(scene_detection_parallel.split_chunks(0, 40, keyframes=[0, 50]), [])
+
+    def test_detect_by_chunks(self):
+        thresholds = {'frame_diff': 30.0, 'histogram': 0.5}
+        # 分段边界正好落在转场点上，验证重叠与去重
+        results = scene_detection_parallel.detect_by_chunks(self.video_path, thresholds, workers=2, chunk_seconds=1.0)
+        self.assertEqual(results, scene_detection_methods.detect_by_metrics(self.video_path, thresholds))
@@ -0,0 +1,68 @@
+import os
+
+from core.utils.video.video_ffmpeg import run_ffmpeg
+
+from core.utils.video import scene_detection_methods, scene_detection_stream, video_split
+from video_test_helper import VideoTestCase, make_test_video
+
+
+class SceneDetectionStreamTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "cuts.mp4")
+        cls.cut_times = [2.0, 4.0]
+        make_test_video(cls.video_path, cls.cut_times)
+
+    def test_iter_scene_changes(self):
+        scene_changes = scene_detection_stream.iter_scene_changes(self.video_path)
+        # 生成器在检测到第一个转场点时就能返回
+        self.assertEqual(next(scene_changes), 2.0)
+        self.assertEqual([2.0] + list(scene_changes), scene_detection_methods.detect_by_frame_diff(self.video_path))
+
+    def test_iter_scene_changes_ffmpeg(self):
+        scene_changes = scene_detection_stream.iter_scene_changes(self.video_path, threshold=0.5, method='histogram',
+                                                                  frame_size=(160, 90))
+        self.assertEqual(list(scene_changes), self.cut_times)
+
+    def test_iter_ffmpeg_frames_error(self):
+        with self.assertRaisesRegex(Exception, "FFmpeg 错误"):
+            list(scene_detection_stream.iter_ffmpeg_frames(os.path.join(self.temp_dir, "missing.mp4")))
+        # follow 模式下打不开文件不能当作写入结束
+        with self.assertRaisesRegex(Exception, "FFmpeg 错误"):
+            list(scene_detection_stream.iter_ffmpeg_frames(os.path.join(self.temp_dir, "missing.mkv"), follow=True,
+                                                           idle_timeout=0.5))
+
+    def test_iter_ffmpeg_frames_follow(self):
+        video_path = os.path.join(self.temp_dir, "follow.mkv")
+        run_ffmpeg(['-loglevel', 'error', '-f', 'lavfi', '-i', "testsrc=size=160x90:rate=25:duration=1",
+                    '-c:v', 'libx264', video_path])
+        frames = list(scene_detection_stream.iter_ffmpeg_frames(video_path, (32, 18), follow=True, idle_timeout=0.5))
+        self.assertEqual(len(frames), 25)
+
+    def test_iter_scene_changes_vfr(self):
+        # 第 25 帧之后时间戳跳过 1 秒，第 35 帧（时间戳 2.4）由红变蓝
+        video_path = os.path.join(self.temp_dir, "vfr.mp4")
+        run_ffmpeg(['-loglevel', 'error', '-f', 'lavfi', '-i',
+                    "color=c=red:s=160x90:r=25:d=1.4[a];color=c=blue:s=160x90:r=25:d=0.6[b];"
+                    "[a][b]concat=n=2:v=1:a=0,setpts='(N+if(gte(N,25),25,0))/25/TB'",
+                    '-fps_mode', 'vfr', '-c:v', 'libx264', video_path])
+        scene_changes = scene_detection_stream.iter_scene_changes(video_path, frame_size=(32, 18))
+        self.assertEqual(list(scene_changes), [2.4])
+
+    def test_split_video_streaming(self):
+        output_dir = os.path.join(self.temp_dir, "streaming")
+        os.makedirs(output_dir)
+        stale_path = os.path.join(output_dir, "scene_009.mp4")
+        open(stale_path, 'w').close()
+        # 2.0 处的片段过短与后面合并；最后 2 秒过短，与前一个片段合并
+        output_files = video_split.split_video_streaming(self.video_path, output_dir, iter([2.0, 4.0]),
+                                                         min_duration=2.5)
+        self.assertEqual(output_files, [os.path.join(output_dir, "scene_000.mp4")])
+        self.assertFalse(os.path.exists(stale_path))
+        self.assertTrue(os.path.exists(os.path.join(output_dir, "scene_000_thumb.jpg")))
+
+    def test_streaming_rejects_other_detection_options(self):
+        with self.assertRaises(ValueError):
+            video_split.detect_scene_and_spilt(self.video_path, self.temp_dir, streaming=True, workers=2)
@@ -0,0 +1,44 @@
+import os
+from unittest import mock
+
+import cv2
+
+from core.utils.video import scene_detection_methods, scene_detection_threaded
+from video_test_helper import VideoTestCase, make_test_video
+
+
+class SceneDetectionThreadedTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "cuts.mp4")
+        make_test_video(cls.video_path, [1.0, 2.5, 4.0])
+
+    def test_detect_by_threads(self):
+        thresholds = {'frame_diff': 30.0, 'histogram': 0.5, 'optical_flow': 0.3}
+        results = scene_detection_threaded.detect_by_threads(self.video_path, thresholds,
+                                                             buffer_size=3, analysis_threads=4)
+        self.assertEqual(results, scene_detection_methods.detect_by_metrics(self.video_path, thresholds))
+
+    def test_detect_by_threads_frame_size_mismatch(self):
+        # CAP_PROP 报告的尺寸与实际帧不一致时，解码器重新分配数组，检测结果不能使用槽位中的旧数据
+        thresholds = {'frame_diff': 30.0}
+        expected = scene_detection_methods.detect_by_metrics(self.video_path, thresholds)
+        video_capture = cv2.VideoCapture
+
+        class MisreportingCapture:
+            def __init__(self, path):
+                self.cap = video_capture(path)
+
+            def get(self, prop):
+                value = self.cap.get(prop)
+                return value / 2 if prop == cv2.CAP_PROP_FRAME_WIDTH else value
+
+            def __getattr__(self, name):
+                return getattr(self.cap, name)
+
+        with mock.patch.object(scene_detection_threaded.cv2, 'VideoCapture', MisreportingCapture):
+            results = scene_detection_threaded.detect_by_threads(self.video_path, thresholds,
+                                                                 buffer_size=3, analysis_threads=2)
+        self.assertEqual(results, expected)
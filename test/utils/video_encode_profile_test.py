@@ -0,0 +1,56 @@
+import json
+import os
+
+from core.utils.video import video_encode_profile
+from video_test_helper import VideoTestCase, make_keyframe_video
+
+
+class VideoEncodeProfileTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "gop.mp4")
+        make_keyframe_video(cls.video_path)
+
+    def test_default_profile(self):
+        cache_path = os.path.join(self.temp_dir, "missing.json")
+        self.assertEqual(video_encode_profile.get_encode_profile(1920, 1080, cache_path),
+                         video_encode_profile.DEFAULT_PROFILE)
+
+    def test_encode_args(self):
+        profile = {'preset': 'fast', 'crf': 20, 'threads': 4}
+        self.assertEqual(video_encode_profile.ffmpeg_encode_args(profile),
+                         ['-c:v', 'libx264', '-preset', 'fast', '-crf', '20', '-threads', '4'])
+        kwargs = video_encode_profile.moviepy_encode_kwargs(profile)
+        self.assertEqual((kwargs['preset'], kwargs['threads'], kwargs['ffmpeg_params']), ('fast', 4, ['-crf', '20']))
+
+    def test_default_threads(self):
+        # 完整长度的编码不指定线程数，由 x264 自动选择；并行编码片段时每个进程使用固定的线程数
+        profile = video_encode_profile.DEFAULT_PROFILE
+        self.assertNotIn('-threads', video_encode_profile.ffmpeg_encode_args(profile))
+        self.assertIsNone(video_encode_profile.moviepy_encode_kwargs(profile)['threads'])
+        clip_profile = video_encode_profile.clip_encode_profile(profile)
+        self.assertEqual(clip_profile['threads'], video_encode_profile.DEFAULT_THREADS_PER_WORKER)
+        self.assertEqual(video_encode_profile.clip_encode_profile(dict(profile, threads=4))['threads'], 4)
+
+    def test_autotune_encode_profile(self):
+        cache_path = os.path.join(self.temp_dir, "profiles.json")
+        profile = video_encode_profile.autotune_encode_profile(self.video_path, sample_seconds=1.0,
+                                                               min_ssim=0.9, cache_path=cache_path)
+        self.assertIn(profile['preset'], video_encode_profile.CANDIDATE_PRESETS)
+        self.assertIn(profile['crf'], video_encode_profile.CANDIDATE_CRFS)
+        # 按主机名和分辨率缓存，再次读取时直接使用缓存结果
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+        self.assertIn(video_encode_profile.profile_key(320, 240), cache)
+        self.assertEqual(video_encode_profile.get_video_encode_profile(self.video_path, cache_path), profile)
+        self.assertEqual([name for name in os.listdir(self.temp_dir) if name.endswith('.tmp')], [])
+
+    def test_ensure_encode_profile_uses_cache(self):
+        cache_path = os.path.join(self.temp_dir, "cached.json")
+        cached = {'preset': 'fast', 'crf': 20, 'threads': 1}
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({video_encode_profile.profile_key(320, 240): cached}, f)
+        # 命中缓存时不重新调优
+        self.assertEqual(video_encode_profile.ensure_encode_profile(self.video_path, cache_path), cached)
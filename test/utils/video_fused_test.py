@@ -0,0 +1,104 @@
+import glob
+import os
+import unittest
+from unittest import mock
+
+from core.utils.video.video_ffmpeg import probe_media_info, run_ffmpeg
+from core.utils.video import video_fused
+from core.utils.video.video_fused import build_fused_clip_command, render_clips_fused
+from core.utils.video.video_subtitle_ass import has_libass
+from video_test_helper import VideoTestCase, make_keyframe_video
+
+SRT_TEXT = """1
+00:00:00,500 --> 00:00:02,000
+第一条字幕
+
+2
+00:00:04,000 --> 00:00:06,000
+第二条字幕
+"""
+
+FONT_PATHS = glob.glob('/usr/share/fonts/truetype/*/*.ttf')
+
+PROFILE = {'preset': 'veryfast', 'crf': 23, 'threads': 1}
+
+
+class VideoFusedTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.srt_path = os.path.join(cls.temp_dir, "sub.srt")
+        with open(cls.srt_path, 'w', encoding='utf-8') as f:
+            f.write(SRT_TEXT)
+
+    def test_build_fused_clip_command(self):
+        args = build_fused_clip_command("v.mp4", "a.mp3", 2.0, 5.0, "out.mp4", "ass=sub.ass", PROFILE)
+        self.assertEqual(args.count('-ss'), 2)
+        self.assertIn('[0:v]setpts=PTS-STARTPTS+2.000000/TB,ass=sub.ass,setpts=PTS-STARTPTS[vout]', args)
+        self.assertEqual(args[args.index('-map', args.index('[vout]')) + 1], '1:a:0')
+        self.assertEqual(args[-3:], ['-t', '3.000000', 'out.mp4'])
+
+        args = build_fused_clip_command("v.mp4", None, 2.0, 5.0, "out.mp4", None, PROFILE, has_video_audio=False)
+        self.assertIn('[0:v]setpts=PTS-STARTPTS[vout]', args)
+        self.assertNotIn('-c:a', args)
+
+        renditions = [{'width': 320, 'height': 240, 'output_path': "out.mp4"},
+                      {'width': 160, 'height': 120, 'output_path': "out_120p.mp4"}]
+        args = build_fused_clip_command("v.mp4", "a.mp3", 2.0, 5.0, "out.mp4", "ass=sub.ass", PROFILE,
+                                        renditions=renditions)
+        self.assertIn('[0:v]setpts=PTS-STARTPTS+2.000000/TB,ass=sub.ass,setpts=PTS-STARTPTS,split=2[v0][v1];'
+                      '[v0]null[v0s];[v1]scale=160:120,setsar=1[v1s]', args)
+        self.assertEqual(args[-3:], ['-t', '3.000000', 'out_120p.mp4'])
+
+    @unittest.skipUnless(has_libass(), "ffmpeg 没有 libass")
+    def test_render_clips_fused(self):
+        source_path = os.path.join(self.temp_dir, "gop.mp4")
+        make_keyframe_video(source_path, duration=8.0)
+        # 拆成没有音频的视频和单独的音频，模拟分别下载的情况
+        video_path = os.path.join(self.temp_dir, "v1.mp4")
+        audio_path = os.path.join(self.temp_dir, "v1.mp3")
+        run_ffmpeg(['-loglevel', 'error', '-i', source_path, '-map', '0:v', '-c', 'copy', video_path])
+        run_ffmpeg(['-loglevel', 'error', '-i', source_path, '-map', '0:a', '-c:a', 'libmp3lame', audio_path])
+
+        split_dir = os.path.join(self.temp_dir, "split")
+        mixed_path = os.path.join(self.temp_dir, "v1_mixed.mp4")
+        with_subtitle_path = os.path.join(self.temp_dir, "v1_with_subtitle.mp4")
+        font = FONT_PATHS[0] if FONT_PATHS else 'Arial'
+        outputs = render_clips_fused(video_path, split_dir, [(1.0, 3.0), (4.0, 7.0)], srt_path=self.srt_path,
+                                     audio_path=audio_path, font=font, fontsize=20,
+                                     mixed_path=mixed_path, with_subtitle_path=with_subtitle_path,
+                                     ladder_heights=[120])
+
+        self.assertEqual(len(outputs), 2)
+        for output_path, expected in zip(outputs, [2.0, 3.0]):
+            info = probe_media_info(output_path)
+            self.assertAlmostEqual(info['duration'], expected, delta=0.1)
+            self.assertTrue(info['has_audio'])
+        self.assertEqual(len(glob.glob(os.path.join(split_dir, "*.jpg"))), 2)
+        self.assertEqual(probe_media_info(outputs[0].replace('.mp4', '_120p.mp4'))['height'], 120)
+        self.assertEqual(probe_media_info(with_subtitle_path.replace('.mp4', '_120p.mp4'))['height'], 120)
+        for path in (mixed_path, with_subtitle_path):
+            info = probe_media_info(path)
+            self.assertAlmostEqual(info['duration'], 8.0, delta=0.1)
+            self.assertTrue(info['has_audio'])
+
+    def test_render_clips_fused_raises_with_failed_ranges(self):
+        video_path = os.path.join(self.temp_dir, "fail_src.mp4")
+        make_keyframe_video(video_path, duration=6.0)
+        split_dir = os.path.join(self.temp_dir, "split_fail")
+
+        def run_ffmpeg_failing(args):
+            if args[-1].startswith(os.path.join(split_dir, "clip_001")):
+                raise Exception("FFmpeg 错误: 模拟编码失败")
+            run_ffmpeg(args)
+
+        with mock.patch.object(video_fused, 'run_ffmpeg', side_effect=run_ffmpeg_failing):
+            with self.assertRaisesRegex(Exception, r"1/2 个片段编码失败: \[3\.00, 5\.00\]"):
+                render_clips_fused(video_path, split_dir, [(1.0, 3.0), (3.0, 5.0)])
+
+        self.assertEqual(sorted(os.listdir(split_dir)), ["clip_000_1.0-3.0.mp4", "clip_000_1.0-3.0_thumb.jpg"])
+
+
+if __name__ == '__main__':
+    unittest.main()
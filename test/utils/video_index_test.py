@@ -0,0 +1,36 @@
+import os
+
+from core.utils.video import video_index
+from core.utils.video.scene_detection_parallel import split_chunks
+from video_test_helper import VideoTestCase, make_keyframe_video
+
+
+class VideoIndexTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "gop.mp4")
+        make_keyframe_video(cls.video_path)
+
+    def test_build_video_index(self):
+        index = video_index.build_video_index(self.video_path)
+        self.assertEqual(index['frame_count'], 200)
+        self.assertEqual(video_index.keyframe_times(index), [0.0, 2.0, 4.0, 6.0])
+        self.assertEqual(video_index.keyframe_frames(index), [0, 50, 100, 150])
+        self.assertTrue(all(keyframe['pos'] > 0 for keyframe in index['keyframes']))
+        self.assertEqual(video_index.keyframe_before(index, 120)['frame'], 100)
+
+    def test_load_video_index_cache(self):
+        cache_dir = os.path.join(self.temp_dir, "cache")
+        index = video_index.load_video_index(self.video_path, cache_dir)
+        cache_path = video_index.index_cache_path(self.video_path, cache_dir)
+        self.assertTrue(os.path.exists(cache_path))
+        # 缓存命中时直接读取缓存文件
+        mtime = os.path.getmtime(cache_path)
+        self.assertEqual(video_index.load_video_index(self.video_path, cache_dir), index)
+        self.assertEqual(os.path.getmtime(cache_path), mtime)
+
+    def test_split_chunks_at_keyframes(self):
+        chunks = split_chunks(200, 40, keyframes=[0, 50, 100, 150])
+        self.assertEqual(chunks, [(0, 51), (50, 101), (100, 151), (150, 200)])
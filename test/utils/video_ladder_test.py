@@ -0,0 +1,77 @@
+import os
+import unittest
+
+from moviepy.editor import VideoFileClip
+
+from core.utils.video.video_encode_profile import ffmpeg_encode_args, get_encode_profile
+from core.utils.video.video_ffmpeg import probe_media_info
+from core.utils.video.video_ladder import build_ladder_args, plan_renditions, transcode_ladder, write_clip_ladder
+from video_test_helper import VideoTestCase, make_keyframe_video
+
+
+class VideoLadderTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "gop.mp4")
+        make_keyframe_video(cls.video_path, duration=4.0)
+
+    def test_plan_renditions(self):
+        renditions = plan_renditions("/out/v1.mp4", 1920, 1080, [480, 1080, 720])
+        self.assertEqual([(r['width'], r['height']) for r in renditions], [(1920, 1080), (1280, 720), (854, 480)])
+        self.assertEqual(renditions[1]['output_path'], "/out/v1_720p.mp4")
+
+    def test_build_ladder_args(self):
+        renditions = plan_renditions("/out/v1.mp4", 1920, 1080, [720])
+        args = build_ladder_args(renditions, '0:a', (1920, 1080), {'preset': 'fast', 'crf': 23, 'threads': 1})
+        graph = args[args.index('-filter_complex') + 1]
+        self.assertEqual(graph, "[0:v]split=2[v0][v1];[v0]null[v0s];[v1]scale=1280:720,setsar=1[v1s]")
+        self.assertEqual(args.count('-c:a'), 2)
+        # 指定的编码参数只用于原分辨率版本，低分辨率版本使用自己分辨率的参数
+        first_output = args.index("/out/v1.mp4")
+        for encode_args, segment in ((ffmpeg_encode_args({'preset': 'fast', 'crf': 23, 'threads': 1}),
+                                      args[:first_output]),
+                                     (ffmpeg_encode_args(get_encode_profile(1280, 720)), args[first_output:])):
+            start = segment.index('-c:v')
+            self.assertEqual(segment[start:start + len(encode_args)], encode_args)
+
+    def test_write_clip_ladder(self):
+        video = VideoFileClip(self.video_path)
+        try:
+            outputs = write_clip_ladder(video.subclip(1, 3), os.path.join(self.temp_dir, "clip.mp4"), [160, 120])
+        finally:
+            video.close()
+        self.assertEqual(sorted(outputs), [120, 160, 240])
+        for height, output_path in outputs.items():
+            info = probe_media_info(output_path)
+            self.assertEqual(info['height'], height)
+            self.assertTrue(info['has_audio'])
+            self.assertAlmostEqual(info['duration'], 2.0, delta=0.1)
+
+    def test_write_clip_ladder_frame_error(self):
+        def broken_frame(get_frame, t):
+            if t >= 1.0:
+                raise IOError("模拟读取帧失败")
+            return get_frame(t)
+
+        output_path = os.path.join(self.temp_dir, "broken.mp4")
+        video = VideoFileClip(self.video_path)
+        try:
+            with self.assertRaisesRegex(IOError, "模拟读取帧失败"):
+                write_clip_ladder(video.subclip(0, 2).fl(broken_frame), output_path, [120])
+        finally:
+            video.close()
+        # 截断的输出不能留下来被当作成功的结果
+        self.assertFalse(os.path.exists(output_path))
+        self.assertFalse(os.path.exists(output_path.replace('.mp4', '_120p.mp4')))
+
+    def test_transcode_ladder(self):
+        outputs = transcode_ladder(self.video_path, [480, 120])
+        # 不放大，只输出低于源视频高度的版本
+        self.assertEqual(list(outputs), [120])
+        self.assertEqual(probe_media_info(outputs[120])['width'], 160)
+
+
+if __name__ == '__main__':
+    unittest.main()
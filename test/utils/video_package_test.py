@@ -0,0 +1,57 @@
+import os
+import unittest
+
+from core.utils.video.video_index import index_cache_path
+from core.utils.video.video_package import package_video, package_videos
+from video_test_helper import VideoTestCase, make_keyframe_video
+
+
+class VideoPackageTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "gop.mp4")
+        make_keyframe_video(cls.video_path)
+
+    def test_package_hls(self):
+        output_dir = os.path.join(self.temp_dir, "hls_only")
+        outputs = package_video(self.video_path, output_dir, segment_seconds=2.0)
+        self.assertEqual(list(outputs), ['hls'])
+        with open(outputs['hls'], 'r') as f:
+            playlist = f.read()
+        self.assertIn('#EXT-X-MAP:URI="init.mp4"', playlist)
+        self.assertIn('#EXT-X-ENDLIST', playlist)
+        # 关键帧在 0/2/4/6 秒，按 2 秒分段正好 4 段
+        segments = [line for line in playlist.splitlines() if line.endswith('.m4s')]
+        self.assertEqual(len(segments), 4)
+        for segment in segments:
+            self.assertTrue(os.path.exists(os.path.join(output_dir, 'hls', segment)))
+
+    def test_package_dash(self):
+        output_dir = os.path.join(self.temp_dir, "both")
+        outputs = package_videos([self.video_path], output_dir, formats=('hls', 'dash'), segment_seconds=2.0)
+        paths = outputs[self.video_path]
+        self.assertTrue(paths['dash'].startswith(os.path.join(output_dir, 'gop', 'dash')))
+        self.assertTrue(os.path.exists(paths['hls']))
+        with open(paths['dash'], 'r') as f:
+            self.assertIn('<MPD', f.read())
+
+    def test_repackage_removes_stale_segments(self):
+        output_dir = os.path.join(self.temp_dir, "repackage")
+        hls_dir = os.path.join(output_dir, 'hls')
+        os.makedirs(hls_dir)
+        stale_path = os.path.join(hls_dir, 'seg_00099.m4s')
+        open(stale_path, 'w').close()
+        package_video(self.video_path, output_dir, segment_seconds=2.0)
+        self.assertFalse(os.path.exists(stale_path))
+        # 检查关键帧间隔不在视频旁边生成索引文件
+        self.assertFalse(os.path.exists(index_cache_path(self.video_path)))
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            package_video(self.video_path, self.temp_dir, formats=('smooth',))
+
+
+if __name__ == '__main__':
+    unittest.main()
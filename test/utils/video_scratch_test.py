@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+
+from core.utils.video import video_scratch
+
+
+class VideoScratchTest(unittest.TestCase):
+
+    def test_unique_paths_and_cleanup(self):
+        with video_scratch.ScratchSpace(prefix="job_a_") as job_a, video_scratch.ScratchSpace(prefix="job_b_") as job_b:
+            self.assertNotEqual(job_a.dir, job_b.dir)
+            # 同一个任务内相同名称也不冲突
+            self.assertNotEqual(job_a.path("audio.m4a"), job_a.path("audio.m4a"))
+            with open(job_a.path("audio.m4a"), 'w') as f:
+                f.write("data")
+        self.assertFalse(os.path.exists(job_a.dir))
+        self.assertFalse(os.path.exists(job_b.dir))
+
+    def test_cleanup_on_error(self):
+        scratch_dir = None
+        with self.assertRaises(RuntimeError):
+            with video_scratch.ScratchSpace() as scratch:
+                scratch_dir = scratch.dir
+                raise RuntimeError("encode failed")
+        self.assertFalse(os.path.exists(scratch_dir))
+
+    def test_base_dir(self):
+        # 预计空间超过内存文件系统剩余空间时使用系统临时目录
+        with video_scratch.ScratchSpace(expected_bytes=1 << 60) as scratch:
+            self.assertEqual(scratch.base_dir, tempfile.gettempdir())
+        with video_scratch.ScratchSpace(base_dir=tempfile.gettempdir()) as scratch:
+            self.assertTrue(scratch.dir.startswith(tempfile.gettempdir()))
@@ -0,0 +1,90 @@
+import os
+
+from core.utils.video import video_split_ffmpeg
+from core.utils.video.video_ffmpeg import probe_keyframe_times, probe_media_info, run_ffprobe
+from video_test_helper import VideoTestCase, make_keyframe_video
+
+
+class VideoSplitFFmpegTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "gop.mp4")
+        make_keyframe_video(cls.video_path)
+
+    def test_probe_keyframe_times(self):
+        self.assertEqual(probe_keyframe_times(self.video_path), [0.0, 2.0, 4.0, 6.0])
+
+    def test_keyframe_lookup(self):
+        keyframes = [0.0, 2.0, 4.0, 6.0]
+        self.assertEqual(video_split_ffmpeg.nearest_keyframe(keyframes, 2.9), 2.0)
+        self.assertEqual(video_split_ffmpeg.nearest_keyframe(keyframes, 3.1), 4.0)
+        self.assertEqual(video_split_ffmpeg.next_keyframe(keyframes, 2.0), 4.0)
+        self.assertIsNone(video_split_ffmpeg.next_keyframe(keyframes, 6.5))
+
+    def test_split_copy(self):
+        output_dir = os.path.join(self.temp_dir, "copy")
+        output_files = video_split_ffmpeg.split_video_ffmpeg(self.video_path, output_dir, [(2.0, 4.0), (4.3, 7.0)])
+        self.assertEqual(len(output_files), 2)
+        # 流复制的结尾按数据包截断，会多出几帧 B 帧重排延迟
+        self.assertAlmostEqual(probe_media_info(output_files[0])['duration'], 2.0, delta=0.3)
+        # 起点 4.3 对齐到关键帧 4.0
+        self.assertAlmostEqual(probe_media_info(output_files[1])['duration'], 3.0, delta=0.3)
+        self.assertTrue(os.path.exists(output_files[0].replace('.mp4', '_thumb.jpg')))
+
+    def test_split_smart(self):
+        output_dir = os.path.join(self.temp_dir, "smart")
+        output_files = video_split_ffmpeg.split_video_ffmpeg(self.video_path, output_dir, [(1.3, 5.5)], mode='smart')
+        info = probe_media_info(output_files[0])
+        self.assertAlmostEqual(info['duration'], 4.2, delta=0.1)
+        self.assertTrue(info['has_audio'])
+
+    def test_smart_cut_head_args(self):
+        info = probe_media_info(self.video_path)
+        self.assertEqual(video_split_ffmpeg.smart_cut_head_args(info), ['-profile:v', 'high', '-pix_fmt', 'yuv420p'])
+        self.assertIsNone(video_split_ffmpeg.smart_cut_head_args(dict(info, video_profile='High 10',
+                                                                      pix_fmt='yuv420p10le')))
+        self.assertIsNone(video_split_ffmpeg.smart_cut_head_args(dict(info, video_codec='hevc', video_profile='Main')))
+
+    def test_split_smart_non_h264(self):
+        video_path = os.path.join(self.temp_dir, "mpeg4.mp4")
+        make_keyframe_video(video_path, codec='mpeg4')
+        output_dir = os.path.join(self.temp_dir, "smart_mpeg4")
+        output_files = video_split_ffmpeg.split_video_ffmpeg(video_path, output_dir, [(1.3, 5.5)], mode='smart')
+        # 开头无法与 MPEG-4 原视频拼接，整段重新编码为 H.264
+        info = probe_media_info(output_files[0])
+        self.assertEqual(info['video_codec'], 'h264')
+        self.assertAlmostEqual(info['duration'], 4.2, delta=0.1)
+        self.assertTrue(info['has_audio'])
+        # 每一帧都能解码（MPEG-4 数据包直接拼接到 H.264 流中时只能解出开头的几帧）
+        decoded = run_ffprobe(['-count_frames', '-select_streams', 'v:0', '-show_entries', 'stream=nb_read_frames',
+                               '-of', 'csv=p=0', output_files[0]])
+        self.assertEqual(int(decoded.strip()), 105)
+
+    def test_split_copy_with_tolerance(self):
+        output_dir = os.path.join(self.temp_dir, "tolerance")
+        output_files = video_split_ffmpeg.split_video_ffmpeg(self.video_path, output_dir, [(1.0, 3.0)],
+                                                             mode='copy', keyframe_tolerance=0.5)
+        # 离最近关键帧 1 秒，超过容差，改用 smart 方式保证起点精确
+        self.assertAlmostEqual(probe_media_info(output_files[0])['duration'], 2.0, delta=0.1)
+
+    def test_split_single_pass(self):
+        output_dir = os.path.join(self.temp_dir, "single_pass")
+        time_ranges = [(0.0, 2.5), (1.3, 5.5), (5.0, 4.0), (4.5, 7.5)]
+        output_files = video_split_ffmpeg.split_video_single_pass(self.video_path, output_dir, time_ranges)
+        # 无效区间被跳过，其余片段时长精确
+        self.assertEqual(len(output_files), 3)
+        for output_path, expected in zip(output_files, [2.5, 4.2, 3.0]):
+            info = probe_media_info(output_path)
+            self.assertAlmostEqual(info['duration'], expected, delta=0.1)
+            self.assertTrue(info['has_audio'])
+            self.assertTrue(os.path.exists(output_path.replace('.mp4', '_thumb.jpg')))
+
+    def test_build_single_pass_command(self):
+        clips = [(2.0, 4.0, 'a.mp4', 'a.jpg'), (3.0, 6.0, 'b.mp4', 'b.jpg')]
+        args = video_split_ffmpeg.build_single_pass_command(self.video_path, clips, has_audio=False)
+        # 只有一个输入，从最早的片段起点开始解码
+        self.assertEqual(args.count('-i'), 1)
+        self.assertEqual(args[args.index('-ss') + 1], '2.000000')
+        self.assertIn('[v1]trim=start=1.000000:end=4.000000,setpts=PTS-STARTPTS[vout1]', args[args.index('-filter_complex') + 1])
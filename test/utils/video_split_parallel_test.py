@@ -0,0 +1,48 @@
+import os
+
+from core.utils.video import video_split, video_split_parallel
+from video_test_helper import VideoTestCase, make_keyframe_video
+
+
+class VideoSplitParallelTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "gop.mp4")
+        make_keyframe_video(cls.video_path)
+
+    def _clips(self, name, time_ranges):
+        output_dir = os.path.join(self.temp_dir, name)
+        return [(start_time, end_time, os.path.join(output_dir, f"clip_{i}.mp4"),
+                 os.path.join(output_dir, f"clip_{i}_thumb.jpg"))
+                for i, (start_time, end_time) in enumerate(time_ranges)]
+
+    def test_encode_clips_in_order(self):
+        clips = self._clips("parallel", [(0, 2), (2, 5), (5, 8)])
+        results = video_split_parallel.encode_clips(self.video_path, clips, workers=3, threads_per_worker=1)
+        self.assertEqual([result['output_path'] for result in results], [clip[2] for clip in clips])
+        for result in results:
+            self.assertIsNone(result['error'])
+            self.assertTrue(os.path.exists(result['output_path']))
+
+    def test_encode_clips_error_does_not_abort(self):
+        # 第二个片段超出视频范围，只有它失败
+        clips = self._clips("errors", [(0, 1), (7, 100), (1, 2)])
+        for workers in (1, 2):
+            results = video_split_parallel.encode_clips(self.video_path, clips, workers=workers, threads_per_worker=1)
+            self.assertIsNone(results[0]['error'])
+            self.assertIsNotNone(results[1]['error'])
+            self.assertIsNone(results[2]['error'])
+            self.assertFalse(os.path.exists(clips[1][2]))
+
+    def test_split_raises_with_failed_ranges(self):
+        # 全部片段编码结束后才抛出异常，成功的片段保留，失败的片段不保留缩略图
+        clips = self._clips("aggregate", [(0, 1), (7, 100)])
+        with self.assertRaisesRegex(Exception, r"1/2 .*\[7\.00, 100\.00\]"):
+            video_split._encode_clips_with_thumbnails(self.video_path, clips, workers=1, threads_per_worker=1,
+                                                      sprite_sheet=False, desc="test")
+        self.assertTrue(os.path.exists(clips[0][2]))
+        self.assertFalse(os.path.exists(clips[1][2]))
+        self.assertFalse(os.path.exists(clips[1][3]))
+
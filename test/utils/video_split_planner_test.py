@@ -0,0 +1,61 @@
+import os
+import unittest
+
+from core.utils.video.video_ffmpeg import probe_media_info
+from core.utils.video.video_split_planner import plan_spans, split_video_planned
+from video_test_helper import VideoTestCase, make_keyframe_video
+
+
+class PlanSpansTest(unittest.TestCase):
+
+    def test_overlapping_ranges_share_spans(self):
+        plan = plan_spans([(0.0, 4.0), (2.0, 6.0)])
+        self.assertEqual(plan['spans'], [(0.0, 2.0), (2.0, 4.0), (4.0, 6.0)])
+        self.assertEqual(plan['clips'], [[0, 1], [1, 2]])
+        self.assertAlmostEqual(plan['requested_seconds'], 8.0)
+        self.assertAlmostEqual(plan['encoded_seconds'], 6.0)
+        self.assertAlmostEqual(plan['saved_seconds'], 2.0)
+
+    def test_gap_is_not_encoded(self):
+        plan = plan_spans([(0.0, 1.0), (3.0, 4.0)])
+        self.assertEqual(plan['spans'], [(0.0, 1.0), (3.0, 4.0)])
+        self.assertAlmostEqual(plan['saved_seconds'], 0.0)
+
+    def test_close_points_are_snapped(self):
+        plan = plan_spans([(0.0, 2.5), (2.52, 4.0)], snap_tolerance=0.1)
+        self.assertEqual(plan['spans'], [(0.0, 2.5), (2.5, 4.0)])
+        self.assertEqual(plan['clips'], [[0], [1]])
+
+    def test_short_range_keeps_its_boundaries(self):
+        plan = plan_spans([(0.0, 4.0), (2.0, 2.05)], snap_tolerance=0.1)
+        self.assertEqual(plan['spans'], [(0.0, 2.0), (2.0, 2.05), (2.05, 4.0)])
+        self.assertEqual(plan['clips'], [[0, 1, 2], [1]])
+
+    def test_invalid_range_is_ignored(self):
+        plan = plan_spans([(0.0, 2.0), (5.0, 4.0)])
+        self.assertEqual(plan['spans'], [(0.0, 2.0)])
+        self.assertEqual(plan['clips'], [[0], []])
+
+
+class SplitVideoPlannedTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "gop.mp4")
+        make_keyframe_video(cls.video_path)
+
+    def test_split_planned(self):
+        output_dir = os.path.join(self.temp_dir, "planned")
+        output_files = split_video_planned(self.video_path, output_dir, [(0.0, 2.5), (1.3, 5.5), (4.5, 7.9)])
+        self.assertEqual(len(output_files), 3)
+        for output_file, duration in zip(output_files, [2.5, 4.2, 3.4]):
+            info = probe_media_info(output_file)
+            # 基本片段按帧对齐，允许一帧左右的误差
+            self.assertAlmostEqual(info['duration'], duration, delta=0.1)
+            self.assertTrue(info['has_audio'])
+            self.assertTrue(os.path.exists(output_file.replace('.mp4', '_thumb.jpg')))
+
+
+if __name__ == '__main__':
+    unittest.main()
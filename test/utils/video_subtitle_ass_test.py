@@ -0,0 +1,97 @@
+import glob
+import os
+import unittest
+
+import pysrt
+from PIL import ImageFont
+
+from core.utils.video.video_ffmpeg import probe_media_info, run_ffmpeg
+from core.utils.video.video_subtitle_ass import (
+    _escape_filter_path,
+    build_ass_filter,
+    burn_subtitles_ass,
+    color_to_ass,
+    has_libass,
+    srt_to_ass,
+    wrap_text
+)
+from video_test_helper import VideoTestCase, make_keyframe_video
+
+SRT_TEXT = """1
+00:00:00,500 --> 00:00:02,000
+Hello {world}
+第二行
+
+2
+00:00:03,000 --> 00:00:05,250
+这是一条很长很长的字幕，用来测试自动换行
+"""
+
+FONT_PATHS = glob.glob('/usr/share/fonts/truetype/*/*.ttf')
+
+
+class VideoSubtitleAssTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.srt_path = os.path.join(cls.temp_dir, "sub.srt")
+        with open(cls.srt_path, 'w', encoding='utf-8') as f:
+            f.write(SRT_TEXT)
+
+    def test_color_to_ass(self):
+        self.assertEqual(color_to_ass('white'), '&H00FFFFFF')
+        self.assertEqual(color_to_ass('#112233'), '&H00332211')
+
+    def test_srt_to_ass(self):
+        ass_path = srt_to_ass(pysrt.open(self.srt_path), os.path.join(self.temp_dir, "sub.ass"), 640, 360,
+                              'Noto Sans CJK SC', fontsize=40, color='yellow', stroke_color='black', stroke_width=2)
+        with open(ass_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        self.assertIn('PlayResX: 640', content)
+        self.assertIn('Style: Default,Noto Sans CJK SC,40,&H0000FFFF,&H0000FFFF,&H00000000,', content)
+        self.assertIn('Dialogue: 0,0:00:00.50,0:00:02.00,Default,,0,0,0,,Hello \\{world\\}\\N第二行', content)
+        self.assertIn('Dialogue: 0,0:00:03.00,0:00:05.25,', content)
+
+    @unittest.skipUnless(FONT_PATHS, "没有可用的字体文件")
+    def test_wrap_text(self):
+        font = ImageFont.truetype(FONT_PATHS[0], 20)
+        lines = wrap_text("这是一条很长很长的字幕，用来测试自动换行 and some words", font, 100)
+        self.assertGreater(len(lines), 1)
+        for line in lines:
+            self.assertLessEqual(font.getlength(line), 100)
+        self.assertEqual(''.join(lines).replace(' ', ''), "这是一条很长很长的字幕，用来测试自动换行andsomewords")
+
+    def test_escape_filter_path(self):
+        self.assertEqual(_escape_filter_path('C:\\subs\\a.ass'), "\\'C:/subs/a.ass\\'")
+        self.assertEqual(_escape_filter_path("/tmp/a,b[1];c'd/s.ass"),
+                         "\\'/tmp/a\\,b\\[1\\]\\;c\\'\\\\\\'\\'d/s.ass\\'")
+
+    @unittest.skipUnless(has_libass(), "ffmpeg 没有 libass")
+    def test_ass_filter_special_path(self):
+        # 路径中的冒号、逗号、方括号、分号、单引号都不能破坏滤镜图
+        subtitle_dir = os.path.join(self.temp_dir, "a,b [1];c'd:e")
+        os.makedirs(subtitle_dir)
+        font = FONT_PATHS[0] if FONT_PATHS else 'Arial'
+        video_filter = build_ass_filter(self.srt_path, os.path.join(subtitle_dir, "sub.ass"), 320, 240, font)
+        output_path = os.path.join(subtitle_dir, "frame.png")
+        run_ffmpeg(['-loglevel', 'error', '-f', 'lavfi', '-i', "testsrc=size=320x240:duration=1",
+                    '-filter_complex', f"[0:v]{video_filter},null[vout]", '-map', '[vout]', '-frames:v', '1',
+                    output_path])
+        self.assertTrue(os.path.exists(output_path))
+
+    @unittest.skipUnless(has_libass(), "ffmpeg 没有 libass")
+    def test_burn_subtitles_ass(self):
+        video_path = os.path.join(self.temp_dir, "gop.mp4")
+        make_keyframe_video(video_path, duration=6.0)
+        output_path = os.path.join(self.temp_dir, "with_subtitle.mp4")
+        font = FONT_PATHS[0] if FONT_PATHS else 'Arial'
+        burn_subtitles_ass(video_path, self.srt_path, output_path, font, fontsize=20, ladder_heights=[120])
+        info = probe_media_info(output_path)
+        self.assertAlmostEqual(info['duration'], 6.0, delta=0.1)
+        self.assertTrue(info['has_audio'])
+        self.assertEqual(probe_media_info(output_path.replace('.mp4', '_120p.mp4'))['height'], 120)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+import numpy as np
+
+from core.utils.video.video_subtitle_compositor import SubtitleCompositor
+
+
+def make_bitmap(width: int, height: int, color: tuple, alpha: int) -> np.ndarray:
+    rgba = np.zeros((height, width, 4), dtype=np.uint8)
+    rgba[..., :3] = color
+    rgba[..., 3] = alpha
+    return rgba
+
+
+class SubtitleCompositorTest(unittest.TestCase):
+
+    def test_active_cues(self):
+        bitmap = make_bitmap(4, 2, (255, 255, 255), 255)
+        compositor = SubtitleCompositor([(1.0, 3.0, bitmap), (2.0, 4.0, bitmap), (6.0, 7.0, bitmap),
+                                         (5.0, 5.0, bitmap)], (10, 10))
+        self.assertEqual(len(compositor.active_cues(0.5)), 0)
+        self.assertEqual(len(compositor.active_cues(1.0)), 1)
+        self.assertEqual(len(compositor.active_cues(2.5)), 2)
+        # 结束时间不包含
+        self.assertEqual(len(compositor.active_cues(3.0)), 1)
+        self.assertEqual(len(compositor.active_cues(5.0)), 0)
+        self.assertEqual(len(compositor.active_cues(6.5)), 1)
+        self.assertEqual(len(compositor.active_cues(7.0)), 0)
+
+    def test_blend_bottom_center(self):
+        bitmap = make_bitmap(4, 2, (200, 100, 0), 255)
+        # 透明的边框不参与混合
+        bitmap = np.pad(bitmap, ((1, 0), (1, 1), (0, 0)))
+        compositor = SubtitleCompositor([(0.0, 1.0, bitmap)], (10, 6))
+        frame = np.zeros((6, 10, 3), dtype=np.uint8)
+        result = compositor.composite(frame, 0.5)
+        self.assertTrue((result[4:6, 3:7] == (200, 100, 0)).all())
+        self.assertEqual(int(result.sum()), 300 * 8)
+
+    def test_blend_alpha(self):
+        bitmap = make_bitmap(2, 2, (255, 255, 255), 128)
+        compositor = SubtitleCompositor([(0.0, 1.0, bitmap)], (2, 2))
+        frame = np.full((2, 2, 3), 100, dtype=np.uint8)
+        result = compositor.composite(frame, 0.0)
+        self.assertTrue((result == round(255 * 128 / 255 + 100 * 127 / 255)).all())
+
+    def test_output_buffer_is_reused(self):
+        bitmap = make_bitmap(2, 2, (255, 0, 0), 255)
+        compositor = SubtitleCompositor([(0.0, 1.0, bitmap)], (4, 4))
+        frame = np.zeros((4, 4, 3), dtype=np.uint8)
+        frame.flags.writeable = False
+        result = compositor.composite(frame, 0.0)
+        self.assertIsNot(result, frame)
+        self.assertEqual(int(frame.sum()), 0)
+        self.assertEqual(int(result.sum()), 255 * 4)
+        # 同一个数组作为下一帧传入（例如 ImageClip）时字幕不会叠加两次
+        writable = np.zeros((4, 4, 3), dtype=np.uint8)
+        self.assertIs(compositor.composite(writable, 0.5), result)
+        self.assertEqual(int(writable.sum()), 0)
+        self.assertEqual(int(result.sum()), 255 * 4)
+        # 没有字幕时直接返回原画面
+        self.assertIs(compositor.composite(frame, 2.0), frame)
+
+    def test_bitmap_larger_than_frame(self):
+        bitmap = make_bitmap(8, 8, (0, 255, 0), 255)
+        compositor = SubtitleCompositor([(0.0, 1.0, bitmap)], (4, 4))
+        frame = np.zeros((4, 4, 3), dtype=np.uint8)
+        result = compositor.composite(frame, 0.0)
+        self.assertTrue((result[..., 1] == 255).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
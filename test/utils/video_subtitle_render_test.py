@@ -0,0 +1,77 @@
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.utils.video.video_subtitle_render import SubtitleRenderCache, render_text_rgba
+
+FONT_PATHS = glob.glob('/usr/share/fonts/truetype/*/*.ttf')
+FONT = FONT_PATHS[0] if FONT_PATHS else 'Arial'
+
+
+class VideoSubtitleRenderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_render_text_rgba(self):
+        rgba = render_text_rgba("Hello\nworld", FONT, 24, color='white', stroke_color='black',
+                                stroke_width=2, max_width=200)
+        self.assertEqual(rgba.shape[1], 200)
+        self.assertEqual(rgba.shape[2], 4)
+        # 文字周围透明，文字处不透明
+        self.assertEqual(rgba[:, 0, 3].max(), 0)
+        self.assertEqual(rgba[..., 3].max(), 255)
+
+    def test_memory_hit(self):
+        cache = SubtitleRenderCache(cache_dir=None)
+        first = cache.get("[Music]", FONT, 24, width=200)
+        second = cache.get("[Music]", FONT, 24, width=200)
+        self.assertIs(first, second)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_lru_eviction(self):
+        # 大写字母的位图高度相同
+        size = render_text_rgba("A", FONT, 24, max_width=200).nbytes
+        cache = SubtitleRenderCache(max_bytes=size * 2, cache_dir=None)
+        cache.get("A", FONT, 24, width=200)
+        cache.get("B", FONT, 24, width=200)
+        cache.get("A", FONT, 24, width=200)
+        cache.get("C", FONT, 24, width=200)
+        # B 最久未使用，被淘汰
+        self.assertLessEqual(cache.current_bytes, size * 2)
+        cache.get("A", FONT, 24, width=200)
+        self.assertEqual(cache.stats()['hits'], 2)
+        cache.get("B", FONT, 24, width=200)
+        self.assertEqual(cache.stats()['misses'], 4)
+
+    def test_disk_cache(self):
+        rgba = SubtitleRenderCache(cache_dir=self.cache_dir).get("字幕", FONT, 24, color='yellow', width=200)
+        cache = SubtitleRenderCache(cache_dir=self.cache_dir)
+        reloaded = cache.get("字幕", FONT, 24, color='yellow', width=200)
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+        self.assertTrue((rgba == reloaded).all())
+        # 样式不同的缓存键不同
+        cache.get("字幕", FONT, 24, color='white', width=200)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_prune_disk_cache(self):
+        cache = SubtitleRenderCache(cache_dir=self.cache_dir)
+        for text in ("A", "B", "C"):
+            cache.get(text, FONT, 24, width=200)
+        paths = sorted(glob.glob(os.path.join(self.cache_dir, '*', '*.png')), key=os.path.getmtime)
+        sizes = [os.path.getsize(path) for path in paths]
+        # 最旧的文件修改时间设为更早，上限只够保留两个文件
+        os.utime(paths[0], (0, 0))
+        cache.max_disk_bytes = sum(sizes) - min(sizes)
+        self.assertEqual(cache.prune_disk_cache(), 1)
+        self.assertFalse(os.path.exists(paths[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
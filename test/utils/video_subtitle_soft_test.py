@@ -0,0 +1,87 @@
+import os
+import shutil
+import unittest
+
+import pysrt
+
+from core.utils.video.video_add_subtitle import add_subtitle
+from core.utils.video.video_ffmpeg import run_ffmpeg, run_ffprobe
+from core.utils.video.video_subtitle_soft import attach_clip_subtitles, slice_srt, subtitle_codec_for
+from video_test_helper import VideoTestCase, make_keyframe_video
+
+ZH_SRT = """1
+00:00:00,500 --> 00:00:02,000
+你好
+
+2
+00:00:03,000 --> 00:00:05,250
+第二条字幕
+"""
+
+EN_SRT = """1
+00:00:00,500 --> 00:00:02,000
+Hello
+
+2
+00:00:03,000 --> 00:00:05,250
+Second line
+"""
+
+
+def probe_subtitle_streams(video_path: str) -> list:
+    output = run_ffprobe(['-select_streams', 's', '-show_entries', 'stream=codec_name:stream_tags=language',
+                          '-of', 'csv=p=0', video_path])
+    return [line.strip() for line in output.splitlines() if line.strip()]
+
+
+class VideoSubtitleSoftTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "gop.mp4")
+        make_keyframe_video(cls.video_path, duration=6.0)
+        cls.zh_path = os.path.join(cls.temp_dir, "zh.srt")
+        cls.en_path = os.path.join(cls.temp_dir, "en.srt")
+        for path, text in ((cls.zh_path, ZH_SRT), (cls.en_path, EN_SRT)):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+
+    def test_subtitle_codec_for(self):
+        self.assertEqual(subtitle_codec_for("a.mp4"), 'mov_text')
+        self.assertEqual(subtitle_codec_for("a.webm"), 'webvtt')
+        with self.assertRaises(ValueError):
+            subtitle_codec_for("a.avi")
+
+    def test_slice_srt(self):
+        subs = pysrt.open(slice_srt(self.zh_path, os.path.join(self.temp_dir, "slice.srt"), 1.0, 4.0))
+        self.assertEqual([(sub.start.ordinal, sub.end.ordinal) for sub in subs], [(0, 1000), (2000, 3000)])
+        self.assertEqual(subs[0].index, 1)
+
+    def test_add_subtitle_soft(self):
+        output_path = os.path.join(self.temp_dir, "soft.mp4")
+        add_subtitle(self.video_path, self.zh_path, output_path, mode='soft',
+                     extra_subtitles=[(self.en_path, 'eng')])
+        self.assertEqual(probe_subtitle_streams(output_path), ['mov_text,zho', 'mov_text,eng'])
+
+    def test_add_subtitle_soft_ladder(self):
+        output_path = os.path.join(self.temp_dir, "soft_ladder.mp4")
+        add_subtitle(self.video_path, self.zh_path, output_path, mode='soft', ladder_heights=[120])
+        # 低分辨率版本重新编码后同样带有字幕轨
+        self.assertEqual(probe_subtitle_streams(output_path.replace('.mp4', '_120p.mp4')), ['mov_text,zho'])
+
+    def test_attach_clip_subtitles(self):
+        clip_path = os.path.join(self.temp_dir, "clip.mp4")
+        shutil.copy(self.video_path, clip_path)
+        attach_clip_subtitles([(clip_path, 2.5, 6.0)], [(self.zh_path, 'zho')])
+        self.assertEqual(probe_subtitle_streams(clip_path), ['mov_text,zho'])
+        # 取出片段中的字幕，时间轴从片段开头算起
+        srt_path = os.path.join(self.temp_dir, "clip.srt")
+        run_ffmpeg(['-loglevel', 'error', '-i', clip_path, '-map', '0:s:0', srt_path])
+        subs = pysrt.open(srt_path)
+        self.assertEqual(len(subs), 1)
+        self.assertEqual(subs[0].start.ordinal, 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+视频相关测试共用的测试视频生成函数和测试基类
+"""
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from core.utils.video.video_ffmpeg import run_ffmpeg
+
+
+def make_test_video(video_path: str, cut_times, duration: float = 6.0, fps: int = 25, size=(320, 240),
+                    textured: bool = False):
+    """
+    生成带硬切转场的测试视频，每个场景是不同的纯色背景加一个移动的方块；
+    textured 为 True 时背景是随机色块，感知哈希只反映画面结构，纯色背景之间的转场检测不到
+    """
+    width, height = size
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    rng = np.random.default_rng(0)
+    boundaries = [int(round(t * fps)) for t in cut_times]
+    background = None
+    for i in range(int(duration * fps)):
+        if background is None or i in boundaries:
+            if textured:
+                background = cv2.resize(rng.integers(0, 255, (6, 8, 3), dtype=np.uint8), (width, height),
+                                        interpolation=cv2.INTER_NEAREST)
+            else:
+                background = np.zeros((height, width, 3), np.uint8)
+                background[:] = rng.integers(0, 255, 3)
+        frame = background.copy()
+        x = (i * 3) % width
+        cv2.rectangle(frame, (x, 10), (x + 30, 60), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def make_keyframe_video(video_path: str, duration: float = 8.0, fps: int = 25, gop: int = 50,
+                        codec: str = 'libx264'):
+    """
+    生成带音频的测试视频（默认 H.264），每 gop 帧一个关键帧
+    """
+    run_ffmpeg([
+        '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f"testsrc=size=320x240:rate={fps}:duration={duration}",
+        '-f', 'lavfi', '-i', f"sine=frequency=440:duration={duration}",
+        '-c:v', codec, '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0',
+        '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-shortest',
+        video_path
+    ])
+
+
+class VideoTestCase(unittest.TestCase):
+    """
+    测试基类：整个测试类共用一个临时目录 cls.temp_dir，测试结束后删除。
+    子类在 setUpClass 中先调用 super().setUpClass()，再在临时目录中生成测试视频
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from core.utils.video import video_thumbnail
+from core.utils.video.video_index import index_cache_path
+from video_test_helper import VideoTestCase, make_test_video
+
+
+class VideoThumbnailTest(VideoTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.video_path = os.path.join(cls.temp_dir, "cuts.mp4")
+        make_test_video(cls.video_path, [2.0, 4.0])
+
+    def _read_frame(self, frame_index):
+        cap = cv2.VideoCapture(self.video_path)
+        for _ in range(frame_index + 1):
+            ret, frame = cap.read()
+        cap.release()
+        return frame
+
+    def test_iter_frames_at(self):
+        # 乱序、重复、相距较远的时间点
+        timestamps = [5.0, 0.0, 1.0, 1.0, 0.2]
+        frames = dict(video_thumbnail.iter_frames_at(self.video_path, timestamps))
+        self.assertEqual(sorted(frames), [0, 1, 2, 3, 4])
+        for request_index, t in enumerate(timestamps):
+            np.testing.assert_array_equal(frames[request_index], self._read_frame(int(t * 25)))
+        # 默认不生成关键帧索引文件
+        self.assertFalse(os.path.exists(index_cache_path(self.video_path)))
+
+    def test_iter_frames_at_with_index(self):
+        video_path = os.path.join(self.temp_dir, "indexed.mp4")
+        shutil.copy(self.video_path, video_path)
+        frames = dict(video_thumbnail.iter_frames_at(video_path, [5.0, 0.2], use_index=True))
+        np.testing.assert_array_equal(frames[0], self._read_frame(125))
+        self.assertTrue(os.path.exists(index_cache_path(video_path)))
+
+    def test_save_thumbnails(self):
+        thumbnails = [(4.5, os.path.join(self.temp_dir, "thumbs", "b.jpg")),
+                      (0.5, os.path.join(self.temp_dir, "thumbs", "a.jpg"))]
+        saved = video_thumbnail.save_thumbnails(self.video_path, thumbnails)
+        self.assertEqual(saved, [path for _, path in thumbnails])
+        self.assertEqual(cv2.imread(saved[0]).shape, (240, 320, 3))
+
+    def test_make_sprite_sheet(self):
+        output_dir = os.path.join(self.temp_dir, "sprite")
+        sprite_paths, vtt_path = video_thumbnail.make_sprite_sheet(self.video_path, output_dir, interval=1.0,
+                                                                   tile_width=80, columns=4, rows=1)
+        # 6 秒视频每秒一个小图，每张雪碧图最多 4 个
+        self.assertEqual(len(sprite_paths), 2)
+        self.assertEqual(cv2.imread(sprite_paths[0]).shape, (60, 320, 3))
+        self.assertEqual(cv2.imread(sprite_paths[1]).shape, (60, 160, 3))
+        with open(vtt_path, encoding='utf-8') as f:
+            content = f.read()
+        self.assertTrue(content.startswith("WEBVTT"))
+        self.assertIn("00:00:05.000 --> 00:00:06.000\nsprite_001.jpg#xywh=80,0,80,60", content)